@@ -0,0 +1,494 @@
+# ========================= apiserver.py =========================
+# Local HTTP/JSON service so tablets and phones can mark attendance too.
+#
+#   python apiserver.py --host 0.0.0.0 --port 8765
+#
+# Endpoints (dates are YYYY-MM-DD and default to today; reads and "all"
+# marks take an optional class_id to work on one section):
+#   GET  /classes                  the sections with their class_id and student count
+#   GET  /roster?date=             every student with their status for the date
+#   GET  /daily?date=              marked students plus present/absent/leave counts
+#   GET  /monthly?month=&year=     monthly summary, same rows as the Monthly Report
+#   GET  /range?start=&end=&exclude=sat,sun&holidays=2025-12-25,2025-12-29..2026-01-02
+#                                  the same summary for any period (start/end inclusive)
+#   GET  /export?start=&end=&format=csv|jsonl&gzip=1
+#                                  every mark of the period, streamed (chunked) as it is read
+#   POST /mark       {"roll_no": 7, "status": "Present", "date": "..."}
+#   POST /mark/bulk  {"roll_nos": [1, 2, 3], "status": "Absent", "date": "..."}
+#                    or {"all": true, "status": "Present", "date": "...", "class_id": 2}
+#                    (404 and nothing saved if a roll_no has no student)
+#
+# It uses the same queries as the windows (database.py). Reads run on a
+# thread pool. Every write is queued for one writer task. When a burst of
+# requests arrives, that task commits all queued marks in one transaction
+# (group commit) and answers each request only after the commit. Exports
+# are encoded on their own threads and sent batch by batch, with at most
+# STREAM_QUEUE chunks waiting for a slow client.
+# An hourly online backup (backup.py) runs on its own thread meanwhile.
+# Only the standard library is used (asyncio streams, minimal HTTP/1.1
+# with keep-alive).
+
+import argparse
+import asyncio
+import datetime
+import json
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from backup import BackupScheduler
+from database import (DB_PATH, ArchivedDateError, Database, UnknownStudentError, inclusive_range, parse_holidays,
+                      parse_weekdays, setup_database)
+
+STATUSES = ("Present", "Absent", "Leave")
+MAX_BATCH = 256             # queued write requests committed together at most
+MAX_BODY = 1024 * 1024
+READ_WORKERS = 4
+EXPORT_WORKERS = 2          # exports streamed at the same time; more wait for a free one
+STREAM_QUEUE = 4            # encoded chunks buffered per streamed response
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    """Turned into a JSON error response with the given HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamedBody:
+    """An endpoint result sent with chunked encoding: chunks() yields bytes (it runs on an export thread)."""
+
+    def __init__(self, content_type, chunks, filename=None):
+        self.content_type = content_type
+        self.chunks = chunks
+        self.filename = filename
+
+
+# ----------- Validation -----------
+def today():
+    return datetime.date.today().strftime("%Y-%m-%d")
+
+
+def parse_date(value):
+    if value in (None, ""):
+        return today()
+    try:
+        return datetime.datetime.strptime(str(value), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise ApiError(400, f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def parse_int(value, name, low=None, high=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"'{name}' must be an integer")
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise ApiError(400, f"'{name}' out of range")
+    return number
+
+
+def parse_class(value):
+    """The optional class_id of a request (None: every section)."""
+    return None if value in (None, "") else parse_int(value, "class_id", 1)
+
+
+def parse_exclusions(query):
+    """(weekdays, holidays) from the exclude= and holidays= query parameters."""
+    try:
+        return parse_weekdays(query.get("exclude", "")), tuple(parse_holidays(query.get("holidays", "")))
+    except ValueError as e:
+        raise ApiError(400, f"invalid exclusions: {e}")
+
+
+def parse_status(value):
+    for status in STATUSES:
+        if str(value).lower() == status.lower():
+            return status
+    raise ApiError(400, f"'status' must be one of {', '.join(STATUSES)}")
+
+
+# ----------- Serialized Writer -----------
+class BatchWriter:
+    """
+    Single writer task: write requests are queued as (method, args, future).
+    Whatever is queued when the writer wakes up is applied in one
+    transaction, each request inside its own SAVEPOINT so a failing request
+    does not undo the others, and then committed once.
+    """
+
+    def __init__(self, db, max_batch=MAX_BATCH):
+        self.db = db
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        # One dedicated thread, so the writes always use the same connection
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attendance-writer")
+        self._task = None
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._thread.submit(self.db.close).result()
+        self._thread.shutdown(wait=True)
+
+    async def submit(self, method, *args):
+        """Queue a Database write method call; returns its result once committed."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((method, args, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._thread, self._apply, batch)
+            except Exception as e:
+                # The commit itself failed: nothing in the batch was written
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _apply(self, batch):
+        results = []
+        with self.db.transaction() as conn:
+            for method, args, _ in batch:
+                conn.execute("SAVEPOINT request")
+                try:
+                    results.append(getattr(self.db, method)(*args))
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO request")
+                    results.append(e)
+                conn.execute("RELEASE request")
+        self.batches += 1
+        self.writes += len(batch)
+        return results
+
+
+# ----------- Endpoints -----------
+class AttendanceApi:
+    def __init__(self, db):
+        self.db = db
+        self.writer = BatchWriter(db)
+        self._readers = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="attendance-read")
+        self._exporters = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="attendance-export")
+        self.routes = {
+            ("GET", "/classes"): self.classes,
+            ("GET", "/roster"): self.roster,
+            ("GET", "/daily"): self.daily,
+            ("GET", "/monthly"): self.monthly,
+            ("GET", "/range"): self.range,
+            ("GET", "/export"): self.export,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/mark"): self.mark,
+            ("POST", "/mark/bulk"): self.mark_bulk,
+        }
+
+    async def read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, func, *args)
+
+    async def close(self):
+        await self.writer.stop()
+        self._readers.shutdown(wait=True)
+        self._exporters.shutdown(wait=True)
+
+    # -------- Reads --------
+    async def classes(self, query, body):
+        rows = await self.read(self.db.classes)
+        return {"classes": [{"class_id": c, "name": n, "students": s} for c, n, s in rows]}
+
+    async def roster(self, query, body):
+        date = parse_date(query.get("date"))
+        class_id = parse_class(query.get("class_id"))
+        rows = await self.read(self.db.roster_with_status, date, class_id)
+        return {"date": date, "class_id": class_id,
+                "students": [{"roll_no": r, "name": n, "status": s} for r, n, s in rows]}
+
+    async def daily(self, query, body):
+        date = parse_date(query.get("date"))
+        class_id = parse_class(query.get("class_id"))
+        snapshot = await self.read(self.db.daily_snapshot, date, class_id)
+        total, present, absent, leave = snapshot.counts
+        return {"date": date, "class_id": class_id,
+                "counts": {"students": total, "present": present, "absent": absent, "leave": leave},
+                "records": [{"roll_no": r, "name": n, "status": s} for r, n, s in snapshot.rows]}
+
+    async def monthly(self, query, body):
+        now = datetime.date.today()
+        month = parse_int(query.get("month", now.month), "month", 1, 12)
+        year = parse_int(query.get("year", now.year), "year", 1, 9999)
+        class_id = parse_class(query.get("class_id"))
+        rows = await self.read(self.db.fetch_monthly_data, month, year, class_id)
+        return {"month": month, "year": year, "class_id": class_id,
+                "students": [{"roll_no": r, "name": n, "present": p, "absent": a, "leave": l, "total": t}
+                             for r, n, p, a, l, t in rows]}
+
+    async def range(self, query, body):
+        start = parse_date(query.get("start"))
+        end = parse_date(query.get("end"))
+        if end < start:
+            raise ApiError(400, "'end' is before 'start'")
+        weekdays, holidays = parse_exclusions(query)
+        class_id = parse_class(query.get("class_id"))
+        rows = await self.read(self.db.fetch_range_data, *inclusive_range(start, end), weekdays, holidays, class_id)
+        return {"start": start, "end": end, "class_id": class_id,
+                "exclude_weekdays": list(weekdays), "holidays": list(holidays),
+                "students": [{"roll_no": r, "name": n, "present": p, "absent": a, "leave": l, "total": t}
+                             for r, n, p, a, l, t in rows]}
+
+    async def export(self, query, body):
+        from export import CONTENT_TYPES, EXPORT_FORMATS, export_chunks, export_filename
+
+        start = parse_date(query.get("start"))
+        end = parse_date(query.get("end"))
+        if end < start:
+            raise ApiError(400, "'end' is before 'start'")
+        fmt = query.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise ApiError(400, f"'format' must be one of {', '.join(EXPORT_FORMATS)}")
+        compress = query.get("gzip", "") in ("1", "true", "yes")
+        class_id = parse_class(query.get("class_id"))
+        return StreamedBody("application/gzip" if compress else CONTENT_TYPES[fmt],
+                            lambda: export_chunks(self.db, *inclusive_range(start, end), fmt, compress, class_id),
+                            export_filename(start, end, fmt, compress))
+
+    async def stream(self, writer, body, keep_alive):
+        """
+        Send a StreamedBody. Its chunks are produced on an export thread and
+        handed over through a small queue, so a slow client holds back the
+        reads instead of buffering the whole export in memory.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=STREAM_QUEUE)
+        stopped = threading.Event()
+
+        def produce():
+            # Queues bytes chunks, then None at the end (or the exception that stopped it)
+            end = None
+            iterator = body.chunks()
+            try:
+                for chunk in iterator:
+                    if stopped.is_set():
+                        return
+                    asyncio.run_coroutine_threadsafe(chunks.put(chunk), loop).result()
+            except Exception as e:
+                end = e
+            finally:
+                iterator.close()
+            if not stopped.is_set():
+                asyncio.run_coroutine_threadsafe(chunks.put(end), loop).result()
+
+        producer = loop.run_in_executor(self._exporters, produce)
+        try:
+            # Errors before the first chunk (bad archive, locked database) still get a JSON response
+            chunk = await chunks.get()
+            if isinstance(chunk, sqlite3.Error):
+                write_response(writer, 500, {"error": f"database error: {chunk}"}, keep_alive)
+                await writer.drain()
+                return
+            head = (f"HTTP/1.1 200 OK\r\n"
+                    f"Content-Type: {body.content_type}\r\n"
+                    f"Transfer-Encoding: chunked\r\n"
+                    + (f"Content-Disposition: attachment; filename=\"{body.filename}\"\r\n" if body.filename else "")
+                    + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+            writer.write(head.encode("latin-1"))
+            while chunk is not None:
+                if isinstance(chunk, Exception):
+                    # The status line is already sent: end the connection without the last chunk
+                    raise ConnectionAbortedError(f"export failed: {chunk}")
+                if chunk:       # an empty chunk would end the response
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    await writer.drain()
+                chunk = await chunks.get()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # Unblock a producer waiting on the full queue, then let it finish
+            stopped.set()
+            while not chunks.empty():
+                chunks.get_nowait()
+            await producer
+
+    async def stats(self, query, body):
+        return {"write_batches": self.writer.batches, "writes": self.writer.writes,
+                "queued": self.writer.queue.qsize(), "read_cache": self.db.cache.stats()}
+
+    # -------- Writes --------
+    async def mark(self, query, body):
+        roll_no = parse_int(body.get("roll_no"), "roll_no")
+        status = parse_status(body.get("status"))
+        date = parse_date(body.get("date"))
+        result = await self.writer.submit("mark_attendance", roll_no, status, date)
+        return {"date": date, "status": status, "inserted": result.inserted, "updated": result.updated}
+
+    async def mark_bulk(self, query, body):
+        status = parse_status(body.get("status"))
+        date = parse_date(body.get("date"))
+        if body.get("all"):
+            result = await self.writer.submit("mark_all", status, date, parse_class(body.get("class_id")))
+        else:
+            roll_nos = body.get("roll_nos")
+            if not isinstance(roll_nos, list) or not roll_nos:
+                raise ApiError(400, "'roll_nos' must be a non-empty list (or pass \"all\": true)")
+            roll_nos = [parse_int(r, "roll_nos") for r in roll_nos]
+            result = await self.writer.submit("mark_students", roll_nos, status, date)
+        return {"date": date, "status": status, "inserted": result.inserted, "updated": result.updated}
+
+    # -------- Dispatch --------
+    async def handle(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise ApiError(405, f"{method} not allowed on {path}")
+            raise ApiError(404, f"no endpoint {path}")
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise ApiError(400, "request body is not valid JSON")
+            if not isinstance(body, dict):
+                raise ApiError(400, "request body must be a JSON object")
+        return await handler(query, body or {})
+
+
+# ----------- HTTP Connection Handling -----------
+async def read_request(reader):
+    """Read one request. Returns (method, target, headers, body) or None when the client closed."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise ApiError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = parse_int(headers.get("content-length", 0), "content-length", 0)
+    if length > MAX_BODY:
+        raise ApiError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), target, keep_alive, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+
+
+def make_handler(api):
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, keep_alive, body = request
+                    status, payload = 200, await api.handle(method, target, body)
+                except ApiError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except UnknownStudentError as e:
+                    status, payload = 404, {"error": str(e)}
+                except ArchivedDateError as e:
+                    status, payload = 409, {"error": str(e)}
+                except sqlite3.Error as e:
+                    status, payload = 500, {"error": f"database error: {e}"}
+                if isinstance(payload, StreamedBody):
+                    await api.stream(writer, payload, keep_alive)
+                    if not keep_alive:
+                        break
+                    continue
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return handle_connection
+
+
+# ----------- Server -----------
+async def serve(db, host, port, ready=None, backups=None):
+    api = AttendanceApi(db)
+    api.writer.start()
+    try:
+        server = await asyncio.start_server(make_handler(api), host, port)
+        if ready:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+    finally:
+        # The backup thread reads through db, so it stops before db is closed
+        if backups:
+            backups.stop()
+        await api.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attendance JSON API server")
+    parser.add_argument("--db", default=DB_PATH, help="path to the SQLite database (default: student.db)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    db = Database(args.db)
+    setup_database(db)
+    db.close()
+
+    # Online backups while the server runs (ATTENDANCE_BACKUP_MINUTES=0 turns them off)
+    backups = BackupScheduler.from_environment(db)
+    if backups:
+        backups.start()
+
+    def ready(server):
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Attendance API listening on http://{host}:{port}", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(db, args.host, args.port, ready, backups))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# ========================= archive.py =========================
+# Moves closed academic years out of the hot database into per-year files.
+#
+# student.db then only holds the open year(s): the indexes every mark has to
+# maintain, the daily queries and every backup stay the same size however
+# many years are kept. A closed year is copied to archive/attendance_<name>.db
+# (its attendance rows and attendance_monthly summary), checked, registered
+# in attendance_archives and only then deleted from the hot tables. Reports
+# read archived dates from the attached file (see Database._sources);
+# marking an archived date raises ArchivedDateError.
+#
+#   python attendance.py archive --year 2024 --start-month 4    # 2024-04-01 .. 2025-03-31 -> "2024-25"
+#   python attendance.py archive                                # list the archives
+#
+# The archive file is complete before anything is deleted, and a file that
+# was never registered is ignored (and rebuilt by the next run), so a crash at
+# any point leaves every mark readable exactly once.
+
+import datetime
+import os
+import sqlite3
+
+from database import SQL_CREATE_MONTHLY_SUMMARY, SQL_REGISTER_ARCHIVE
+
+ARCHIVE_FOLDER = "archive"      # next to the database file
+
+# Same columns and indexes as the hot tables (no triggers: archives are read-only)
+SQL_CREATE_ARCHIVE_ATTENDANCE = """
+    CREATE TABLE attendance (
+        id INTEGER PRIMARY KEY,
+        roll_no INTEGER,
+        status TEXT,
+        date TEXT
+    )
+"""
+SQL_ARCHIVE_INDEXES = (
+    "CREATE UNIQUE INDEX idx_attendance_unique ON attendance (roll_no, date)",
+    "CREATE INDEX idx_attendance_date ON attendance (date, roll_no, status)",
+    "CREATE INDEX idx_attendance_monthly_month ON attendance_monthly (year, month)",
+)
+
+SQL_COPY_ATTENDANCE = """
+    INSERT INTO attendance (id, roll_no, status, date)
+    SELECT id, roll_no, status, date FROM hot.attendance
+    WHERE date >= ? AND date < ?
+    ORDER BY id
+"""
+SQL_COPY_MONTHLY = """
+    INSERT INTO attendance_monthly
+    SELECT * FROM hot.attendance_monthly
+    WHERE (year, month) BETWEEN (?, ?) AND (?, ?)
+"""
+SQL_COUNT_RANGE = "SELECT COUNT(*), COUNT(status) FROM attendance WHERE date >= ? AND date < ?"
+# (hot rows of the range, those without an identical row in the archive)
+SQL_COMPARE_RANGE = """
+    SELECT COUNT(*), IFNULL(SUM(NOT EXISTS (
+        SELECT 1 FROM attendance a
+        WHERE a.roll_no = h.roll_no AND a.date = h.date AND a.id = h.id AND a.status IS h.status
+    )), 0)
+    FROM hot.attendance h
+    WHERE h.date >= ? AND h.date < ?
+"""
+SQL_DELETE_MONTHLY = "DELETE FROM attendance_monthly WHERE (year, month) BETWEEN (?, ?) AND (?, ?)"
+SQL_DELETE_RANGE = "DELETE FROM attendance WHERE date >= ? AND date < ?"
+
+
+# ----------- Periods -----------
+def academic_year(year, start_month=1):
+    """
+    (name, start, end) of the academic year beginning in start_month of year:
+    ('2024', '2024-01-01', '2025-01-01') or ('2024-25', '2024-04-01', '2025-04-01').
+    """
+    start = datetime.date(year, start_month, 1)
+    end = datetime.date(year + 1, start_month, 1)
+    name = str(year) if start_month == 1 else f"{year}-{(year + 1) % 100:02d}"
+    return name, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def month_key(day):
+    """'YYYY-MM-DD' -> (year, month), as attendance_monthly keys months."""
+    return int(day[:4]), int(day[5:7])
+
+
+def last_month_key(end):
+    """(year, month) of the last whole month before the (first of a month) end date."""
+    last = datetime.date.fromisoformat(end) - datetime.timedelta(days=1)
+    return last.year, last.month
+
+
+# ----------- Archiving -----------
+def archive_year(db, year, start_month=1, vacuum=False, log=None):
+    """Archive one academic year (see academic_year). Returns (name, file path, rows moved)."""
+    name, start, end = academic_year(year, start_month)
+    return archive_period(db, name, start, end, vacuum=vacuum, log=log)
+
+
+def archive_period(db, name, start, end, vacuum=False, log=None):
+    """
+    Move start <= date < end (whole months, already over) from the hot tables
+    to a new archive file. Raises ValueError if the period cannot be archived.
+    Returns (name, file path, rows moved).
+    """
+    log = log or (lambda message: None)
+    if start[8:] != "01" or end[8:] != "01" or start >= end:
+        raise ValueError("an archive must cover whole months")
+    if end > datetime.date.today().strftime("%Y-%m-%d"):
+        raise ValueError(f"{name} is not over yet (ends {end})")
+    for archived in db.archives():
+        if archived[0] == name or (archived[2] < end and archived[3] > start):
+            raise ValueError(f"{name} overlaps the existing archive {archived[0]} ({archived[2]} .. {archived[3]})")
+
+    relative = os.path.join(ARCHIVE_FOLDER, f"attendance_{name}.db")
+    path = db.archive_path(relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    log(f"Copying {start} .. {end} to {path}")
+    rows = _write_archive(db, path, start, end)
+    if not rows:
+        os.remove(path)
+        raise ValueError(f"no attendance between {start} and {end}")
+
+    # The hot rows go only if they are still exactly the ones copied. The
+    # write lock is held from the comparison to the delete, so no mark can
+    # slip in between.
+    log(f"Removing {rows} rows from {db.path}")
+    with db.transaction() as conn:
+        if _compare_archive(db, path, start, end) != (rows, 0):
+            raise ValueError(f"attendance between {start} and {end} changed while archiving; nothing was removed")
+        conn.execute(SQL_DELETE_MONTHLY, (*month_key(start), *last_month_key(end)))
+        conn.execute(SQL_DELETE_RANGE, (start, end))
+        conn.execute(SQL_REGISTER_ARCHIVE, (name, relative, start, end, rows,
+                                            datetime.datetime.now().isoformat(timespec="seconds")))
+    if vacuum:
+        log("Compacting the database (VACUUM)")
+        db.conn.execute("VACUUM")
+    return name, path, rows
+
+
+def _write_archive(db, path, start, end):
+    """Build the archive file for the period from the hot database. Returns the rows copied."""
+    partial = path + ".tmp"
+    if os.path.exists(partial):
+        os.remove(partial)
+    conn = sqlite3.connect(partial)
+    try:
+        conn.execute(SQL_CREATE_ARCHIVE_ATTENDANCE)
+        conn.execute(SQL_CREATE_MONTHLY_SUMMARY)
+        conn.execute("ATTACH DATABASE ? AS hot", (os.path.abspath(db.path),))
+        with conn:
+            conn.execute(SQL_COPY_ATTENDANCE, (start, end))
+            conn.execute(SQL_COPY_MONTHLY, (*month_key(start), *last_month_key(end)))
+        conn.execute("DETACH DATABASE hot")
+        for sql in SQL_ARCHIVE_INDEXES:
+            conn.execute(sql)
+
+        # The summary must account for every copied mark
+        rows, marked = conn.execute(SQL_COUNT_RANGE, (start, end)).fetchone()
+        summarized = conn.execute("SELECT IFNULL(SUM(total), 0) FROM attendance_monthly").fetchone()[0]
+        if summarized != marked:
+            raise ValueError(f"attendance_monthly does not match attendance ({summarized} vs {marked} marks); "
+                             "run 'python attendance.py rebuild-summary' first")
+        if conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+            raise sqlite3.DatabaseError(f"integrity check failed for {partial}")
+    except BaseException:
+        conn.close()
+        os.remove(partial)
+        raise
+    conn.close()
+    os.replace(partial, path)
+    return rows
+
+
+def _compare_archive(db, path, start, end):
+    """(hot rows in the period, hot rows not in the archive file as they are), read on a connection of its own."""
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        conn.execute("ATTACH DATABASE ? AS hot", (os.path.abspath(db.path),))
+        return tuple(conn.execute(SQL_COMPARE_RANGE, (start, end)).fetchone())
+    finally:
+        conn.close()
@@ -0,0 +1,396 @@
+# ========================= attendance.py =========================
+# Headless command line for scheduled jobs (cron / Task Scheduler).
+#
+# Uses the same queries (database.py) and PDF writers (pdfreports.py) as the
+# windows, without importing Tk, so it runs on servers without a display:
+#
+#   python attendance.py report daily --date 2025-10-01 --out reports/ --class "CS S3"
+#   python attendance.py report monthly --month 10 --year 2025 --students
+#   python attendance.py report range --start 2025-09-01 --end 2026-01-31 --exclude sat,sun
+#   python attendance.py rebuild-summary
+#   python attendance.py analytics --start 2025-04-01 --end 2026-03-31
+#   python attendance.py archive --year 2024 --start-month 4
+#   python attendance.py classes --add "CS S4"
+#   python attendance.py export --start 2024-04-01 --end 2025-03-31 --out year.csv.gz
+#   python attendance.py import attendance history.csv --rejects rejected.csv
+#   python attendance.py backup --keep 30
+#
+# "python -m attendance ..." works the same way.
+
+import argparse
+import calendar
+import datetime
+import sys
+
+from database import (DB_PATH, Database, describe_exclusions, inclusive_range, month_range, parse_holidays,
+                      parse_weekdays, setup_database)
+
+# Rejected import rows listed on screen (--rejects FILE writes them all)
+MAX_SHOWN_REJECTS = 20
+
+
+# ----------- Helpers -----------
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date().strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def parse_weekday_list(value):
+    try:
+        return parse_weekdays(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_holiday_list(value):
+    try:
+        return tuple(parse_holidays(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid holidays '{value}', expected YYYY-MM-DD or YYYY-MM-DD..YYYY-MM-DD")
+
+
+def selected_class(db, args):
+    """(class_id, name) of --class (a section name or id), (None, None) without it."""
+    if args.section is None:
+        return None, None
+    found = db.find_class(args.section)
+    if found is None:
+        raise SystemExit(f"No section '{args.section}' (see 'python attendance.py classes').")
+    return found
+
+
+def parse_month(value):
+    month = int(value)
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError("month must be between 1 and 12")
+    return month
+
+
+# ----------- Commands -----------
+def cmd_setup(db, args):
+    from migrations import schema_version
+
+    print(f"Database ready: {db.path} (schema version {schema_version(db)})")
+    return 0
+
+
+def cmd_rebuild_summary(db, args):
+    db.rebuild_monthly_summary()
+    print("attendance_monthly rebuilt.")
+    return 0
+
+
+def cmd_journal(db, args):
+    mode = db.set_journal_mode(args.mode)
+    print(f"Journal mode: {mode}")
+    return 0 if mode == args.mode else 1
+
+
+def cmd_report_daily(db, args):
+    from pdfreports import DAILY_FOLDER, export_daily_pdf
+
+    class_id, class_name = selected_class(db, args)
+    filename = export_daily_pdf(db.daily_snapshot(args.date, class_id), folder=args.out or DAILY_FOLDER,
+                                class_name=class_name)
+    print(filename)
+    return 0
+
+
+def cmd_report_monthly(db, args):
+    from pdfreports import MONTHLY_FOLDER, export_all_student_pdfs, export_month_pdf
+
+    folder = args.out or MONTHLY_FOLDER
+    class_id, class_name = selected_class(db, args)
+    filename = export_month_pdf(args.month, args.year, db.fetch_monthly_data(args.month, args.year, class_id),
+                                folder=folder, class_name=class_name)
+    if filename is None:
+        print(f"No data for {args.month:02d}/{args.year}.", file=sys.stderr)
+        return 1
+    print(filename)
+
+    if args.students or args.combined:
+        start, end = month_range(args.month, args.year)
+        filenames = export_all_student_pdfs(args.month, args.year, db.iter_class_records(start, end, class_id),
+                                            combined=args.combined, workers=args.workers, folder=folder,
+                                            class_name=class_name)
+        for name in filenames:
+            print(name)
+    return 0
+
+
+def cmd_report_range(db, args):
+    from pdfreports import RANGE_FOLDER, export_range_pdf
+
+    if args.end < args.start:
+        print("--end is before --start.", file=sys.stderr)
+        return 2
+    class_id, class_name = selected_class(db, args)
+    data = db.fetch_range_data(*inclusive_range(args.start, args.end), args.exclude, args.holidays, class_id)
+    filename = export_range_pdf(args.start, args.end, data, title=args.title,
+                                excluded=describe_exclusions(args.exclude, args.holidays),
+                                folder=args.out or RANGE_FOLDER, class_name=class_name)
+    if filename is None:
+        print(f"No students for {args.start} .. {args.end}.", file=sys.stderr)
+        return 1
+    print(filename)
+    return 0
+
+
+def cmd_analytics(db, args):
+    from analytics import AttendanceMatrix
+
+    matrix = AttendanceMatrix.load(db, *inclusive_range(args.start, args.end))
+    print(f"{len(matrix.roll_nos)} students x {len(matrix.dates)} school days, "
+          f"{matrix.nbytes / 1024:.0f} KB ({'numpy' if matrix.use_numpy else 'bytearray'})")
+
+    print("\nAbsence rate by weekday:")
+    for weekday, (absent, marked, pct) in matrix.weekday_absence_rates().items():
+        print(f"  {calendar.day_name[weekday]:<10}{pct:6.1f}%  ({absent}/{marked})")
+
+    print(f"\nBelow {args.threshold:g}% attendance:")
+    for roll, name, pct, attended, marked in matrix.chronic_absentees(args.threshold):
+        print(f"  {roll:>6}  {name:<30}{pct:6.1f}%  ({attended}/{marked})")
+
+    print(f"\nAbsent {args.min_streak}+ school days in a row (longest run per student):")
+    for roll, name, length, first, last in matrix.absence_streaks(args.min_streak):
+        print(f"  {roll:>6}  {name:<30}{length:>4} days  {first} .. {last}")
+
+    print(f"\nTop {args.top} by attendance:")
+    for rank, roll, name, pct, attended, marked in matrix.rankings(args.top):
+        print(f"  {rank:>4}. {roll:>6}  {name:<30}{pct:6.1f}%")
+    return 0
+
+
+def cmd_archive(db, args):
+    from archive import archive_year
+
+    if args.year is not None:
+        try:
+            name, path, rows = archive_year(db, args.year, args.start_month, vacuum=args.vacuum, log=print)
+        except ValueError as e:
+            print(f"Not archived: {e}", file=sys.stderr)
+            return 1
+        print(f"Archived {name}: {rows} rows moved to {path}")
+    archives = db.archives()
+    if not archives:
+        print("No archives.")
+    for name, path, start, end, rows, created in archives:
+        print(f"  {name:<10}{start} .. {end}  {rows:>10} rows  {path}  (created {created})")
+    return 0
+
+
+def cmd_classes(db, args):
+    import sqlite3
+
+    if args.add:
+        try:
+            class_id, name = db.add_class(args.add)
+        except sqlite3.IntegrityError:
+            print(f"A section named '{args.add}' already exists.", file=sys.stderr)
+            return 1
+        print(f"Added section {name} (id {class_id})")
+    if args.move:
+        class_id, name = selected_class(db, args)
+        if class_id is None:
+            print("--move needs --class, the section to move the students to.", file=sys.stderr)
+            return 2
+        db.move_students(args.move, class_id)
+        print(f"Moved {len(args.move)} students to {name}")
+    for class_id, name, students in db.classes():
+        print(f"  {class_id:>4}  {name:<24}{students:>8} students")
+    return 0
+
+
+def cmd_export(db, args):
+    from export import export_filename, export_to_file
+
+    if args.end < args.start:
+        print("--end is before --start.", file=sys.stderr)
+        return 2
+    out = args.out or export_filename(args.start, args.end, args.format, args.gzip)
+    compress = args.gzip or out.endswith(".gz")
+    class_id, _ = selected_class(db, args)
+    start, end = inclusive_range(args.start, args.end)
+
+    # A running row count, only when someone watches the terminal
+    progress = None
+    if sys.stderr.isatty():
+        def progress(done, total, text):
+            print(f"\r{text}", end="", file=sys.stderr, flush=True)
+
+    if out == "-":
+        rows = export_to_file(db, sys.stdout.buffer, start, end, args.format, compress, class_id, progress=progress)
+    else:
+        with open(out, "wb") as f:
+            rows = export_to_file(db, f, start, end, args.format, compress, class_id, progress=progress)
+    print(f"{chr(13) if progress else ''}{rows} rows written to {'stdout' if out == '-' else out}", file=sys.stderr)
+    return 0
+
+
+def cmd_import(db, args):
+    import csv
+    import json
+    from importer import import_file
+
+    class_id, _ = selected_class(db, args)
+    shown = []
+    rejects = open(args.rejects, "w", encoding="utf-8", newline="") if args.rejects else None
+    writer = csv.writer(rejects) if rejects else None
+    if writer:
+        writer.writerow(["line", "reason", "record"])
+
+    def on_reject(line_no, record, reason):
+        if writer:
+            writer.writerow([line_no, reason, json.dumps(record, ensure_ascii=False)])
+        elif len(shown) < MAX_SHOWN_REJECTS:
+            shown.append(f"  line {line_no}: {reason}")
+
+    # A running row count, only when someone watches the terminal
+    progress = None
+    if sys.stderr.isatty():
+        def progress(done, total, text):
+            print(f"\r{text}", end="", file=sys.stderr, flush=True)
+
+    try:
+        result = import_file(db, args.file, args.kind, args.format, class_id, args.add_sections,
+                             progress=progress, on_reject=on_reject)
+    finally:
+        if rejects:
+            rejects.close()
+    print(f"{chr(13) if progress else ''}Imported {result.imported} of {result.rows} rows "
+          f"({result.rejected} rejected)", file=sys.stderr)
+    for line in shown:
+        print(line, file=sys.stderr)
+    if result.rejected > len(shown):
+        print(f"  ... {result.rejected - len(shown)} more rejected rows" if not writer
+              else f"Rejected rows written to {args.rejects}", file=sys.stderr)
+    return 1 if result.rejected else 0
+
+
+def cmd_backup(db, args):
+    import os
+    from backup import BackupBusy, backup_database, list_backups
+
+    if not args.list:
+        try:
+            path = backup_database(db, args.out, args.keep, log=print)
+        except BackupBusy as e:
+            print(f"Not backed up: {e}", file=sys.stderr)
+            return 1
+        print(f"Backup saved to {path}")
+    for path in list_backups(db, args.out):
+        modified = datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M")
+        print(f"  {modified}  {os.path.getsize(path) / 1e6:>9.1f} MB  {path}")
+    return 0
+
+
+# ----------- Argument Parser -----------
+def build_parser():
+    today = datetime.date.today()
+    parser = argparse.ArgumentParser(prog="attendance", description="Attendance Management System (headless)")
+    parser.add_argument("--db", default=DB_PATH, help="path to the SQLite database (default: student.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("setup", help="create / upgrade the database").set_defaults(func=cmd_setup)
+    commands.add_parser("rebuild-summary", help="recompute the monthly summary table").set_defaults(
+        func=cmd_rebuild_summary)
+
+    journal = commands.add_parser("journal", help="switch journal mode (wal = safe multi-instance access)")
+    journal.add_argument("mode", choices=["wal", "delete"])
+    journal.set_defaults(func=cmd_journal)
+
+    report = commands.add_parser("report", help="render PDF reports")
+    kinds = report.add_subparsers(dest="kind", required=True)
+
+    daily = kinds.add_parser("daily", help="daily attendance report")
+    daily.add_argument("--date", type=parse_date, default=today.strftime("%Y-%m-%d"), help="YYYY-MM-DD (default: today)")
+    daily.add_argument("--out", help="output folder (default: 'Daily PDF Folder')")
+    daily.add_argument("--class", dest="section", help="only this section (name or id)")
+    daily.set_defaults(func=cmd_report_daily)
+
+    monthly = kinds.add_parser("monthly", help="monthly attendance report")
+    monthly.add_argument("--month", type=parse_month, default=today.month)
+    monthly.add_argument("--year", type=int, default=today.year)
+    monthly.add_argument("--out", help="output folder (default: 'Monthly PDF Folder')")
+    monthly.add_argument("--students", action="store_true", help="also write one PDF per student")
+    monthly.add_argument("--combined", action="store_true", help="also write all student sheets into one PDF")
+    monthly.add_argument("--workers", type=int, help="processes for per-student PDFs (default: all cores)")
+    monthly.add_argument("--class", dest="section", help="only this section (name or id)")
+    monthly.set_defaults(func=cmd_report_monthly)
+
+    period = kinds.add_parser("range", help="term / any date range report")
+    period.add_argument("--start", type=parse_date, required=True, help="first day, YYYY-MM-DD")
+    period.add_argument("--end", type=parse_date, required=True, help="last day, YYYY-MM-DD")
+    period.add_argument("--exclude", type=parse_weekday_list, default=(), help="weekdays to skip, e.g. sat,sun")
+    period.add_argument("--holidays", type=parse_holiday_list, default=(),
+                        help="days to skip, e.g. 2025-12-25,2025-12-29..2026-01-02")
+    period.add_argument("--title", help="report title, e.g. 'Fall Term 2025'")
+    period.add_argument("--out", help="output folder (default: 'Range PDF Folder')")
+    period.add_argument("--class", dest="section", help="only this section (name or id)")
+    period.set_defaults(func=cmd_report_range)
+
+    analytics = commands.add_parser("analytics", help="streaks, chronic absentees, weekday rates and rankings")
+    analytics.add_argument("--start", type=parse_date, default=today.replace(month=1, day=1).strftime("%Y-%m-%d"),
+                           help="first day, YYYY-MM-DD (default: 1 January this year)")
+    analytics.add_argument("--end", type=parse_date, default=today.strftime("%Y-%m-%d"),
+                           help="last day, YYYY-MM-DD (default: today)")
+    analytics.add_argument("--threshold", type=float, default=75.0, help="chronic absentee cut-off in percent")
+    analytics.add_argument("--min-streak", type=int, default=3, help="shortest absence streak to list")
+    analytics.add_argument("--top", type=int, default=10, help="students to list in the ranking")
+    analytics.set_defaults(func=cmd_analytics)
+
+    archive = commands.add_parser("archive", help="move a closed academic year to its own archive file")
+    archive.add_argument("--year", type=int, help="first calendar year of the academic year (omit to list archives)")
+    archive.add_argument("--start-month", type=parse_month, default=1,
+                         help="month the academic year starts in (default: 1, i.e. calendar years)")
+    archive.add_argument("--vacuum", action="store_true", help="compact student.db afterwards")
+    archive.set_defaults(func=cmd_archive)
+
+    export = commands.add_parser("export", help="stream attendance history to CSV / JSON Lines (optionally gzip)")
+    export.add_argument("--start", type=parse_date, required=True, help="first day, YYYY-MM-DD")
+    export.add_argument("--end", type=parse_date, default=today.strftime("%Y-%m-%d"),
+                        help="last day, YYYY-MM-DD (default: today)")
+    export.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    export.add_argument("--gzip", action="store_true", help="gzip the output (also when --out ends in .gz)")
+    export.add_argument("--class", dest="section", help="only this section (name or id)")
+    export.add_argument("--out", help="output file, '-' for stdout (default: attendance_<start>_to_<end>.<format>)")
+    export.set_defaults(func=cmd_export)
+
+    load = commands.add_parser("import", help="bulk load students or attendance history from CSV / JSON Lines")
+    load.add_argument("kind", choices=["students", "attendance"])
+    load.add_argument("file", help="CSV or JSON Lines file (may be gzipped, e.g. history.csv.gz)")
+    load.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: from the file name)")
+    load.add_argument("--class", dest="section", help="section for students listed without one (name or id)")
+    load.add_argument("--add-sections", action="store_true", help="create the sections the file names that do not exist")
+    load.add_argument("--rejects", metavar="FILE", help="write the rejected rows and reasons to this CSV file")
+    load.set_defaults(func=cmd_import)
+
+    backup = commands.add_parser("backup", help="save a verified copy of the database, safe while it is in use")
+    backup.add_argument("--out", help="backup folder (default: 'backups' next to the database)")
+    backup.add_argument("--keep", type=int, default=10, help="newest backups to keep (default: 10)")
+    backup.add_argument("--list", action="store_true", help="only list the backups")
+    backup.set_defaults(func=cmd_backup)
+
+    classes = commands.add_parser("classes", help="list, add and fill class sections")
+    classes.add_argument("--add", metavar="NAME", help="create a section")
+    classes.add_argument("--move", metavar="ROLL_NO", type=int, nargs="+", help="move students to --class")
+    classes.add_argument("--class", dest="section", help="section the --move students go to (name or id)")
+    classes.set_defaults(func=cmd_classes)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = Database(args.db)
+    try:
+        setup_database(db)
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# ========================= backup.py =========================
+# Online backups of student.db, safe while attendance is being marked.
+#
+# Copying student.db with Explorer while the app writes can give a torn file.
+# Here SQLite's backup API copies the database on a connection of its own,
+# BACKUP_PAGES pages per step with BACKUP_SLEEP seconds between steps, so
+# marking attendance only ever waits for one short step. Each copy is written
+# to a .tmp file, checked with PRAGMA integrity_check and only then renamed
+# into the backups folder next to student.db; the newest KEEP_BACKUPS are kept.
+#
+# A commit by another connection restarts the copy from the first page. If
+# marking never pauses long enough (BACKUP_MAX_RESTARTS), the run is given
+# up with BackupBusy rather than copying everything in one long step that
+# writers would have to wait for; the scheduler tries again at the next
+# interval.
+#
+# Archive files (archive.py) never change once written; each is copied once
+# to backups/archive.
+#
+#   python attendance.py backup             # one backup now
+#   python attendance.py backup --list
+#
+# main.py and apiserver.py run a BackupScheduler while they are open: a
+# backup every BACKUP_INTERVAL_MINUTES (ATTENDANCE_BACKUP_MINUTES, 0 = off).
+
+import datetime
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+from archive import ARCHIVE_FOLDER
+
+BACKUP_FOLDER = "backups"       # next to the database file
+BACKUP_PAGES = 256              # pages copied per step (1 MB with 4 KB pages)
+BACKUP_SLEEP = 0.05             # seconds between steps, when writers get their turn
+BACKUP_MAX_RESTARTS = 3         # then give up until the next backup
+KEEP_BACKUPS = 10
+STALE_PARTIAL = 3600            # seconds untouched after which a .tmp copy is left over from a crash
+
+BACKUP_INTERVAL_MINUTES = 60
+BACKUP_START_DELAY = 60         # seconds after start before the first scheduled backup
+BACKUP_ENV_VAR = "ATTENDANCE_BACKUP_MINUTES"
+
+
+class BackupCancelled(Exception):
+    """Raised when a backup is stopped (the scheduler is shutting down)."""
+
+
+class BackupBusy(Exception):
+    """Raised when the database kept changing under the copy; nothing was saved."""
+
+
+# ----------- Files -----------
+def backup_folder(db):
+    return os.path.join(os.path.dirname(os.path.abspath(db.path)), BACKUP_FOLDER)
+
+
+def backup_prefix(db):
+    """'student_' for student.db: backups are student_YYYYmmdd_HHMMSS_ffffff.db (to the microsecond)."""
+    return os.path.splitext(os.path.basename(db.path))[0] + "_"
+
+
+def list_backups(db, folder=None):
+    """Paths of the finished backups of db, oldest first."""
+    folder = folder or backup_folder(db)
+    if not os.path.isdir(folder):
+        return []
+    prefix = backup_prefix(db)
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.startswith(prefix) and name.endswith(".db"))
+
+
+def rotate_backups(db, folder=None, keep=KEEP_BACKUPS):
+    """Delete all but the newest keep backups (and abandoned .tmp copies). Returns the deleted paths."""
+    folder = folder or backup_folder(db)
+    backups = list_backups(db, folder)
+    old = backups[:max(0, len(backups) - keep)]
+    partials = [os.path.join(folder, name) for name in os.listdir(folder)
+                if name.startswith(backup_prefix(db)) and name.endswith(".db.tmp")]
+    old += [path for path in partials if time.time() - os.path.getmtime(path) > STALE_PARTIAL]
+    for path in old:
+        os.remove(path)
+    return old
+
+
+def copy_archives(db, folder=None):
+    """Copy the archive files not yet in folder/archive. Returns the paths copied."""
+    target = os.path.join(folder or backup_folder(db), ARCHIVE_FOLDER)
+    copied = []
+    for _, path, _, _, _, _ in db.archives():
+        source = db.archive_path(path)
+        copy = os.path.join(target, os.path.basename(path))
+        if os.path.exists(copy) and os.path.getsize(copy) == os.path.getsize(source):
+            continue
+        os.makedirs(target, exist_ok=True)
+        shutil.copyfile(source, copy + ".tmp")
+        os.replace(copy + ".tmp", copy)
+        copied.append(copy)
+    return copied
+
+
+# ----------- Backup -----------
+def backup_database(db, folder=None, keep=KEEP_BACKUPS, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, stop=None,
+                    log=None):
+    """
+    Make a verified copy of db's file in folder (default: backups next to it),
+    then copy new archive files and rotate old backups. stop is an optional
+    threading.Event that cancels the copy (BackupCancelled). Returns the path.
+    """
+    log = log or (lambda message: None)
+    folder = folder or backup_folder(db)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{backup_prefix(db)}{datetime.datetime.now():%Y%m%d_%H%M%S_%f}.db")
+    if os.path.exists(path):
+        raise FileExistsError(f"backup {path} already exists")
+    partial = path + ".tmp"
+    open(partial, "x").close()      # claims the name: FileExistsError if another backup has it
+
+    log(f"Copying {db.path} to {path}")
+    source = sqlite3.connect(db.path, timeout=10)
+    target = sqlite3.connect(partial)
+    try:
+        _copy(source, target, pages, sleep, stop, log)
+        # A copy of a WAL database would otherwise need its own -wal file
+        target.execute("PRAGMA journal_mode = DELETE")
+        result = target.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != "ok":
+            raise sqlite3.DatabaseError(f"integrity check failed for {partial}: {result}")
+    except BaseException:
+        target.close()
+        source.close()
+        os.remove(partial)
+        raise
+    target.close()
+    source.close()
+    os.replace(partial, path)
+
+    for copied in copy_archives(db, folder):
+        log(f"Copied archive {copied}")
+    for removed in rotate_backups(db, folder, keep):
+        log(f"Removed old backup {removed}")
+    return path
+
+
+def _copy(source, target, pages, sleep, stop, log):
+    """
+    source.backup in throttled steps; BackupBusy once other writers
+    restarted it too often. Connection.backup only sleeps when a step finds
+    the database locked, so the pause between steps is taken here.
+    """
+    stop = stop or threading.Event()
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # Every step copies pages; a step that did not bring remaining down started over
+        if state["remaining"] is not None and remaining >= state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise BackupBusy(f"the database kept changing during the copy "
+                                 f"(restarted {state['restarts']} times); try again later")
+        state["remaining"] = remaining
+        if remaining:
+            stop.wait(sleep)
+        if stop.is_set():
+            raise BackupCancelled()
+
+    source.backup(target, pages=pages, progress=progress, sleep=sleep)
+
+
+# ----------- Scheduler -----------
+class BackupScheduler:
+    """
+    Makes a backup every interval seconds on a background thread. The first
+    one waits until the newest existing backup is interval old (and at least
+    BACKUP_START_DELAY). on_done(path) / on_error(exception) are called on
+    that thread; the default on_error prints to stderr.
+    """
+
+    def __init__(self, db, interval=BACKUP_INTERVAL_MINUTES * 60, folder=None, keep=KEEP_BACKUPS,
+                 on_done=None, on_error=None):
+        self.db = db
+        self.interval = interval
+        self.folder = folder
+        self.keep = keep
+        self.on_done = on_done
+        self.on_error = on_error or (lambda e: print(f"Backup failed: {e}", file=sys.stderr))
+        self.last_backup = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_environment(cls, db, **kwargs):
+        """A scheduler with ATTENDANCE_BACKUP_MINUTES' interval, or None if that is 0."""
+        try:
+            minutes = float(os.environ.get(BACKUP_ENV_VAR, BACKUP_INTERVAL_MINUTES))
+        except ValueError:
+            minutes = BACKUP_INTERVAL_MINUTES
+        return cls(db, minutes * 60, **kwargs) if minutes > 0 else None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="attendance-backup", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Cancel a running backup and wait (at most timeout seconds) for the thread to end."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _first_delay(self):
+        backups = list_backups(self.db, self.folder)
+        age = time.time() - os.path.getmtime(backups[-1]) if backups else self.interval
+        return max(BACKUP_START_DELAY, self.interval - age)
+
+    def _run(self):
+        delay = self._first_delay()
+        while not self._stop.wait(delay):
+            try:
+                self.last_backup = backup_database(self.db, self.folder, self.keep, stop=self._stop)
+            except BackupCancelled:
+                break
+            except Exception as e:
+                self.last_error = e
+                self.on_error(e)
+            else:
+                if self.on_done:
+                    self.on_done(self.last_backup)
+            delay = self.interval
+        self.db.close_thread()
@@ -0,0 +1,2 @@
+# Benchmarks and stress tests for the attendance database layer.
+# Run the modules with "python -m benchmarks.<name>" from the project folder.
@@ -0,0 +1,167 @@
+# ========================= load_api.py =========================
+# Load generator for apiserver.py: "9:00 am, every tablet on campus marks".
+#
+# Opens --clients keep-alive connections that each send requests back to
+# back for --seconds: mostly single POST /mark calls for random students,
+# plus a share of GET /daily reads (--read-ratio). Reports requests/sec and
+# p50/p99 latency per endpoint, and how many commits the server's writer
+# used for all those marks (group commit).
+#
+#   python -m benchmarks.load_api                       # starts its own server on a temp database
+#   python -m benchmarks.load_api --url http://127.0.0.1:8765 --students 2000
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.stress_concurrency import percentile, prepare_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ----------- Client -----------
+class Client:
+    """One keep-alive HTTP/1.1 connection sending JSON requests."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+        status_line, _, headers = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").partition("\r\n")
+        length = 0
+        for line in headers.split("\r\n"):
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        data = await self.reader.readexactly(length)
+        return int(status_line.split(" ", 2)[1]), json.loads(data)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+async def run_client(host, port, seed, args, deadline, results):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    await client.connect()
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < args.read_ratio:
+                kind, method, path, payload = "daily", "GET", f"/daily?date={args.date}", None
+            else:
+                payload = {"roll_no": rng.randint(1, args.students),
+                           "status": rng.choice(("Present", "Present", "Present", "Absent", "Leave")),
+                           "date": args.date}
+                kind, method, path = "mark", "POST", "/mark"
+            t0 = time.perf_counter()
+            status, _ = await client.request(method, path, payload)
+            elapsed = time.perf_counter() - t0
+            latencies, errors = results.setdefault(kind, ([], [0]))
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+    finally:
+        client.close()
+
+
+# ----------- Server Process -----------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(path, port):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "apiserver.py"), "--db", path, "--port", str(port)],
+                            cwd=ROOT)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("API server did not start")
+
+
+# ----------- Report -----------
+def describe(kind, latencies, errors, seconds):
+    ms = [v * 1000 for v in latencies]
+    return (f"{kind:<6} requests={len(ms):<7} req/s={len(ms) / seconds:9.1f}  "
+            f"p50={percentile(ms, 50):7.2f} ms  p99={percentile(ms, 99):7.2f} ms  "
+            f"max={max(ms, default=0):7.2f} ms  errors={errors}")
+
+
+async def run(host, port, args):
+    results = {}
+    deadline = time.perf_counter() + args.seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, args.seed + i, args, deadline, results)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    client = Client(host, port)
+    await client.connect()
+    _, stats = await client.request("GET", "/stats")
+    client.close()
+
+    total = sum(len(latencies) for latencies, _ in results.values())
+    print(f"clients={args.clients} seconds={elapsed:.1f} read-ratio={args.read_ratio:g} server={host}:{port}")
+    for kind, (latencies, errors) in sorted(results.items()):
+        print(describe(kind, latencies, errors[0], elapsed))
+    print(f"total  requests={total:<7} req/s={total / elapsed:9.1f}")
+    if stats.get("write_batches"):
+        print(f"writer: {stats['writes']} writes in {stats['write_batches']} commits "
+              f"({stats['writes'] / stats['write_batches']:.1f} per commit)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the attendance JSON API")
+    parser.add_argument("--url", help="running server, e.g. http://127.0.0.1:8765 (default: start one)")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--read-ratio", type=float, default=0.1, help="share of GET /daily requests")
+    parser.add_argument("--date", default=datetime.date.today().strftime("%Y-%m-%d"))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="attendance-load-"), "load.db")
+        prepare_database(path, args.students, wal=True)
+        host, port = "127.0.0.1", free_port()
+        proc = start_server(path, port)
+    try:
+        asyncio.run(run(host, port, args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# ========================= stress_concurrency.py =========================
+# Multi-process stress test for several app instances sharing one database.
+#
+# Writer processes mark random batches of students, deliberately holding
+# each write transaction open for --hold-ms, while reader processes run the
+# report queries and time every read. In WAL mode readers never wait for a
+# writer, so no read should take anywhere near --hold-ms; in the default
+# rollback-journal mode they do. In neither mode may a write fail with
+# "database is locked": a writer waits its turn. Writers pause
+# --pause-ms between transactions, as real instances do; one that takes the
+# lock again the instant it commits can starve the others. Compare:
+#
+#   python -m benchmarks.stress_concurrency --wal
+#   python -m benchmarks.stress_concurrency --no-wal
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from database import Database, setup_database
+
+
+# ----------- Setup -----------
+def prepare_database(path, students, wal):
+    if os.path.exists(path):
+        os.remove(path)
+    db = Database(path, wal=wal)
+    setup_database(db)
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO students (roll_no, name) VALUES (?, ?)",
+                         [(roll, f"Student {roll}") for roll in range(1, students + 1)])
+    db.close()
+
+
+# ----------- Workers -----------
+def writer(path, wal, seed, students, hold, pause, deadline, results):
+    rng = random.Random(seed)
+    db = Database(path, wal=wal)
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        rolls = rng.sample(range(1, students + 1), 25)
+        status = rng.choice(("Present", "Absent", "Leave"))
+        date = f"2025-10-{rng.randint(1, 28):02d}"
+        t0 = time.perf_counter()
+        try:
+            with db.transaction():
+                db.mark_students(rolls, status, date)
+                time.sleep(hold)        # a writer that keeps its transaction open
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(pause)
+    db.close()
+    results.put(("write", latencies, errors))
+
+
+def reader(path, wal, seed, deadline, results):
+    rng = random.Random(seed)
+    db = Database(path, wal=wal, cache_size=0)  # time the queries, not the read cache
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        day = rng.randint(1, 28)
+        t0 = time.perf_counter()
+        try:
+            if day % 2:
+                db.fetch_monthly_data(10, 2025)
+            else:
+                db.daily_counts(f"2025-10-{day:02d}")
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - t0)
+    db.close()
+    results.put(("read", latencies, errors))
+
+
+# ----------- Report -----------
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def describe(kind, latencies, errors, seconds):
+    ms = [v * 1000 for v in latencies]
+    return (f"{kind:<6} ops={len(ms):<7} ops/s={len(ms) / seconds:9.1f}  "
+            f"p50={percentile(ms, 50):7.2f} ms  p99={percentile(ms, 99):7.2f} ms  "
+            f"max={max(ms, default=0):7.2f} ms  mean={statistics.fmean(ms) if ms else 0:7.2f} ms  "
+            f"locked-errors={errors}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Readers vs writers stress test on a shared database")
+    parser.add_argument("--wal", dest="wal", action="store_true", default=True, help="use WAL mode (default)")
+    parser.add_argument("--no-wal", dest="wal", action="store_false", help="use the rollback journal")
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--hold-ms", type=float, default=100.0, help="time each writer keeps its transaction open")
+    parser.add_argument("--pause-ms", type=float, default=10.0, help="time between a writer's transactions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="database file (default: a fresh temporary file)")
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="attendance-stress-"), "stress.db")
+    prepare_database(path, args.students, args.wal)
+
+    results = multiprocessing.Queue()
+    deadline = time.time() + args.seconds + 0.5
+    hold = args.hold_ms / 1000
+    pause = args.pause_ms / 1000
+    procs = [multiprocessing.Process(target=writer, args=(path, args.wal, args.seed + i, args.students,
+                                                          hold, pause, deadline, results))
+             for i in range(args.writers)]
+    procs += [multiprocessing.Process(target=reader, args=(path, args.wal, args.seed + 1000 + i, deadline, results))
+              for i in range(args.readers)]
+    for proc in procs:
+        proc.start()
+
+    collected = {"write": ([], 0), "read": ([], 0)}
+    for _ in procs:
+        kind, latencies, errors = results.get()
+        total, errs = collected[kind]
+        collected[kind] = (total + latencies, errs + errors)
+    for proc in procs:
+        proc.join()
+
+    reads = collected["read"][0]
+    blocked = sum(1 for v in reads if v * 1000 >= args.hold_ms) if args.hold_ms > 0 else 0
+    print(f"journal={'wal' if args.wal else 'delete'} writers={args.writers} readers={args.readers} "
+          f"hold={args.hold_ms:g} ms db={path}")
+    print(describe("write", *collected["write"], args.seconds))
+    print(describe("read", *collected["read"], args.seconds))
+    print(f"reads slower than the writer hold time: {blocked} of {len(reads)}")
+    locked = collected["write"][1] + collected["read"][1]
+    print(f"operations that gave up with 'database is locked': {locked}")
+    return 0 if locked == 0 and (not args.wal or blocked == 0) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# ========================= suite.py =========================
+# Timing suite for the hot paths, with JSON results to compare commits.
+#
+# Generates a synthetic database (benchmarks/synthetic.py), times the core
+# operations a teacher triggers every day and writes the timings as JSON:
+#
+#   python -m benchmarks.suite --students 2000 --days 120 --out before.json
+#   ... change something ...
+#   python -m benchmarks.suite --students 2000 --days 120 --out after.json --compare before.json
+#   python -m benchmarks.suite --students 10000 --classes 20     # also time one section's reports
+#
+# --compare prints the change in median time per benchmark and exits with
+# status 1 if any benchmark got slower than --threshold (default 20%).
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import DEFAULT_MIX, DEFAULT_START, generate, parse_mix
+from database import Database, inclusive_range
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ----------- Timing -----------
+def measure(func, repeat, setup=None):
+    """Run func() `repeat` times (setup(i) before each run, untimed). Returns timings in ms."""
+    timings = []
+    for i in range(repeat):
+        args = (setup(i),) if setup else ()
+        t0 = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def summarize(timings, rows=None):
+    result = {
+        "runs": len(timings),
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+    if rows is not None:
+        result["rows"] = rows
+    return result
+
+
+# ----------- Benchmarks -----------
+def database_benchmarks(db, dates, students, repeat):
+    mid = dates[len(dates) // 2]
+    year, month = int(mid[:4]), int(mid[5:7])
+    roll = max(1, students // 2)
+    results = {}
+
+    def timed(name, func):
+        rows = func()
+        results[name] = summarize(measure(func, repeat), len(rows) if rows is not None else None)
+
+    timed("load_students", lambda: db.roster_with_status(mid))
+    timed("load_students_page", lambda: db.roster_page(mid, limit=200))
+    timed("fetch_daily_data", lambda: db.fetch_daily_data(mid))
+    timed("daily_counts", lambda: [db.daily_counts(mid)])
+    timed("daily_snapshot", lambda: db.daily_snapshot(mid).rows)
+    timed("fetch_monthly_data", lambda: db.fetch_monthly_data(month, year))
+    timed("fetch_student_records", lambda: db.fetch_student_records(roll, month, year))
+    timed("fetch_range_data", lambda: db.fetch_range_data(*inclusive_range(dates[0], dates[-1]), (5, 6)))
+
+    # Every run marks a fresh day after the generated range, so it really inserts
+    last = datetime.date.fromisoformat(dates[-1])
+    fresh = [(last + datetime.timedelta(days=i + 1)).strftime("%Y-%m-%d") for i in range(repeat)]
+    results["mark_all_present"] = summarize(measure(db.mark_all_present, repeat, setup=fresh.__getitem__),
+                                            students)
+    # ... and once more on days that are already marked Present (status flips to Absent)
+    results["mark_all_update"] = summarize(measure(lambda d: db.mark_all("Absent", d), repeat,
+                                                   setup=fresh.__getitem__), students)
+    return results, (mid, month, year, roll)
+
+
+def section_benchmarks(db, dates, params, repeat):
+    """The same reads and Mark All limited to the first class section."""
+    mid, month, year, _ = params
+    class_id = db.classes()[0][0]
+    results = {}
+
+    def timed(name, func):
+        rows = func()
+        results[name] = summarize(measure(func, repeat), len(rows))
+
+    timed("section_roster_page", lambda: db.roster_page(mid, limit=200, class_id=class_id))
+    timed("section_daily_snapshot", lambda: db.daily_snapshot(mid, class_id).rows)
+    timed("section_monthly_data", lambda: db.fetch_monthly_data(month, year, class_id))
+    timed("section_range_data", lambda: db.fetch_range_data(*inclusive_range(dates[0], dates[-1]), (5, 6),
+                                                            class_id=class_id))
+
+    last = datetime.date.fromisoformat(dates[-1])
+    fresh = [(last + datetime.timedelta(days=repeat + i + 1)).strftime("%Y-%m-%d") for i in range(repeat)]
+    results["section_mark_all"] = summarize(measure(lambda d: db.mark_all_present(d, class_id), repeat,
+                                                    setup=fresh.__getitem__))
+    return results
+
+
+def analytics_benchmarks(db, dates, repeat):
+    """Load the whole generated period into the analytics matrix and time the queries on it."""
+    from analytics import AttendanceMatrix
+
+    start, end = inclusive_range(dates[0], dates[-1])
+    results = {"analytics_load": summarize(measure(lambda: AttendanceMatrix.load(db, start, end), repeat))}
+    matrix = AttendanceMatrix.load(db, start, end)
+    for name, func in (("analytics_streaks", matrix.absence_streaks),
+                       ("analytics_chronic", matrix.chronic_absentees),
+                       ("analytics_weekdays", matrix.weekday_absence_rates),
+                       ("analytics_rankings", matrix.rankings)):
+        results[name] = summarize(measure(func, repeat), len(func()))
+    return results
+
+
+def pdf_benchmarks(db, params, repeat, folder):
+    """Time the three PDF exporters; skipped when reportlab is not installed."""
+    try:
+        from pdfreports import export_daily_pdf, export_month_pdf, export_student_pdf
+    except ImportError as e:
+        return {name: {"skipped": str(e)} for name in ("export_daily_pdf", "export_month_pdf", "export_student_pdf")}
+
+    mid, month, year, roll = params
+    daily = db.daily_snapshot(mid)
+    monthly = db.fetch_monthly_data(month, year)
+    records = db.fetch_student_records(roll, month, year)
+    return {
+        "export_daily_pdf": summarize(measure(lambda: export_daily_pdf(daily, folder=folder), repeat),
+                                      len(daily.rows)),
+        "export_month_pdf": summarize(measure(lambda: export_month_pdf(month, year, monthly, folder=folder),
+                                              repeat), len(monthly)),
+        "export_student_pdf": summarize(measure(lambda: export_student_pdf(roll, "Student", month, year, records,
+                                                                           folder=folder), repeat), len(records)),
+    }
+
+
+# ----------- Results -----------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print median changes against a baseline results dict. Returns the names that regressed."""
+    regressed = []
+    print(f"{'benchmark':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name, {})
+        if "median_ms" not in current or "median_ms" not in before:
+            continue
+        change = (current["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressed.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<24}{before['median_ms']:>10.2f}ms{current['median_ms']:>10.2f}ms{change:>+10.1%}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the core database and PDF operations")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--classes", type=int, default=1, help="split the students into this many sections")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--no-pdf", action="store_true", help="skip the PDF exporters")
+    parser.add_argument("--out", help="write results JSON here (default: print it)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before --compare fails")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="attendance-bench-")
+    try:
+        path = os.path.join(workdir, "bench.db")
+        t0 = time.perf_counter()
+        dates = generate(path, args.students, args.days, args.mix, DEFAULT_START, seed=args.seed,
+                         classes=args.classes)
+        generate_s = time.perf_counter() - t0
+
+        # The read cache would turn every repeat after the first into a dictionary lookup
+        db = Database(path, wal=False, cache_size=0)
+        try:
+            benchmarks, params = database_benchmarks(db, dates, args.students, args.repeat)
+            benchmarks.update(analytics_benchmarks(db, dates, args.repeat))
+            if args.classes > 1:
+                benchmarks.update(section_benchmarks(db, dates, params, args.repeat))
+            if not args.no_pdf:
+                benchmarks.update(pdf_benchmarks(db, params, args.repeat, os.path.join(workdir, "pdf")))
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "students": args.students,
+            "classes": args.classes,
+            "days": len(dates),
+            "mix": args.mix,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "generate_s": round(generate_s, 3),
+        },
+        "benchmarks": benchmarks,
+    }
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
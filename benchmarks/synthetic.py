@@ -0,0 +1,107 @@
+# ========================= synthetic.py =========================
+# Synthetic roster and attendance generator for benchmarks.
+#
+# Fills a database with N students x D school days, each student's status
+# drawn from a configurable mix, optionally split into equal class sections
+# (contiguous roll number blocks). The same seed always gives the same data,
+# so runs on different commits measure the same workload:
+#
+#   python -m benchmarks.synthetic bench.db --students 2000 --days 120 --mix present=85,absent=10,leave=5
+#   python -m benchmarks.synthetic bench.db --students 10000 --classes 20
+
+import argparse
+import datetime
+import os
+import random
+import sys
+
+from database import DEFAULT_CLASS_ID, Database, setup_database
+
+DEFAULT_MIX = {"Present": 85, "Absent": 10, "Leave": 5}
+DEFAULT_START = datetime.date(2025, 1, 1)
+INSERT_CHUNK = 10000
+
+
+def parse_mix(value):
+    """'present=85,absent=10,leave=5' -> {"Present": 85, "Absent": 10, "Leave": 5}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip().capitalize()] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight, e.g. present=90,absent=10")
+    return mix
+
+
+def school_days(start, days, weekends=False):
+    """The first `days` dates from start, skipping Saturdays and Sundays unless weekends=True."""
+    day = start
+    while days:
+        if weekends or day.weekday() < 5:
+            yield day.strftime("%Y-%m-%d")
+            days -= 1
+        day += datetime.timedelta(days=1)
+
+
+def section_of(roll, students, classes):
+    """class_id of a roll number when students are split into `classes` equal blocks."""
+    return DEFAULT_CLASS_ID + (roll - 1) * classes // max(students, 1)
+
+
+def generate(path, students=1000, days=60, mix=None, start=DEFAULT_START, weekends=False, seed=1, classes=1):
+    """
+    Create a fresh database at path (an existing file is replaced).
+    Returns the list of generated dates.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    mix = mix or DEFAULT_MIX
+    statuses, weights = list(mix), list(mix.values())
+    rng = random.Random(seed)
+    dates = list(school_days(start, days, weekends))
+
+    db = Database(path, wal=False)
+    try:
+        setup_database(db)
+        with db.transaction() as conn:
+            # The first section is the one the migration created
+            conn.executemany("INSERT INTO classes (class_id, name) VALUES (?, ?)",
+                             [(DEFAULT_CLASS_ID + i, f"Section {i + 1}") for i in range(1, classes)])
+            conn.executemany("INSERT INTO students (roll_no, name, class_id) VALUES (?, ?, ?)",
+                             [(roll, f"Student {roll:05d}", section_of(roll, students, classes))
+                              for roll in range(1, students + 1)])
+            rows = []
+            for date in dates:
+                for roll, status in zip(range(1, students + 1), rng.choices(statuses, weights, k=students)):
+                    rows.append((roll, status, date))
+                if len(rows) >= INSERT_CHUNK:
+                    conn.executemany("INSERT INTO attendance (roll_no, status, date) VALUES (?, ?, ?)", rows)
+                    rows = []
+            conn.executemany("INSERT INTO attendance (roll_no, status, date) VALUES (?, ?, ?)", rows)
+        db.execute("ANALYZE")
+    finally:
+        db.close()
+    return dates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic attendance database")
+    parser.add_argument("path", help="database file to create (replaced if it exists)")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=60, help="school days of attendance")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="status weights (default: present=85,absent=10,leave=5)")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=DEFAULT_START)
+    parser.add_argument("--weekends", action="store_true", help="also generate Saturdays and Sundays")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--classes", type=int, default=1, help="class sections to split the students into")
+    args = parser.parse_args(argv)
+
+    dates = generate(args.path, args.students, args.days, args.mix, args.start, args.weekends, args.seed,
+                     args.classes)
+    print(f"{args.path}: {args.students} students in {args.classes} sections x {len(dates)} days "
+          f"({dates[0]} .. {dates[-1]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
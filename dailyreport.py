@@ -1,138 +1,29 @@
 # ========================= dailyreport.py =========================
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import os
 from tkcalendar import DateEntry   # ✅ For calendar date picker
+from database import ALL_SECTIONS, get_db
+from virtualtree import VirtualTree, list_page
+from tasks import TaskRunner, TaskStatusBar
+from diagnostics import timed
 
 
-def open_daily_report():
+def open_daily_report(class_id=None):
     selected_date = tk.StringVar(value=datetime.date.today().strftime("%Y-%m-%d"))
 
-    # -------- Fetch Attendance Data for Specific Date --------
-    def fetch_daily_data(for_date):
-        conn = sqlite3.connect("student.db")
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT s.roll_no, s.name, 
-                   COALESCE((
-                       SELECT a.status 
-                       FROM attendance a 
-                       WHERE a.roll_no = s.roll_no AND a.date = ?
-                       ORDER BY a.id DESC LIMIT 1
-                   ), 'Not Marked') AS status
-            FROM students s
-            ORDER BY s.roll_no
-        """, (for_date,))
-        rows = cur.fetchall()
-        conn.close()
-        return rows
-
-    # -------- Export Daily Report to PDF (With Summary + Dynamic Header) --------
-    def export_to_pdf(data):
-        if not os.path.exists("Daily PDF Folder"):
-            os.makedirs("Daily PDF Folder")
-
-        filename = f"Daily PDF Folder/Daily_Report_{selected_date.get()}.pdf"
-        c = canvas.Canvas(filename, pagesize=A4)
-        width, height = A4
-
-        # --- Calculate Summary Data ---
-        total_students = len(data)
-        total_present = sum(1 for _, _, s in data if s.lower() == "present")
-        total_absent = sum(1 for _, _, s in data if s.lower() == "absent")
-        total_leave = sum(1 for _, _, s in data if s.lower() == "leave")
-
-        def draw_header(y_pos):
-            """Draw table header on each new page"""
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y_pos, "Roll No")
-            c.drawString(150, y_pos, "Name")
-            c.drawString(350, y_pos, "Status")
-
-        # --- Title Section ---
-        c.setFont("Helvetica-Bold", 18)
-        c.drawString(180, height - 50, "Daily Attendance Report Of CS S3")
-
-        # --- Date & Summary Section ---
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 80, f"Date: {selected_date.get()}")
-        c.drawString(50, height - 100, f"Total Students: {total_students}")
-        c.drawString(250, height - 100, f"Present: {total_present}")
-        c.drawString(400, height - 100, f"Absent: {total_absent}")
-        c.drawString(520, height - 100, f"Leave: {total_leave}")
-
-        # --- Table Header ---
-        y = height - 130
-        draw_header(y)
-        y -= 20
-        c.setFont("Helvetica", 11)
-
-        # --- Table Rows ---
-        for roll, name, status in data:
-            c.drawString(50, y, str(roll))
-            c.drawString(150, y, str(name))
-            c.drawString(350, y, str(status))
-            y -= 15
-
-            # --- Page Break ---
-            if y < 60:
-                c.showPage()
-                c.setFont("Helvetica-Bold", 18)
-                c.drawString(180, height - 50, "Daily Attendance Report ")
-                c.setFont("Helvetica", 12)
-                c.drawString(50, height - 80, f"Date: {selected_date.get()}")
-                y = height - 110
-                draw_header(y)
-                y -= 20
-                c.setFont("Helvetica", 11)
-
-        # --- Absent Section ---
-        y -= 30
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "🚫 Absent Students:")
-        y -= 20
-        c.setFont("Helvetica", 11)
-        absent_list = [(r, n) for (r, n, s) in data if s.lower() == "absent"]
-        if absent_list:
-            for roll, name in absent_list:
-                c.drawString(70, y, f"{roll}  -  {name}")
-                y -= 15
-                if y < 60:
-                    c.showPage()
-                    c.setFont("Helvetica-Bold", 18)
-                    c.drawString(180, height - 50, "Daily Attendance Report ")
-                    y = height - 100
-                    c.setFont("Helvetica", 11)
-        else:
-            c.drawString(70, y, "None")
-            y -= 20
-
-        # --- Leave Section ---
-        y -= 20
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "🕒 On Leave:")
-        y -= 20
-        c.setFont("Helvetica", 11)
-        leave_list = [(r, n) for (r, n, s) in data if s.lower() == "leave"]
-        if leave_list:
-            for roll, name in leave_list:
-                c.drawString(70, y, f"{roll}  -  {name}")
-                y -= 15
-                if y < 60:
-                    c.showPage()
-                    c.setFont("Helvetica-Bold", 18)
-                    c.drawString(180, height - 50, "Daily Attendance Report ")
-                    y = height - 100
-                    c.setFont("Helvetica", 11)
-        else:
-            c.drawString(70, y, "None")
-
-        c.save()
-        messagebox.showinfo("Success", f"✅ PDF saved successfully:\n{filename}")
+    # Section picker choices: the whole institution or one section
+    sections = {ALL_SECTIONS: None, **{name: cid for cid, name, _ in get_db().classes()}}
+    selected_section = tk.StringVar(value=next((name for name, cid in sections.items() if cid == class_id),
+                                               ALL_SECTIONS))
+
+    # -------- Fetch Attendance Snapshot for Specific Date --------
+    # Rows, counts and absent/leave lists come from one read; the table, the
+    # summary and the PDF export all use the snapshot currently shown.
+    def fetch_daily_snapshot(for_date, section):
+        return get_db().daily_snapshot(for_date, sections[section])
+
+    shown = {"snapshot": None, "section": None}
 
     # -------- Main Window --------
     win = tk.Toplevel()
@@ -197,6 +88,11 @@ def open_daily_report():
     )
     date_picker.place(x=700, y=25)
 
+    section_picker = ttk.Combobox(header_frame, textvariable=selected_section, values=list(sections),
+                                  state="readonly", width=14, font=("Arial", 11))
+    section_picker.place(x=545, y=25)
+    section_picker.bind("<<ComboboxSelected>>", lambda e: load_data(selected_date.get()))
+
     select_date_btn = tk.Button(
         header_frame,
         text="🔍 Show Date",
@@ -231,21 +127,35 @@ def open_daily_report():
         tree.column(col, anchor="center", width=200 if col != "Name" else 350)
     tree.pack(fill=tk.BOTH, expand=True, padx=25, pady=15)
 
+    # The snapshot query and PDF exports run in the background
+    runner = TaskRunner(win)
+    win.bind("<Destroy>", lambda e: runner.shutdown() if e.widget is win else None)
+
+    # Only the visible pages of the snapshot's rows are kept in the tree
+    grid = VirtualTree(tree, lambda after, before, limit: list_page(
+        shown["snapshot"].rows if shown["snapshot"] else [], after, before, limit))
+
     # -------- Load Data Function --------
+    @timed("Daily: Show Date / Refresh")
     def load_data(for_date=None):
         if not for_date:
             for_date = selected_date.get()
-        data = fetch_daily_data(for_date)
-        tree.delete(*tree.get_children())
-        for row in data:
-            tree.insert("", tk.END, values=row)
         selected_date.set(for_date)
+        section = selected_section.get()
+
+        # Repeated Show/Refresh clicks replace the pending snapshot fetch
+        runner.submit(lambda task: fetch_daily_snapshot(for_date, section),
+                      on_done=lambda snapshot: show_snapshot(snapshot, section),
+                      key="snapshot", label="Loading attendance",
+                      on_error=lambda e: messagebox.showerror("Error", f"Could not load attendance:\n{e}"))
+
+    def show_snapshot(snapshot, section):
+        shown.update(snapshot=snapshot, section=section)
+        grid.reload()
+        total_students, total_present, total_absent, total_leave = snapshot.counts
+        absent_list, leave_list = snapshot.absent, snapshot.leave
 
         # --- Update Summary Counts ---
-        total_students = len(data)
-        total_present = sum(1 for _, _, s in data if s.lower() == "present")
-        total_absent = sum(1 for _, _, s in data if s.lower() == "absent")
-        total_leave = sum(1 for _, _, s in data if s.lower() == "leave")
 
         total_students_lbl.config(text=f"Total Students: {total_students}")
         total_present_lbl.config(text=f"Present: {total_present}")
@@ -256,18 +166,37 @@ def open_daily_report():
         absent_box.delete("1.0", tk.END)
         leave_box.delete("1.0", tk.END)
 
-        for roll, name, status in data:
-            if status.lower() == "absent":
-                absent_box.insert(tk.END, f"{roll}  -  {name}\n")
-            elif status.lower() == "leave":
-                leave_box.insert(tk.END, f"{roll}  -  {name}\n")
+        for roll, name in absent_list:
+            absent_box.insert(tk.END, f"{roll}  -  {name}\n")
+        for roll, name in leave_list:
+            leave_box.insert(tk.END, f"{roll}  -  {name}\n")
 
         if total_absent == 0:
             absent_box.insert(tk.END, "None\n")
         if total_leave == 0:
             leave_box.insert(tk.END, "None\n")
 
-        return data
+    # -------- Export in the background --------
+    @timed("Daily: Export PDF")
+    def handle_export():
+        for_date = selected_date.get()
+        section = selected_section.get()
+        snapshot = shown["snapshot"]
+        if snapshot is not None and (snapshot.date != for_date or shown["section"] != section):
+            snapshot = None
+
+        def export(task):
+            from pdfreports import export_daily_pdf   # reportlab is loaded on first export
+            # Export exactly what is on screen; only query if nothing is loaded yet
+            return export_daily_pdf(snapshot or fetch_daily_snapshot(for_date, section), task.progress,
+                                    class_name=section if sections[section] is not None else None)
+
+        runner.submit(
+            export,
+            on_done=lambda filename: messagebox.showinfo("Success", f"✅ PDF saved successfully:\n{filename}"),
+            on_error=lambda e: messagebox.showerror("Error", f"Could not export PDF:\n{e}"),
+            key="export", label="Exporting PDF"
+        )
 
     # -------- Buttons Section --------
     btn_frame = tk.Frame(win, bg="#eaf4fc")
@@ -275,7 +204,7 @@ def open_daily_report():
 
     tk.Button(
         btn_frame, text="📄 Export to PDF",
-        command=lambda: export_to_pdf(load_data()),
+        command=handle_export,
         bg="#10B981", fg="white",
         font=('Arial', 11, 'bold'),
         width=18, relief=tk.FLAT, cursor="hand2"
@@ -289,5 +218,7 @@ def open_daily_report():
         width=12, relief=tk.FLAT, cursor="hand2"
     ).grid(row=0, column=1, padx=10)
 
+    TaskStatusBar(win, runner, bg="#eaf4fc").pack(pady=(0, 10))
+
     # Load today's data by default
     load_data(selected_date.get())
@@ -0,0 +1,1533 @@
+# ========================= database.py =========================
+# Shared database access layer used by main.py, dailyreport.py and monthlyreport.py.
+#
+# Every window goes through one Database object instead of opening its own
+# sqlite3 connection per click. Each thread gets a single long-lived
+# connection with the PRAGMAs applied once, and because all SQL lives in the
+# constants below the sqlite3 statement cache keeps them prepared between calls.
+#
+# Concurrency mode (several app instances on one shared student.db) is opt-in:
+# set ATTENDANCE_WAL=1 or run "python attendance.py journal wal" once. It uses
+# WAL journaling with synchronous=NORMAL so readers never wait for writers,
+# and short BEGIN IMMEDIATE write transactions retried with jittered backoff.
+#
+# Students belong to one class / section (classes table). Roster, daily and
+# monthly statements take a {scope} condition from class_scope(): one
+# section's students are read through idx_students_class (class_id first),
+# and their marks through the (roll_no, date) and attendance_monthly keys, so
+# a section's report touches only that section's rows.
+#
+# Closed years can be moved out to per-year archive files (archive.py). The
+# report queries below name their tables as {db}attendance / {db}attendance_monthly;
+# Database fills in the schema of the attached archive that holds the date,
+# or joins one branch per source with UNION ALL when a range spans several.
+
+import datetime
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from diagnostics import connection_factory
+from readcache import READ_CACHE_SIZE, ReadCache
+
+DB_PATH = "student.db"
+
+# Applied once per connection, right after it is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout = 10000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",   # ~16 MB page cache kept warm between calls
+)
+
+# Number of prepared statements sqlite3 keeps per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Concurrency mode: extra PRAGMAs and write-lock retry policy
+WAL_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 250",    # short waits; longer contention goes through the retries
+)
+# Another instance can take the write lock again the moment it commits, so a
+# waiting writer may lose several rounds in a row. It keeps retrying for
+# WRITE_TIMEOUT seconds in all, as long as busy_timeout waits in rollback
+# mode and many times the longest write transaction (an IMPORT_BATCH).
+WRITE_TIMEOUT = 10.0
+RETRY_BASE_DELAY = 0.01             # seconds, doubled per attempt
+RETRY_MAX_DELAY = 0.1
+
+# "1" forces WAL on, "0" leaves the journal mode alone, unset follows the database file
+WAL_ENV_VAR = "ATTENDANCE_WAL"
+
+# Archives attached per connection at most (SQLite's default SQLITE_MAX_ATTACHED)
+MAX_ATTACHED = 10
+
+
+# ----------- SQL Statements -----------
+SQL_INSERT_STUDENT = "INSERT INTO students (roll_no, name, class_id) VALUES (?, ?, ?)"
+SQL_UPDATE_STUDENT = "UPDATE students SET roll_no=?, name=? WHERE roll_no=?"
+SQL_DELETE_STUDENT = "DELETE FROM students WHERE roll_no=?"
+SQL_FIND_STUDENT_BY_ROLL = "SELECT roll_no, name FROM students WHERE roll_no = ?"
+
+SQL_ROSTER_WITH_STATUS = """
+    SELECT s.roll_no, s.name, IFNULL(a.status, '') as status
+    FROM students s
+    LEFT JOIN {db}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {scope}
+    ORDER BY s.roll_no
+"""
+
+# Upserts rely on the idx_attendance_unique index on (roll_no, date).
+# Rows that already have the requested status are left untouched.
+SQL_UPSERT_ATTENDANCE = """
+    INSERT INTO attendance (roll_no, status, date) VALUES (?, ?, ?)
+    ON CONFLICT(roll_no, date) DO UPDATE SET status = excluded.status
+    WHERE status IS NOT excluded.status
+"""
+
+SQL_MARK_ALL = """
+    INSERT INTO attendance (roll_no, status, date)
+    SELECT roll_no, ?, ? FROM students WHERE {scope}
+    ON CONFLICT(roll_no, date) DO UPDATE SET status = excluded.status
+    WHERE status IS NOT excluded.status
+"""
+
+# (rows that will be inserted, rows whose status will change) for SQL_MARK_ALL
+SQL_COUNT_MARK_ALL = """
+    SELECT IFNULL(SUM(a.id IS NULL), 0),
+           IFNULL(SUM(a.id IS NOT NULL AND a.status IS NOT ?), 0)
+    FROM students s
+    LEFT JOIN attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {scope}
+"""
+
+SQL_ROSTER_ROWS = """
+    SELECT s.roll_no, s.name, IFNULL(a.status, '') as status
+    FROM students s
+    LEFT JOIN {db}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE s.roll_no IN ({})
+    ORDER BY s.roll_no
+"""
+
+SQL_STATUSES_FOR_ROLLS = "SELECT roll_no, status FROM attendance WHERE date = ? AND roll_no IN ({})"
+SQL_EXISTING_ROLLS = "SELECT roll_no FROM students WHERE roll_no IN ({})"
+
+# Max number of "?" placeholders used in one IN (...) list
+IN_CHUNK_SIZE = 500
+
+# idx_attendance_unique guarantees at most one row per (roll_no, date)
+SQL_DAILY_DATA = """
+    SELECT s.roll_no, s.name, IFNULL(a.status, 'Not Marked') AS status
+    FROM students s
+    LEFT JOIN {db}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {scope}
+    ORDER BY s.roll_no
+"""
+
+# Marked students per status for one date (covering date index, or the
+# section's students and their (roll_no, date) keys)
+SQL_DAILY_STATUS_COUNTS = """
+    SELECT LOWER(a.status), COUNT(*)
+    FROM students s
+    JOIN {db}attendance a ON a.roll_no = s.roll_no AND a.date = ?
+    WHERE {scope}
+    GROUP BY LOWER(a.status)
+"""
+
+# (total students, present, absent, leave) for one date
+SQL_DAILY_COUNTS = """
+    SELECT COUNT(*),
+           IFNULL(SUM(LOWER(a.status) = 'present'), 0),
+           IFNULL(SUM(LOWER(a.status) = 'absent'), 0),
+           IFNULL(SUM(LOWER(a.status) = 'leave'), 0)
+    FROM students s
+    LEFT JOIN {db}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {scope}
+"""
+
+SQL_DAILY_WITH_STATUS = """
+    SELECT s.roll_no, s.name
+    FROM {db}attendance a
+    JOIN students s ON s.roll_no = a.roll_no
+    WHERE a.date = ? AND LOWER(a.status) = ? AND {scope}
+    ORDER BY s.roll_no
+"""
+
+# Date filters are half-open ranges (start <= date < end) on the raw column so
+# the idx_attendance_date / idx_attendance_unique indexes can be used.
+
+# Per-student counts for any date range (term, semester, year) in one
+# statement: whole months are read from attendance_monthly, the days of the
+# partial months at either end from attendance, and skipped days (excluded
+# weekdays, holidays) inside the whole months are subtracted again with
+# index seeks. {counts} is one SQL_RANGE_COUNTS per source (see
+# Database._read_range_data); its {edge_skipped} / {inner_skipped} are "?" lists
+# and {members} limits it to the section's roll numbers (SCOPE_MEMBERS). The
+# two partial months are separate branches, each one plain date range, so a
+# section's days are read with (roll_no, date) seeks on idx_attendance_unique.
+SQL_RANGE_DATA = """
+    SELECT s.roll_no, s.name,
+           IFNULL(c.presents, 0) as presents,
+           IFNULL(c.absents, 0) as absents,
+           IFNULL(c.leaves, 0) as leaves,
+           IFNULL(c.total_days, 0) as total_days
+    FROM students s
+    LEFT JOIN (
+        SELECT roll_no, SUM(presents) as presents, SUM(absents) as absents,
+               SUM(leaves) as leaves, SUM(total) as total_days
+        FROM ({counts})
+        GROUP BY roll_no
+    ) c ON s.roll_no = c.roll_no
+    WHERE {scope}
+    ORDER BY s.roll_no
+"""
+
+SQL_RANGE_COUNTS = """
+            SELECT roll_no, presents, absents, leaves, total
+            FROM {db}attendance_monthly
+            WHERE (year, month) BETWEEN (?, ?) AND (?, ?) AND {members}
+            UNION ALL
+            SELECT roll_no, status IS 'Present', status IS 'Absent', status IS 'Leave', status IS NOT NULL
+            FROM {db}attendance
+            WHERE date >= ? AND date < ? AND date NOT IN ({edge_skipped}) AND {members}
+            UNION ALL
+            SELECT roll_no, status IS 'Present', status IS 'Absent', status IS 'Leave', status IS NOT NULL
+            FROM {db}attendance
+            WHERE date >= ? AND date < ? AND date NOT IN ({edge_skipped}) AND {members}
+            UNION ALL
+            SELECT roll_no, -(status IS 'Present'), -(status IS 'Absent'), -(status IS 'Leave'), -(status IS NOT NULL)
+            FROM {db}attendance
+            WHERE date IN ({inner_skipped}) AND {members}
+"""
+
+# Range queries are written per source; Database._union joins the sources
+# with UNION ALL and appends the ORDER BY (by column number, valid for both)
+SQL_STUDENT_RANGE_RECORDS = """
+    SELECT date, status
+    FROM {db}attendance
+    WHERE roll_no = ? AND date >= ? AND date < ?
+"""
+# Day-wise records of a page of students (after < roll_no <= upto) in a range,
+# ordered for grouping; iter_class_records pages through the class by roll_no
+SQL_CLASS_RANGE_RECORDS = """
+    SELECT s.roll_no, s.name, a.date, a.status
+    FROM students s
+    JOIN {db}attendance a ON a.roll_no = s.roll_no
+    WHERE {scope} AND s.roll_no > ? AND s.roll_no <= ? AND a.date >= ? AND a.date < ?
+"""
+# Last roll_no of the next page of at most ? students after roll_no ? (NULL at the end)
+SQL_CLASS_PAGE_END = """
+    SELECT MAX(roll_no) FROM (
+        SELECT s.roll_no FROM students s WHERE {scope} AND s.roll_no > ? ORDER BY s.roll_no LIMIT ?
+    )
+"""
+CLASS_PAGE = 500            # students per page of iter_class_records
+
+SQL_COUNT_STUDENTS_WITH_RECORDS = "SELECT COUNT(*) FROM students s WHERE {scope} AND ({exists})"
+SQL_STUDENT_HAS_RECORDS = "EXISTS (SELECT 1 FROM {db}attendance a WHERE a.roll_no = s.roll_no AND a.date >= ? AND a.date < ?)"
+
+# ----------- Export -----------
+# One page of the marks of a range after the (date, roll_no) key ?, ? with the
+# student's name and section, in the order of idx_attendance_date (a seek and
+# no sort step). Marks of deleted students keep an empty name.
+SQL_EXPORT_ROWS = """
+    SELECT a.date, a.roll_no, s.name, c.name, a.status
+    FROM {db}attendance a
+    LEFT JOIN students s ON s.roll_no = a.roll_no
+    LEFT JOIN classes c ON c.class_id = s.class_id
+    WHERE (a.date, a.roll_no) > (?, ?) AND a.date < ? AND {scope}
+    ORDER BY a.date, a.roll_no
+    LIMIT ?
+"""
+# Unary + keeps a section's export on idx_attendance_date: driving it from
+# idx_students_class would need a sort of the whole range before the first row
+SCOPE_EXPORT = "+s.class_id = ?"
+EXPORT_BATCH = 5000         # rows per page of iter_attendance
+
+# ----------- Analytics Matrix -----------
+SQL_ALL_STUDENTS = "SELECT roll_no, name FROM students ORDER BY roll_no"
+# Distinct marked dates in a range: one idx_attendance_date seek per date
+# instead of scanning every row of the range
+SQL_RANGE_DATES = """
+    WITH RECURSIVE days(date) AS (
+        SELECT MIN(date) FROM {db}attendance WHERE date >= ?1 AND date < ?2
+        UNION ALL
+        SELECT (SELECT MIN(date) FROM {db}attendance WHERE date > days.date AND date < ?2)
+        FROM days WHERE days.date IS NOT NULL
+    )
+    SELECT date FROM days WHERE date IS NOT NULL
+"""
+# One day's marks as a single comma-separated string of roll_no * 4 + status
+# code (codes as in analytics.py): one value to hand over to Python per day
+# instead of one row per student
+SQL_DAY_STATUS_CODES = """
+    SELECT group_concat(roll_no * 4 + CASE LOWER(status) WHEN 'present' THEN 1 WHEN 'absent' THEN 2
+                                                         WHEN 'leave' THEN 3 ELSE 0 END)
+    FROM {db}attendance
+    WHERE date = ?
+"""
+
+# ----------- Monthly Summary -----------
+# attendance_monthly holds one row of counts per (roll_no, year, month). The
+# triggers below keep it current for every write to attendance, whatever code
+# path makes it, so the monthly report is a primary-key lookup per student.
+# Month ranges are filtered as (year, month) row values, which can use the
+# primary key (per student) or idx_attendance_monthly_month (whole school).
+SQL_CREATE_MONTHLY_SUMMARY = """
+    CREATE TABLE IF NOT EXISTS attendance_monthly (
+        roll_no INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        presents INTEGER NOT NULL DEFAULT 0,
+        absents INTEGER NOT NULL DEFAULT 0,
+        leaves INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (roll_no, year, month)
+    ) WITHOUT ROWID
+"""
+SQL_CREATE_MONTHLY_MONTH_INDEX = "CREATE INDEX IF NOT EXISTS idx_attendance_monthly_month ON attendance_monthly (year, month)"
+
+_SUMMARY_ADD = """
+        INSERT INTO attendance_monthly (roll_no, year, month, presents, absents, leaves, total)
+        VALUES (NEW.roll_no, CAST(substr(NEW.date, 1, 4) AS INTEGER), CAST(substr(NEW.date, 6, 2) AS INTEGER),
+                NEW.status IS 'Present', NEW.status IS 'Absent', NEW.status IS 'Leave', NEW.status IS NOT NULL)
+        ON CONFLICT(roll_no, year, month) DO UPDATE SET
+            presents = presents + excluded.presents,
+            absents = absents + excluded.absents,
+            leaves = leaves + excluded.leaves,
+            total = total + excluded.total;
+"""
+
+_SUMMARY_REMOVE = """
+        UPDATE attendance_monthly SET
+            presents = presents - (OLD.status IS 'Present'),
+            absents = absents - (OLD.status IS 'Absent'),
+            leaves = leaves - (OLD.status IS 'Leave'),
+            total = total - (OLD.status IS NOT NULL)
+        WHERE roll_no = OLD.roll_no
+          AND year = CAST(substr(OLD.date, 1, 4) AS INTEGER)
+          AND month = CAST(substr(OLD.date, 6, 2) AS INTEGER);
+"""
+
+SQL_MONTHLY_SUMMARY_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_insert
+    AFTER INSERT ON attendance
+    BEGIN {_SUMMARY_ADD}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_delete
+    AFTER DELETE ON attendance
+    BEGIN {_SUMMARY_REMOVE}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_update
+    AFTER UPDATE OF roll_no, status, date ON attendance
+    BEGIN {_SUMMARY_REMOVE} {_SUMMARY_ADD}
+    END
+    """,
+)
+
+SQL_REBUILD_MONTHLY_SUMMARY = """
+    INSERT INTO attendance_monthly (roll_no, year, month, presents, absents, leaves, total)
+    SELECT roll_no,
+           CAST(substr(date, 1, 4) AS INTEGER),
+           CAST(substr(date, 6, 2) AS INTEGER),
+           SUM(status IS 'Present'),
+           SUM(status IS 'Absent'),
+           SUM(status IS 'Leave'),
+           COUNT(status)
+    FROM attendance
+    GROUP BY 1, 2, 3
+"""
+
+SQL_MONTHLY_DATA = """
+    SELECT s.roll_no, s.name,
+           IFNULL(m.presents, 0) as presents,
+           IFNULL(m.absents, 0) as absents,
+           IFNULL(m.leaves, 0) as leaves,
+           IFNULL(m.total, 0) as total_days
+    FROM students s
+    LEFT JOIN {db}attendance_monthly m
+      ON m.roll_no = s.roll_no AND m.year = ? AND m.month = ?
+    WHERE {scope}
+    ORDER BY s.roll_no
+"""
+
+# Rollup of whole months, e.g. a term or a year, first (year, month) to last inclusive.
+# {months} is one SQL_MONTHS_ROWS per source.
+SQL_MONTHS_SUMMARY = """
+    SELECT s.roll_no, s.name,
+           IFNULL(m.presents, 0) as presents,
+           IFNULL(m.absents, 0) as absents,
+           IFNULL(m.leaves, 0) as leaves,
+           IFNULL(m.total, 0) as total_days
+    FROM students s
+    LEFT JOIN (
+        SELECT roll_no, SUM(presents) as presents, SUM(absents) as absents,
+               SUM(leaves) as leaves, SUM(total) as total
+        FROM ({months})
+        GROUP BY roll_no
+    ) m ON m.roll_no = s.roll_no
+    WHERE {scope}
+    ORDER BY s.roll_no
+"""
+
+SQL_MONTHS_ROWS = """
+            SELECT roll_no, presents, absents, leaves, total
+            FROM {db}attendance_monthly
+            WHERE (year, month) BETWEEN (?, ?) AND (?, ?) AND {members}
+"""
+
+
+# ----------- Classes / Sections -----------
+# Every student belongs to one section. Roll numbers stay unique across the
+# whole institution (attendance is keyed by roll_no). Students added without
+# a section go to the first one, created by the migration with the name the
+# daily report used to hard-code.
+DEFAULT_CLASS_ID = 1
+DEFAULT_CLASS_NAME = "CS S3"
+ALL_SECTIONS = "All Sections"       # section pickers' label for class_id None
+
+SQL_CREATE_CLASSES = """
+    CREATE TABLE IF NOT EXISTS classes (
+        class_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE
+    )
+"""
+SQL_ADD_STUDENT_CLASS = f"""
+    ALTER TABLE students ADD COLUMN class_id INTEGER NOT NULL DEFAULT {DEFAULT_CLASS_ID} REFERENCES classes(class_id)
+"""
+# Leads with class_id and covers the roster columns: one section's students
+# in roll_no order without touching the table
+SQL_CREATE_STUDENT_CLASS_INDEX = "CREATE INDEX IF NOT EXISTS idx_students_class ON students (class_id, roll_no, name)"
+
+SQL_LIST_CLASSES = """
+    SELECT c.class_id, c.name, COUNT(s.roll_no)
+    FROM classes c
+    LEFT JOIN students s ON s.class_id = c.class_id
+    GROUP BY c.class_id
+    ORDER BY c.name
+"""
+SQL_FIND_CLASS = "SELECT class_id, name FROM classes WHERE name = ? OR class_id = ?"
+SQL_INSERT_CLASS = "INSERT INTO classes (name) VALUES (?)"
+SQL_RENAME_CLASS = "UPDATE classes SET name = ? WHERE class_id = ?"
+SQL_MOVE_STUDENT = "UPDATE students SET class_id = ? WHERE roll_no = ?"
+
+# {scope} of a statement limited to a section's rows
+SCOPE_CLASS = "class_id = ?"
+SCOPE_MEMBERS = "roll_no IN (SELECT roll_no FROM students WHERE class_id = ?)"
+
+
+def class_scope(class_id, condition=SCOPE_CLASS):
+    """
+    The {scope} / {members} condition for class_id: condition when limited to
+    one section, otherwise an always-true one. Both take exactly one
+    parameter (the class_id, None for the whole institution), so parameter
+    lists do not depend on the scope.
+    """
+    return condition if class_id is not None else "? IS NULL"
+
+
+# ----------- Bulk Import -----------
+# importer.py validates the rows; these write them with one executemany per
+# transaction of IMPORT_BATCH rows. The attendance_monthly and students_fts
+# triggers fire for every row, as for any other write. Attendance reuses
+# SQL_UPSERT_ATTENDANCE: a day already marked takes the imported status.
+# A student row without a section (?3 NULL) keeps an existing student's.
+SQL_UPSERT_STUDENT = f"""
+    INSERT INTO students (roll_no, name, class_id) VALUES (?1, ?2, IFNULL(?3, {DEFAULT_CLASS_ID}))
+    ON CONFLICT(roll_no) DO UPDATE SET name = excluded.name, class_id = IFNULL(?3, class_id)
+    WHERE name IS NOT excluded.name OR class_id IS NOT IFNULL(?3, class_id)
+"""
+IMPORT_BATCH = 50000        # rows per import transaction
+
+
+# ----------- Archives -----------
+# attendance_archives registers the per-year archive files made by archive.py:
+# every date in start <= date < end lives in that file instead of the hot
+# attendance table. Paths are relative to the database file's folder.
+SQL_CREATE_ARCHIVES = """
+    CREATE TABLE IF NOT EXISTS attendance_archives (
+        name TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        start TEXT NOT NULL,
+        end TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        created TEXT NOT NULL
+    )
+"""
+SQL_LIST_ARCHIVES = "SELECT name, path, start, end, rows, created FROM attendance_archives ORDER BY start"
+SQL_ARCHIVES_IN_RANGE = "SELECT name, path, start, end FROM attendance_archives WHERE start < ? AND end > ? ORDER BY start"
+SQL_REGISTER_ARCHIVE = """
+    INSERT INTO attendance_archives (name, path, start, end, rows, created) VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def archive_schema(name):
+    """Schema name an archive is attached under, e.g. archive_2024_25."""
+    return "archive_" + re.sub(r"\W", "_", name)
+
+
+class ArchivedDateError(sqlite3.IntegrityError):
+    """A write to a date that has been moved to a (read-only) archive."""
+
+
+class UnknownStudentError(sqlite3.IntegrityError):
+    """A mark for a roll_no that has no student."""
+
+
+# ----------- Student Search -----------
+# students_fts is a trigram full-text index over students.name (external
+# content: it stores only the index, the names stay in students). The
+# triggers keep it in sync with every insert, rename and delete, whatever code
+# path makes them. Trigram matching needs at least 3 characters; shorter name
+# queries use a prefix LIKE on the NOCASE name index, and roll number queries
+# become primary-key ranges.
+SQL_CREATE_STUDENTS_FTS = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS students_fts
+    USING fts5(name, content='students', content_rowid='roll_no', tokenize='trigram')
+"""
+
+SQL_STUDENTS_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_insert
+    AFTER INSERT ON students
+    BEGIN
+        INSERT INTO students_fts (rowid, name) VALUES (NEW.roll_no, NEW.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_delete
+    AFTER DELETE ON students
+    BEGIN
+        INSERT INTO students_fts (students_fts, rowid, name) VALUES ('delete', OLD.roll_no, OLD.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_update
+    AFTER UPDATE OF roll_no, name ON students
+    BEGIN
+        INSERT INTO students_fts (students_fts, rowid, name) VALUES ('delete', OLD.roll_no, OLD.name);
+        INSERT INTO students_fts (rowid, name) VALUES (NEW.roll_no, NEW.name);
+    END
+    """,
+)
+
+SQL_REBUILD_STUDENTS_FTS = "INSERT INTO students_fts (students_fts) VALUES ('rebuild')"
+
+SQL_CREATE_STUDENT_NAME_INDEX = "CREATE INDEX IF NOT EXISTS idx_students_name ON students (name COLLATE NOCASE)"
+
+SQL_HAS_STUDENTS_FTS = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'"
+
+# Best matches first: earlier match position in the name, then shorter names.
+# (bm25 rank adds little for short single-column names and costs 2x here.)
+SQL_SEARCH_STUDENTS_FTS = """
+    SELECT s.roll_no, s.name
+    FROM students_fts f
+    JOIN students s ON s.roll_no = f.rowid
+    WHERE students_fts MATCH ? AND {scope}
+    ORDER BY instr(LOWER(s.name), ?), length(s.name), s.roll_no
+    LIMIT ?
+"""
+
+SQL_SEARCH_STUDENTS_PREFIX = """
+    SELECT roll_no, name FROM students
+    WHERE {scope} AND name LIKE ? ESCAPE '\\'
+    ORDER BY name COLLATE NOCASE, roll_no
+    LIMIT ?
+"""
+
+# Used only when this SQLite build has no FTS5 trigram tokenizer
+SQL_SEARCH_STUDENTS_SCAN = """
+    SELECT roll_no, name FROM students
+    WHERE {scope} AND LOWER(name) LIKE ? ESCAPE '\\'
+    ORDER BY instr(LOWER(name), ?), roll_no
+    LIMIT ?
+"""
+
+SQL_STUDENTS_IN_ROLL_RANGE = """
+    SELECT roll_no, name FROM students
+    WHERE {scope} AND roll_no BETWEEN ? AND ?
+    ORDER BY roll_no
+    LIMIT ?
+"""
+
+MIN_TRIGRAM_QUERY = 3
+MAX_ROLL_DIGITS = 18
+
+
+def like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fts_phrase(text):
+    """Quote user text as one FTS5 phrase (substring match with the trigram tokenizer)."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def student_matches(query, roll_no, name):
+    """The search rules of Database.search_students, applied to one row in Python."""
+    if query.isdigit():
+        return str(roll_no).startswith(query)
+    if len(query) < MIN_TRIGRAM_QUERY:
+        return name.lower().startswith(query.lower())
+    return query.lower() in name.lower()
+
+
+def roll_prefix_ranges(digits):
+    """[(low, high), ...] covering every roll number whose decimal form starts with `digits`."""
+    prefix = int(digits)
+    ranges = [(prefix, prefix)]
+    for extra in range(1, MAX_ROLL_DIGITS - len(digits) + 1):
+        scale = 10 ** extra
+        ranges.append((prefix * scale, (prefix + 1) * scale - 1))
+    return ranges
+
+
+# ----------- Keyset Pages -----------
+# Page variants of the grid queries for virtualtree.VirtualTree: "after" returns
+# the next rows with roll_no > ?, "before" the previous rows with roll_no < ?
+# (newest first, reversed by Database._page). {{db}} / {{scope}} become {db} / {scope}.
+MIN_ROLL_NO = -(2 ** 63)
+
+
+def _keyset_pages(sql):
+    return {
+        "after": sql.format(cmp=">", order="ASC"),
+        "before": sql.format(cmp="<", order="DESC"),
+    }
+
+
+SQL_ROSTER_PAGE = _keyset_pages("""
+    SELECT s.roll_no, s.name, IFNULL(a.status, '') as status
+    FROM students s
+    LEFT JOIN {{db}}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {{scope}} AND s.roll_no {cmp} ?
+    ORDER BY s.roll_no {order}
+    LIMIT ?
+""")
+
+# Roster page of students matching a full-text search, driven by the FTS index
+# in rowid (= roll_no) order. Numbered parameters keep the (date, match,
+# class, key, limit) order Database._page expects; {{scope}} is ?3.
+SQL_ROSTER_SEARCH_PAGE = _keyset_pages("""
+    SELECT s.roll_no, s.name, IFNULL(a.status, '') as status
+    FROM (
+        SELECT f.rowid AS roll_no FROM students_fts f
+        JOIN students c ON c.roll_no = f.rowid
+        WHERE students_fts MATCH ?2 AND {{scope}} AND f.rowid {cmp} ?4
+        ORDER BY f.rowid {order}
+        LIMIT ?5
+    ) m
+    JOIN students s ON s.roll_no = m.roll_no
+    LEFT JOIN {{db}}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?1
+    ORDER BY s.roll_no {order}
+""")
+
+# Roster page restricted to students matching a roll number or short name
+# prefix; {{filter}} comes from Database._student_filter and its parameters
+# go between the date and the class.
+SQL_ROSTER_FILTERED_PAGE = _keyset_pages("""
+    SELECT s.roll_no, s.name, IFNULL(a.status, '') as status
+    FROM students s
+    LEFT JOIN {{db}}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {{filter}} AND {{scope}} AND s.roll_no {cmp} ?
+    ORDER BY s.roll_no {order}
+    LIMIT ?
+""")
+
+SQL_DAILY_PAGE = _keyset_pages("""
+    SELECT s.roll_no, s.name, IFNULL(a.status, 'Not Marked') AS status
+    FROM students s
+    LEFT JOIN {{db}}attendance a
+      ON s.roll_no = a.roll_no AND a.date = ?
+    WHERE {{scope}} AND s.roll_no {cmp} ?
+    ORDER BY s.roll_no {order}
+    LIMIT ?
+""")
+
+SQL_MONTHLY_PAGE = _keyset_pages("""
+    SELECT s.roll_no, s.name,
+           IFNULL(m.presents, 0) as presents,
+           IFNULL(m.absents, 0) as absents,
+           IFNULL(m.leaves, 0) as leaves,
+           IFNULL(m.total, 0) as total_days
+    FROM students s
+    LEFT JOIN {{db}}attendance_monthly m
+      ON m.roll_no = s.roll_no AND m.year = ? AND m.month = ?
+    WHERE {{scope}} AND s.roll_no {cmp} ?
+    ORDER BY s.roll_no {order}
+    LIMIT ?
+""")
+
+
+# ----------- Date Ranges -----------
+def month_range(month, year):
+    """Return the half-open ('YYYY-MM-01', first day of next month) range for a month."""
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def inclusive_range(start_date, end_date):
+    """Turn an inclusive (first day, last day) pair into the half-open range the queries use."""
+    if isinstance(start_date, str):
+        start_date = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+    if isinstance(end_date, str):
+        end_date = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+    return start_date.strftime("%Y-%m-%d"), (end_date + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+WEEKDAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def parse_weekdays(text):
+    """'sat, sun' (or 'Saturday,Sunday') -> (5, 6), Monday being 0 as in date.weekday(). Raises ValueError."""
+    weekdays = set()
+    for part in text.replace(",", " ").split():
+        name = part.strip().lower()[:3]
+        if name not in WEEKDAY_NAMES:
+            raise ValueError(f"unknown weekday '{part}'")
+        weekdays.add(WEEKDAY_NAMES.index(name))
+    return tuple(sorted(weekdays))
+
+
+def describe_exclusions(exclude_weekdays=(), holidays=()):
+    """'Sat, Sun; 3 holidays' for report headers, or '' when nothing is excluded."""
+    parts = []
+    if exclude_weekdays:
+        parts.append(", ".join(WEEKDAY_NAMES[weekday].capitalize() for weekday in exclude_weekdays))
+    if holidays:
+        parts.append(f"{len(holidays)} holiday{'s' if len(holidays) != 1 else ''}")
+    return "; ".join(parts)
+
+
+def parse_holidays(text):
+    """
+    'YYYY-MM-DD' dates and 'YYYY-MM-DD..YYYY-MM-DD' inclusive spans,
+    separated by commas or spaces -> sorted list of dates. Raises ValueError.
+    """
+    days = set()
+    for part in text.replace(",", " ").split():
+        first, _, last = part.partition("..")
+        day = datetime.datetime.strptime(first, "%Y-%m-%d").date()
+        last = datetime.datetime.strptime(last, "%Y-%m-%d").date() if last else day
+        while day <= last:
+            days.add(day.strftime("%Y-%m-%d"))
+            day += datetime.timedelta(days=1)
+    return sorted(days)
+
+
+def whole_months(start, end):
+    """
+    Split a half-open 'YYYY-MM-DD' range at month boundaries:
+    (first whole month start, whole months end), equal when no month is whole.
+    """
+    first = datetime.date.fromisoformat(start)
+    last = datetime.date.fromisoformat(end)
+    if first.day != 1:
+        first = (first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    last = last.replace(day=1)
+    if first >= last:
+        return end, end
+    return first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")
+
+
+def skipped_days(start, end, exclude_weekdays=(), holidays=()):
+    """The dates in start <= date < end falling on an excluded weekday (Monday = 0) or a holiday."""
+    skipped = {day for day in holidays if start <= day < end}
+    if exclude_weekdays:
+        day = datetime.date.fromisoformat(start)
+        last = datetime.date.fromisoformat(end)
+        while day < last:
+            if day.weekday() in exclude_weekdays:
+                skipped.add(day.strftime("%Y-%m-%d"))
+            day += datetime.timedelta(days=1)
+    return sorted(skipped)
+
+
+# Result of a marking call: counts plus the affected (roll_no, status) rows.
+# rows is None when every student was marked.
+MarkResult = namedtuple("MarkResult", ["inserted", "updated", "rows"])
+
+# Everything the daily report shows for one date, read together:
+# rows are fetch_daily_data rows, counts is (total students, present, absent, leave)
+# as in daily_counts, absent / leave are (roll_no, name) lists.
+DailySnapshot = namedtuple("DailySnapshot", ["date", "rows", "counts", "absent", "leave"])
+
+
+# ----------- Database Class -----------
+class Database:
+    """
+    Owns one long-lived sqlite3 connection per thread for a database file.
+
+    wal=True switches the file to WAL journaling; wal=None keeps whatever
+    mode the file already has. Either way, a WAL database runs in
+    concurrency mode (see the module comment).
+
+    The daily, monthly and student reports are served from a ReadCache of
+    cache_size entries (0 turns it off). Commits through transaction()
+    drop only the entries covering the dates they marked; commits that do
+    not say which dates they touched clear it.
+
+    Reports of archived dates are read from the archive files registered in
+    attendance_archives, attached to each thread's connection on first use.
+
+    Roster, marking and report methods take class_id to work on one section
+    (None: every student).
+    """
+
+    def __init__(self, path=DB_PATH, wal=None, cache_size=READ_CACHE_SIZE):
+        self.path = path
+        self.wal = wal
+        self.cache = ReadCache(path, cache_size)
+        self.concurrent = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []      # (thread, connection)
+        self._has_fts = None
+
+    # -------- Connection Handling --------
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False, factory=connection_factory())
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if self.wal:
+            mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        else:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.concurrent = mode.lower() == "wal"
+        if self.concurrent:
+            for pragma in WAL_PRAGMAS:
+                conn.execute(pragma)
+        # Connections of threads that have ended (worker pools shut down) go now
+        with self._lock:
+            ended = [(thread, c) for thread, c in self._connections if not thread.is_alive()]
+            self._connections = [(thread, c) for thread, c in self._connections if thread.is_alive()]
+            self._connections.append((threading.current_thread(), conn))
+        self._close_all(ended)
+        return conn
+
+    @staticmethod
+    def _close_all(connections):
+        for _, conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        """Close every connection opened by this object (all threads)."""
+        self.cache.close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        self._close_all(connections)
+        self._local = threading.local()
+
+    def close_thread(self):
+        """Close the calling thread's connection (e.g. before a worker thread ends)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        with self._lock:
+            self._connections = [(thread, c) for thread, c in self._connections if c is not conn]
+        self._close_all([(None, conn)])
+        self._local.conn = None
+        self._local.attached = None
+
+    def set_journal_mode(self, mode):
+        """Persistently switch the database file's journal mode ('wal' or 'delete'). Returns the new mode."""
+        self.close()
+        self.wal = mode.lower() == "wal"
+        result = self.conn.execute(f"PRAGMA journal_mode = {'WAL' if self.wal else 'DELETE'}").fetchone()[0]
+        self.close()
+        return result.lower()
+
+    def _begin(self, conn):
+        """
+        Start a write transaction. The write lock is taken up front (BEGIN
+        IMMEDIATE): marking reads the current statuses before it writes, and
+        two instances that both read under a deferred BEGIN cannot both
+        upgrade, so one would fail at once instead of waiting. While another
+        instance holds it, BEGIN IMMEDIATE is retried with exponential backoff
+        and full jitter for up to WRITE_TIMEOUT seconds (each try also waits
+        busy_timeout); once it is held no later statement in the transaction
+        can hit "database is locked".
+        """
+        deadline = time.monotonic() + WRITE_TIMEOUT
+        attempt = 0
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+                attempt += 1
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Run the block's reads in one deferred read transaction, so several
+        queries see the same committed state. Never takes the write lock.
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the block in one explicit transaction on this thread's connection.
+        Nested use joins the outer transaction. Keep the block short: no UI
+        waits (message boxes etc.) while it is open.
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        self._begin(conn)
+        changes = conn.total_changes
+        self._local.touched = set()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            touched = self._local.touched
+            self.cache.before_commit()
+            try:
+                conn.commit()
+            finally:
+                # A commit that changed no rows (DDL, an upsert keeping every status) drops nothing
+                self.cache.after_commit((touched or None) if conn.total_changes != changes else ())
+        finally:
+            self._local.touched = None
+
+    def _touch(self, date):
+        """Note that the current transaction wrote attendance for date (read cache invalidation)."""
+        touched = getattr(self._local, "touched", None)
+        if touched is not None:
+            touched.add(date)
+
+    # -------- Archives --------
+    def archives(self):
+        """Registered archives as (name, path, start, end, rows, created), oldest first."""
+        return self.query(SQL_LIST_ARCHIVES)
+
+    def archive_path(self, path):
+        """An archive's file path; relative paths are next to the database file."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.path)), path)
+
+    def _attach(self, archives):
+        """
+        Attach the (name, path) archives to this thread's connection if they are
+        not yet, detaching others beyond MAX_ATTACHED. Returns their {db} prefixes.
+        ATTACH is not allowed inside a transaction, so resolve sources before one.
+        """
+        conn = self.conn
+        attached = getattr(self._local, "attached", None)
+        if attached is None:
+            attached = self._local.attached = set()
+        wanted = [archive_schema(name) for name, _ in archives]
+        missing = [(schema, path) for schema, (_, path) in zip(wanted, archives) if schema not in attached]
+        if missing:
+            for schema in sorted(attached - set(wanted))[:max(0, len(attached) + len(missing) - MAX_ATTACHED)]:
+                conn.execute(f"DETACH DATABASE {schema}")
+                attached.discard(schema)
+            for schema, path in missing:
+                path = self.archive_path(path)
+                if not os.path.exists(path):
+                    raise sqlite3.OperationalError(f"archive file is missing: {path}")
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+                attached.add(schema)
+        return [schema + "." for schema in wanted]
+
+    def _source_ranges(self, start, end):
+        """
+        Where start <= date < end is stored, without attaching anything:
+        [(archive, start, end)] with the (name, path) of each archive
+        overlapping the range (clipped to it), then the hot database (None)
+        unless archives cover the whole range.
+        """
+        archives = self.query(SQL_ARCHIVES_IN_RANGE, (end, start))
+        sources, covered, gap = [], start, False
+        for name, path, archive_start, archive_end in archives:
+            gap = gap or archive_start > covered
+            covered = max(covered, archive_end)
+            sources.append(((name, path), max(start, archive_start), min(end, archive_end)))
+        if not archives or gap or covered < end:
+            sources.append((None, start, end))
+        return sources
+
+    def _segment_ranges(self, start, end):
+        """
+        _source_ranges without overlaps, in date order: each archive, and the
+        hot database only for the dates before, between and after them.
+        """
+        segments, covered = [], start
+        for archive, first, last in self._source_ranges(start, end):
+            if archive is None:
+                continue
+            if first > covered:
+                segments.append((None, covered, first))
+            segments.append((archive, first, last))
+            covered = max(covered, last)
+        if covered < end:
+            segments.append((None, covered, end))
+        return segments
+
+    def _prefixed(self, ranges):
+        """Attach the archives of (archive, start, end) ranges; returns them as (prefix, start, end)."""
+        prefixes = iter(self._attach([archive for archive, _, _ in ranges if archive is not None]))
+        return [(next(prefixes) if archive is not None else "", first, last) for archive, first, last in ranges]
+
+    def _sources(self, start, end):
+        """_source_ranges as [(prefix, start, end)] with the {db} prefix of each (attached) archive, "" for hot."""
+        return self._prefixed(self._source_ranges(start, end))
+
+    def _segments(self, start, end):
+        """_segment_ranges with their archives attached, as [(prefix, start, end)]."""
+        return self._prefixed(self._segment_ranges(start, end))
+
+    def _source(self, date):
+        """The {db} prefix of the one database holding date: an archive or the hot one ("")."""
+        return self._sources(*inclusive_range(date, date))[0][0]
+
+    def _on(self, sql, date, class_id=None):
+        return sql.replace("{db}", self._source(date)).replace("{scope}", class_scope(class_id))
+
+    def _union(self, branch, start, end, params, order_by=""):
+        """
+        The branch statement once per source of start <= date < end, joined
+        with UNION ALL. params(start, end) gives one branch's parameters.
+        Returns (sql, parameters).
+        """
+        sources = self._sources(start, end)
+        sql = "\n    UNION ALL\n".join(branch.replace("{db}", prefix) for prefix, _, _ in sources)
+        return sql + order_by, [p for _, first, last in sources for p in params(first, last)]
+
+    def check_writable(self, date):
+        """Raise ArchivedDateError if date has been moved to an archive."""
+        start, end = inclusive_range(date, date)
+        archived = self.query(SQL_ARCHIVES_IN_RANGE, (end, start))
+        if archived:
+            raise ArchivedDateError(f"{date} is archived in {archived[0][0]}; archived years are read-only")
+
+    def _cached(self, key, start, end, load):
+        """load() through the read cache; reads inside an open transaction are never cached."""
+        if self.conn.in_transaction:
+            return load()
+        return self.cache.get(key, start, end, load)
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    # -------- Students --------
+    # Write methods return the affected key(s) so views can patch just those rows
+    def add_student(self, roll_no, name, class_id=None):
+        """Insert a student into the section (default: the first one). Returns the new (roll_no, name)."""
+        with self.transaction() as conn:
+            conn.execute(SQL_INSERT_STUDENT, (roll_no, name, DEFAULT_CLASS_ID if class_id is None else class_id))
+        return roll_no, name
+
+    def update_student(self, old_roll, new_roll, name):
+        """Change a student's roll no and name. Returns the new (roll_no, name)."""
+        with self.transaction() as conn:
+            conn.execute(SQL_UPDATE_STUDENT, (new_roll, name, old_roll))
+        return new_roll, name
+
+    def delete_student(self, roll_no):
+        """Delete a student. Returns the deleted roll_no."""
+        with self.transaction() as conn:
+            conn.execute(SQL_DELETE_STUDENT, (roll_no,))
+        return roll_no
+
+    def move_students(self, roll_nos, class_id):
+        """Move students to another section (their attendance history moves with them). Returns the roll_nos."""
+        roll_nos = list(roll_nos)
+        with self.transaction() as conn:
+            conn.executemany(SQL_MOVE_STUDENT, [(class_id, roll) for roll in roll_nos])
+        return roll_nos
+
+    # -------- Classes / Sections --------
+    def classes(self):
+        """(class_id, name, students) of every section, by name."""
+        return self.query(SQL_LIST_CLASSES)
+
+    def find_class(self, name_or_id):
+        """(class_id, name) of the section with that name (case-insensitive) or id, or None."""
+        rows = self.query(SQL_FIND_CLASS, (str(name_or_id).strip(), name_or_id))
+        return rows[0] if rows else None
+
+    def add_class(self, name):
+        """Create a section. Returns the new (class_id, name); IntegrityError if the name is taken."""
+        with self.transaction() as conn:
+            class_id = conn.execute(SQL_INSERT_CLASS, (name,)).lastrowid
+        return class_id, name
+
+    def rename_class(self, class_id, name):
+        with self.transaction() as conn:
+            conn.execute(SQL_RENAME_CLASS, (name, class_id))
+        return class_id, name
+
+    def find_students(self, query):
+        """Look up students by exact roll no (digits) or partial, case-insensitive name."""
+        if query.isdigit():
+            return self.query(SQL_FIND_STUDENT_BY_ROLL, (int(query),))
+        return self.search_students(query, limit=-1)
+
+    @property
+    def has_student_search(self):
+        """True if the students_fts index exists (SQLite built with FTS5 trigram)."""
+        if self._has_fts is None:
+            self._has_fts = bool(self.query(SQL_HAS_STUDENTS_FTS))
+        return self._has_fts
+
+    def search_students(self, query, limit=20, class_id=None):
+        """
+        Ranked (roll_no, name) matches for type-ahead: digits match roll
+        numbers starting with them (exact roll first), text matches names
+        containing it (names starting with it first). limit=-1 means no limit.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        scope = class_scope(class_id)
+        if query.isdigit():
+            rows = []
+            sql = SQL_STUDENTS_IN_ROLL_RANGE.replace("{scope}", scope)
+            for low, high in roll_prefix_ranges(query):
+                if limit >= 0 and len(rows) >= limit:
+                    break
+                rows.extend(self.query(sql, (class_id, low, high, limit - len(rows) if limit >= 0 else -1)))
+            return rows
+        lowered = query.lower()
+        if len(query) < MIN_TRIGRAM_QUERY:
+            return self.query(SQL_SEARCH_STUDENTS_PREFIX.replace("{scope}", scope),
+                              (class_id, like_escape(query) + "%", limit))
+        if self.has_student_search:
+            return self.query(SQL_SEARCH_STUDENTS_FTS.replace("{scope}", scope),
+                              (fts_phrase(query), class_id, lowered, limit))
+        return self.query(SQL_SEARCH_STUDENTS_SCAN.replace("{scope}", scope),
+                          (class_id, f"%{like_escape(lowered)}%", lowered, limit))
+
+    def _uses_fts(self, query):
+        return not query.isdigit() and len(query) >= MIN_TRIGRAM_QUERY and self.has_student_search
+
+    def _student_filter(self, query):
+        """(SQL condition on students s, params) for searches that do not go through students_fts."""
+        if query.isdigit():
+            ranges = roll_prefix_ranges(query)
+            return ("(" + " OR ".join(["s.roll_no BETWEEN ? AND ?"] * len(ranges)) + ")",
+                    tuple(bound for pair in ranges for bound in pair))
+        if len(query) < MIN_TRIGRAM_QUERY:
+            return "s.name LIKE ? ESCAPE '\\'", (like_escape(query) + "%",)
+        return "LOWER(s.name) LIKE ? ESCAPE '\\'", (f"%{like_escape(query.lower())}%",)
+
+    def rebuild_student_search(self):
+        """Recompute students_fts from the students table (repair after bulk edits outside the app)."""
+        if self.has_student_search:
+            with self.transaction() as conn:
+                conn.execute(SQL_REBUILD_STUDENTS_FTS)
+
+    def roster_with_status(self, date, class_id=None):
+        """All students (of the section) with their status for the given date ('' if not marked)."""
+        return self.query(self._on(SQL_ROSTER_WITH_STATUS, date, class_id), (date, class_id))
+
+    def _page(self, pages_sql, params, after, before, limit, db="", class_id=None):
+        """params end with the class_id of the page's {scope}."""
+        scope = class_scope(class_id)
+        if before is not None:
+            sql = pages_sql["before"].replace("{db}", db).replace("{scope}", scope)
+            rows = self.query(sql, (*params, before, limit))
+            rows.reverse()
+            return rows
+        sql = pages_sql["after"].replace("{db}", db).replace("{scope}", scope)
+        return self.query(sql, (*params, MIN_ROLL_NO if after is None else after, limit))
+
+    def roster_rows(self, date, roll_nos, search=None):
+        """roster_with_status rows for just the given roll numbers (and matching the search, if any)."""
+        roll_nos = list(roll_nos)
+        rows = []
+        roster_rows = self._on(SQL_ROSTER_ROWS, date)
+        for i in range(0, len(roll_nos), IN_CHUNK_SIZE):
+            chunk = roll_nos[i:i + IN_CHUNK_SIZE]
+            sql = roster_rows.format(", ".join("?" * len(chunk)))
+            rows.extend(self.query(sql, (date, *chunk)))
+        if search and search.strip():
+            rows = [row for row in rows if student_matches(search.strip(), row[0], row[1])]
+        return rows
+
+    def roster_page(self, date, after=None, before=None, limit=200, search=None, class_id=None):
+        """One keyset page of roster_with_status, ordered by roll_no, optionally only students matching search."""
+        search = (search or "").strip()
+        db = self._source(date)
+        if search and self._uses_fts(search):
+            return self._page(SQL_ROSTER_SEARCH_PAGE, (date, fts_phrase(search), class_id), after, before, limit,
+                              db, class_id)
+        if search:
+            condition, params = self._student_filter(search)
+            pages = {direction: sql.replace("{filter}", condition)
+                     for direction, sql in SQL_ROSTER_FILTERED_PAGE.items()}
+            return self._page(pages, (date, *params, class_id), after, before, limit, db, class_id)
+        return self._page(SQL_ROSTER_PAGE, (date, class_id), after, before, limit, db, class_id)
+
+    # -------- Attendance --------
+    def attendance_statuses(self, roll_nos, date):
+        """Return {roll_no: status} for the students that already have a row for the date."""
+        roll_nos = list(roll_nos)
+        statuses = {}
+        for i in range(0, len(roll_nos), IN_CHUNK_SIZE):
+            chunk = roll_nos[i:i + IN_CHUNK_SIZE]
+            sql = SQL_STATUSES_FOR_ROLLS.format(", ".join("?" * len(chunk)))
+            statuses.update(self.conn.execute(sql, (date, *chunk)).fetchall())
+        return statuses
+
+    def check_students(self, roll_nos):
+        """Raise UnknownStudentError if any of the roll_nos has no student."""
+        roll_nos = list(roll_nos)
+        found = set()
+        for i in range(0, len(roll_nos), IN_CHUNK_SIZE):
+            chunk = roll_nos[i:i + IN_CHUNK_SIZE]
+            sql = SQL_EXISTING_ROLLS.format(", ".join("?" * len(chunk)))
+            found.update(roll for roll, in self.conn.execute(sql, chunk))
+        missing = [roll for roll in roll_nos if roll not in found]
+        if missing:
+            shown = ", ".join(str(roll) for roll in missing[:10]) + (", ..." if len(missing) > 10 else "")
+            raise UnknownStudentError(f"no student with roll_no {shown}")
+
+    def mark_students(self, roll_nos, status, date):
+        """
+        Insert or update attendance for several students in one transaction.
+        Returns a MarkResult; rows that already had the status are not counted
+        as updated but are still listed in MarkResult.rows. Raises
+        UnknownStudentError (nothing written) if a roll_no has no student.
+        """
+        roll_nos = list(dict.fromkeys(int(r) for r in roll_nos))
+        with self.transaction() as conn:
+            # Under the write lock, so the date cannot be archived before the commit
+            self.check_writable(date)
+            self.check_students(roll_nos)
+            self._touch(date)
+            existing = self.attendance_statuses(roll_nos, date)
+            conn.executemany(SQL_UPSERT_ATTENDANCE, [(roll, status, date) for roll in roll_nos])
+        count_inserted = len(roll_nos) - len(existing)
+        count_updated = sum(1 for s in existing.values() if s != status)
+        return MarkResult(count_inserted, count_updated, [(roll, status) for roll in roll_nos])
+
+    def mark_attendance(self, roll_no, status, date):
+        """Insert or update one student's attendance. Returns a MarkResult."""
+        return self.mark_students([roll_no], status, date)
+
+    def mark_all(self, status, date, class_id=None):
+        """
+        Set the status of every student (of the section) for the date with one
+        INSERT ... SELECT. Returns a MarkResult.
+        """
+        scope = class_scope(class_id)
+        with self.transaction() as conn:
+            self.check_writable(date)
+            self._touch(date)
+            count_inserted, count_updated = conn.execute(SQL_COUNT_MARK_ALL.replace("{scope}", scope),
+                                                         (status, date, class_id)).fetchone()
+            conn.execute(SQL_MARK_ALL.replace("{scope}", scope), (status, date, class_id))
+        return MarkResult(count_inserted, count_updated, None)
+
+    def mark_all_present(self, date, class_id=None):
+        return self.mark_all("Present", date, class_id)
+
+    # -------- Reports --------
+    def fetch_daily_data(self, for_date, class_id=None):
+        return self._cached(("daily", for_date, class_id), *inclusive_range(for_date, for_date),
+                            lambda: self.query(self._on(SQL_DAILY_DATA, for_date, class_id), (for_date, class_id)))
+
+    def daily_page(self, for_date, after=None, before=None, limit=200, class_id=None):
+        """One keyset page of fetch_daily_data, ordered by roll_no."""
+        return self._page(SQL_DAILY_PAGE, (for_date, class_id), after, before, limit, self._source(for_date),
+                          class_id)
+
+    def daily_counts(self, for_date, class_id=None):
+        """(total students, present, absent, leave) for the date."""
+        return self.query(self._on(SQL_DAILY_COUNTS, for_date, class_id), (for_date, class_id))[0]
+
+    def daily_students_with_status(self, for_date, status, class_id=None):
+        """(roll_no, name) of students whose status on the date matches (case-insensitive)."""
+        return self.query(self._on(SQL_DAILY_WITH_STATUS, for_date, class_id), (for_date, status.lower(), class_id))
+
+    def daily_snapshot(self, for_date, class_id=None):
+        """
+        The day's rows (one LEFT JOIN) and status counts (one GROUP BY) read
+        in a single read transaction, plus the absent / leave lists from one
+        pass over the rows. Returns a DailySnapshot.
+        """
+        return self._cached(("daily_snapshot", for_date, class_id), *inclusive_range(for_date, for_date),
+                            lambda: self._read_daily_snapshot(for_date, class_id))
+
+    def _read_daily_snapshot(self, for_date, class_id):
+        data_sql = self._on(SQL_DAILY_DATA, for_date, class_id)
+        counts_sql = self._on(SQL_DAILY_STATUS_COUNTS, for_date, class_id)
+        with self.snapshot():
+            rows = self.query(data_sql, (for_date, class_id))
+            by_status = dict(self.query(counts_sql, (for_date, class_id)))
+        lists = {"absent": [], "leave": []}
+        for roll_no, name, status in rows:
+            bucket = lists.get(status.lower())
+            if bucket is not None:
+                bucket.append((roll_no, name))
+        counts = (len(rows), by_status.get("present", 0), by_status.get("absent", 0), by_status.get("leave", 0))
+        return DailySnapshot(for_date, rows, counts, lists["absent"], lists["leave"])
+
+    def fetch_range_data(self, start, end, exclude_weekdays=(), holidays=(), class_id=None):
+        """
+        Present/Absent/Leave/Total per student for start <= date < end
+        ('YYYY-MM-DD'), leaving out the given weekdays (Monday = 0) and
+        holiday dates: the same rows as fetch_monthly_data for any period.
+        """
+        exclude_weekdays, holidays = tuple(exclude_weekdays), tuple(holidays)
+        return self._cached(("range", start, end, exclude_weekdays, holidays, class_id), start, end,
+                            lambda: self._read_range_data(start, end, exclude_weekdays, holidays, class_id))
+
+    def _read_range_data(self, start, end, exclude_weekdays, holidays, class_id):
+        counts, params = [], []
+        for db, first, last in self._sources(start, end):
+            sql, source_params = self._range_counts(db, first, last, exclude_weekdays, holidays, class_id)
+            counts.append(sql)
+            params.extend(source_params)
+        sql = SQL_RANGE_DATA.replace("{counts}", "\n    UNION ALL\n".join(counts))
+        return self.query(sql.replace("{scope}", class_scope(class_id)), (*params, class_id))
+
+    def _range_counts(self, db, start, end, exclude_weekdays, holidays, class_id):
+        """One source's SQL_RANGE_COUNTS branch and its parameters."""
+        months_start, months_end = whole_months(start, end)
+        skipped = skipped_days(start, end, exclude_weekdays, holidays)
+        inner = [day for day in skipped if months_start <= day < months_end]
+        edge = [day for day in skipped if not months_start <= day < months_end]
+        first_month = last_month = (0, 0)
+        if months_start < months_end:
+            last = datetime.date.fromisoformat(months_end) - datetime.timedelta(days=1)
+            first_month = (int(months_start[:4]), int(months_start[5:7]))
+            last_month = (last.year, last.month)
+        sql = SQL_RANGE_COUNTS.replace("{db}", db).replace("{edge_skipped}", ", ".join("?" * len(edge))).replace(
+            "{inner_skipped}", ", ".join("?" * len(inner))).replace("{members}", class_scope(class_id, SCOPE_MEMBERS))
+        return sql, (*first_month, *last_month, class_id, start, months_start, *edge, class_id,
+                     months_end, end, *edge, class_id, *inner, class_id)
+
+    def fetch_student_range_records(self, roll_no, start, end):
+        """Day-wise (date, status) rows of one student for start <= date < end."""
+        sql, params = self._union(SQL_STUDENT_RANGE_RECORDS, start, end, lambda first, last: (roll_no, first, last),
+                                  " ORDER BY 1")
+        return self.query(sql, params)
+
+    def iter_class_records(self, start, end, class_id=None, page_size=CLASS_PAGE):
+        """
+        Stream (roll_no, name, date, status) for every student (of the section) in
+        start <= date < end, ordered by roll_no then date (see pdfreports.group_student_records).
+        Each page of page_size students is read whole in its own short read
+        transaction, so no lock is held while the rows are being rendered.
+        """
+        scope = class_scope(class_id)
+        sources = self._sources(start, end)         # attaches archives, not allowed in the transaction
+        sql = "\n    UNION ALL\n".join(SQL_CLASS_RANGE_RECORDS.replace("{db}", prefix) for prefix, _, _ in sources)
+        sql = sql.replace("{scope}", scope) + " ORDER BY 1, 3"
+        page_end = SQL_CLASS_PAGE_END.replace("{scope}", scope)
+        after = float("-inf")                       # below every roll_no
+        while True:
+            with self.snapshot():
+                upto = self.query(page_end, (class_id, after, page_size))[0][0]
+                if upto is None:
+                    return
+                rows = self.query(sql, [p for _, first, last in sources
+                                        for p in (class_id, after, upto, first, last)])
+            yield from rows
+            after = upto
+
+    def count_students_with_records(self, start, end, class_id=None):
+        sources = self._sources(start, end)
+        exists = " OR ".join(SQL_STUDENT_HAS_RECORDS.replace("{db}", db) for db, _, _ in sources)
+        params = [class_id] + [p for _, first, last in sources for p in (first, last)]
+        sql = SQL_COUNT_STUDENTS_WITH_RECORDS.replace("{exists}", exists).replace("{scope}", class_scope(class_id))
+        return self.query(sql, params)[0][0]
+
+    def iter_attendance(self, start, end, class_id=None, batch_size=EXPORT_BATCH):
+        """
+        Yield lists of at most batch_size (date, roll_no, name, section, status)
+        rows for start <= date < end, in date then roll_no order. Each list is
+        one keyset page on (date, roll_no), read whole by its own query, so
+        memory does not grow with the range and no read lock is held while the
+        caller writes the rows out (see export.py).
+        """
+        scope = class_scope(class_id, SCOPE_EXPORT)
+        for db, first, last in self._segments(start, end):
+            sql = SQL_EXPORT_ROWS.replace("{db}", db).replace("{scope}", scope)
+            after = (first, float("-inf"))          # before every mark of the first day
+            while True:
+                rows = self.query(sql, (*after, last, class_id, batch_size))
+                if rows:
+                    yield rows
+                if len(rows) < batch_size:
+                    break
+                after = rows[-1][:2]
+
+    def all_students(self):
+        return self.query(SQL_ALL_STUDENTS)
+
+    # -------- Bulk Import --------
+    def import_students(self, rows):
+        """
+        Insert or update (roll_no, name, class_id) rows in one transaction;
+        class_id None keeps an existing student's section (new students go to
+        the first one). Returns the number of rows written.
+        """
+        rows = list(rows)
+        with self.transaction() as conn:
+            conn.executemany(SQL_UPSERT_STUDENT, rows)
+        return len(rows)
+
+    def import_attendance(self, rows):
+        """
+        Insert or update (roll_no, status, date) rows in one transaction.
+        Raises ArchivedDateError if any date is archived. Returns the number
+        of rows written.
+        """
+        rows = list(rows)
+        dates = {date for _, _, date in rows}
+        with self.transaction() as conn:
+            for date in dates:
+                self.check_writable(date)
+                self._touch(date)
+            conn.executemany(SQL_UPSERT_ATTENDANCE, rows)
+        return len(rows)
+
+    def range_dates(self, start, end):
+        """
+        The dates in start <= date < end that have any attendance marked, in
+        order. Archives are attached one at a time, so any number can be read.
+        """
+        dates = []
+        for segment in self._segment_ranges(start, end):
+            db, first, last = self._prefixed([segment])[0]
+            dates.extend(date for (date,) in self.query(SQL_RANGE_DATES.replace("{db}", db), (first, last)))
+        return dates
+
+    def day_status_codes(self, date):
+        """The date's marks as 'roll_no * 4 + status code' values, comma-separated (see analytics.py)."""
+        return self.query(self._on(SQL_DAY_STATUS_CODES, date), (date,))[0][0] or ""
+
+    def iter_day_status_codes(self, dates):
+        """
+        Yield (date, day_status_codes) for each of the (ordered) dates. The
+        dates of each archive or hot segment are read in one snapshot; the
+        archive is attached before it opens (ATTACH is not allowed inside).
+        """
+        dates = list(dates)
+        if not dates:
+            return
+        for segment in self._segment_ranges(*inclusive_range(dates[0], dates[-1])):
+            db, first, last = self._prefixed([segment])[0]
+            sql = SQL_DAY_STATUS_CODES.replace("{db}", db)
+            with self.snapshot():
+                for date in dates:
+                    if first <= date < last:
+                        yield date, self.query(sql, (date,))[0][0] or ""
+
+    def fetch_monthly_data(self, month, year, class_id=None):
+        """Per-student monthly counts, read from the attendance_monthly summary."""
+        return self._cached(("monthly", year, month, class_id), *month_range(month, year),
+                            lambda: self.query(self._on(SQL_MONTHLY_DATA, month_range(month, year)[0], class_id),
+                                               (year, month, class_id)))
+
+    def monthly_page(self, month, year, after=None, before=None, limit=200, class_id=None):
+        """One keyset page of fetch_monthly_data, ordered by roll_no."""
+        return self._cached(("monthly_page", year, month, after, before, limit, class_id), *month_range(month, year),
+                            lambda: self._page(SQL_MONTHLY_PAGE, (year, month, class_id), after, before, limit,
+                                               self._source(month_range(month, year)[0]), class_id))
+
+    def fetch_months_summary(self, first_year, first_month, last_year, last_month, class_id=None):
+        """Per-student counts summed over whole months, first to last inclusive (terms, years)."""
+        start = month_range(first_month, first_year)[0]
+        end = month_range(last_month, last_year)[1]
+        months = (first_year, first_month, last_year, last_month, class_id)
+        sql, params = self._union(SQL_MONTHS_ROWS.replace("{members}", class_scope(class_id, SCOPE_MEMBERS)),
+                                  start, end, lambda first, last: months)
+        sql = SQL_MONTHS_SUMMARY.replace("{months}", sql).replace("{scope}", class_scope(class_id))
+        return self.query(sql, (*params, class_id))
+
+    def fetch_year_summary(self, year, class_id=None):
+        return self.fetch_months_summary(year, 1, year, 12, class_id)
+
+    def rebuild_monthly_summary(self):
+        """Recompute attendance_monthly from the raw attendance table (backfill / repair)."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM attendance_monthly")
+            conn.execute(SQL_REBUILD_MONTHLY_SUMMARY)
+
+    def fetch_student_records(self, roll_no, month, year):
+        start, end = month_range(month, year)
+        return self._cached(("student", roll_no, year, month), start, end,
+                            lambda: self.fetch_student_range_records(roll_no, start, end))
+
+
+# ----------- Shared Instance -----------
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    """Return the process-wide Database for DB_PATH (created on first use)."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                wal = {"1": True, "0": False}.get(os.environ.get(WAL_ENV_VAR, ""))
+                _db = Database(DB_PATH, wal=wal)
+    return _db
+
+
+# ----------- Database Setup -----------
+def setup_database(db=None):
+    """
+    Bring the database schema up to date (see migrations.py).
+    Each one-time step (tables, duplicate cleanup, indexes, monthly summary)
+    runs only once per database, tracked with PRAGMA user_version.
+    """
+    from migrations import migrate
+
+    return migrate(db or get_db())
@@ -0,0 +1,286 @@
+# ========================= diagnostics.py =========================
+# Optional instrumentation: SQL statement and button handler timings.
+#
+# Off by default. Enable with "python main.py --diagnostics" or set
+# ATTENDANCE_DIAGNOSTICS=1. When it is on:
+#   - every statement run through database.py is timed (execute + fetch),
+#     together with the number of rows it returned or changed,
+#   - button handlers and background tasks are timed,
+#   - anything slower than ATTENDANCE_SLOW_MS (default 50 ms) is written to
+#     diagnostics.log (rotating), statements with their EXPLAIN QUERY PLAN,
+#   - the main window gets a "Diagnostics" button listing the slowest
+#     operations of the session.
+# When it is off, connections are plain sqlite3 connections and a timed
+# handler costs one attribute check per click.
+#
+# Handler timings include the time a message box stays open.
+
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+
+FLAG = "--diagnostics"
+ENV_VAR = "ATTENDANCE_DIAGNOSTICS"
+SLOW_MS_ENV_VAR = "ATTENDANCE_SLOW_MS"
+DEFAULT_SLOW_MS = 50.0
+LOG_FILE = "diagnostics.log"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+TOP_N = 25
+
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement always gets the same name."""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class Diagnostics:
+    """Per-process timing statistics and the slow-operation log."""
+
+    def __init__(self, enabled=False, slow_ms=DEFAULT_SLOW_MS, log_file=LOG_FILE):
+        self.enabled = False
+        self.slow_ms = slow_ms
+        self.log_file = log_file
+        self.stats = {}             # (kind, name) -> [calls, total seconds, max seconds, rows of slowest]
+        self._lock = threading.Lock()
+        self._logger = None
+        if enabled:
+            self.enable()
+
+    @classmethod
+    def from_environment(cls):
+        enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+        try:
+            slow_ms = float(os.environ.get(SLOW_MS_ENV_VAR, DEFAULT_SLOW_MS))
+        except ValueError:
+            slow_ms = DEFAULT_SLOW_MS
+        return cls(enabled, slow_ms)
+
+    def enable(self):
+        """Turn instrumentation on; connections opened from now on are instrumented."""
+        if self._logger is None:
+            import logging
+            from logging.handlers import RotatingFileHandler
+
+            logger = logging.getLogger("attendance.diagnostics")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                          encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        self.enabled = True
+
+    def enable_from_argv(self, argv):
+        """Enable if the --diagnostics flag is present (and remove it from argv)."""
+        if FLAG in argv:
+            argv.remove(FLAG)
+            self.enable()
+
+    # -------- Recording --------
+    def record(self, kind, name, seconds, rows=None, detail=None):
+        with self._lock:
+            entry = self.stats.get((kind, name))
+            if entry is None:
+                entry = self.stats[(kind, name)] = [0, 0.0, 0.0, None]
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds >= entry[2]:
+                entry[2] = seconds
+                entry[3] = rows
+        if seconds * 1000 >= self.slow_ms and self._logger:
+            message = f"SLOW {kind} {seconds * 1000:.1f} ms"
+            if rows is not None:
+                message += f" rows={rows}"
+            message += f" | {name}"
+            if detail:
+                message += "\n    " + "\n    ".join(detail)
+            self._logger.info(message)
+
+    def record_statement(self, conn, sql, params, seconds, rows):
+        """Record a statement; slow ones are logged with their query plan."""
+        name = normalize_sql(sql)
+        plan = None
+        if seconds * 1000 >= self.slow_ms:
+            plan = explain(conn, name, params)
+        self.record("sql", name, seconds, rows, plan)
+
+    def top(self, n=TOP_N):
+        """The n slowest operations: (kind, name, calls, total ms, max ms, rows of slowest)."""
+        with self._lock:
+            items = [(kind, name, calls, total * 1000, worst * 1000, rows)
+                     for (kind, name), (calls, total, worst, rows) in self.stats.items()]
+        items.sort(key=lambda item: item[4], reverse=True)
+        return items[:n]
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+
+def explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN lines for a statement, or None if it cannot be explained."""
+    if not sql.upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return None
+    return [f"{'  ' * (row[1] != 0)}{row[-1]}" for row in rows]
+
+
+# ----------- Shared Instance -----------
+diagnostics = Diagnostics.from_environment()
+
+
+# ----------- Instrumented Connection -----------
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records execute + fetch time and row count once the result is consumed."""
+
+    _sql = None
+    _params = ()
+    _rows = 0
+    _elapsed = 0.0
+
+    def execute(self, sql, params=()):
+        self._sql, self._params, self._rows, self._elapsed = sql, params, 0, 0.0
+        t0 = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        finally:
+            self._elapsed += time.perf_counter() - t0
+        if self.description is None:
+            self._finish(max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._sql = None
+        t0 = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        diagnostics.record_statement(self.connection, sql, (), time.perf_counter() - t0, max(self.rowcount, 0))
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        t0 = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            self._elapsed += time.perf_counter() - t0
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish(self._rows)
+        elif self._sql is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+        if self._sql is not None:
+            self._rows += len(rows)
+            if not rows:
+                self._finish(self._rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._sql is not None:
+            self._finish(self._rows + len(rows))
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        if self._sql is not None:
+            self._finish(self._rows)
+        super().close()
+
+    def _finish(self, rows):
+        sql, self._sql = self._sql, None
+        if sql is not None:
+            diagnostics.record_statement(self.connection, sql, self._params, self._elapsed, rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose execute/executemany go through TimedCursor."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def connection_factory():
+    """The sqlite3 connection class database.py should open connections with."""
+    return InstrumentedConnection if diagnostics.enabled else sqlite3.Connection
+
+
+# ----------- Handlers -----------
+def timed(name):
+    """Decorator timing a button handler / callback under the given name when enabled."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not diagnostics.enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                diagnostics.record("handler", name, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+# ----------- Diagnostics Panel -----------
+def open_diagnostics_panel(parent, refresh_ms=1000):
+    """Window listing the slowest operations of the session, refreshed while it is open."""
+    import tkinter as tk
+    from tkinter import ttk
+
+    win = tk.Toplevel(parent)
+    win.title("Diagnostics - slowest operations")
+    win.geometry("900x420")
+    win.configure(bg="#E5E7EB")
+
+    tk.Label(win, text=f"Slowest operations this session (logged above {diagnostics.slow_ms:g} ms to {LOG_FILE})",
+             font=("Arial", 11, "bold"), bg="#E5E7EB", fg="#1E3A8A").pack(anchor="w", padx=10, pady=(10, 4))
+
+    columns = ("Kind", "Operation", "Calls", "Total ms", "Max ms", "Rows")
+    tree = ttk.Treeview(win, columns=columns, show="headings", height=15)
+    for col, width in zip(columns, (70, 520, 60, 80, 80, 60)):
+        tree.heading(col, text=col)
+        tree.column(col, width=width, anchor="w" if col == "Operation" else tk.CENTER)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+    def refresh():
+        tree.delete(*tree.get_children())
+        for kind, name, calls, total, worst, rows in diagnostics.top():
+            tree.insert("", tk.END, values=(kind, name[:200], calls, f"{total:.1f}", f"{worst:.1f}",
+                                            "" if rows is None else rows))
+        win.after(refresh_ms, refresh)
+
+    def reset():
+        diagnostics.reset()
+        tree.delete(*tree.get_children())
+
+    tk.Button(win, text="Reset", command=reset, bg="#EF4444", fg="white",
+              font=("Arial", 10, "bold"), relief=tk.FLAT).pack(pady=8)
+    refresh()
+    return win
@@ -0,0 +1,103 @@
+# ========================= export.py =========================
+# Streams attendance history out as CSV or JSON Lines, optionally gzipped,
+# for spreadsheets and nightly data-warehouse loads.
+#
+# Rows come from Database.iter_attendance: keyset pages of each database file
+# (archives and student.db), in date, roll_no order straight off
+# idx_attendance_date. Each page is encoded (and compressed) and handed on
+# before the next one is read, so memory stays the same for a week or for ten
+# years of marks, and a slow reader never keeps the database locked.
+#
+#   python attendance.py export --start 2024-04-01 --end 2025-03-31 --out year.csv.gz
+#   python attendance.py export --start 2025-10-01 --end 2025-10-31 --format jsonl --out -
+#
+# The JSON API serves the same bytes at GET /export (see apiserver.py).
+
+import csv
+import io
+import json
+import zlib
+
+from database import EXPORT_BATCH
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_COLUMNS = ("date", "roll_no", "name", "section", "status")
+GZIP_LEVEL = 6
+
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+def export_filename(start, end, fmt="csv", compress=False):
+    """Default file name of an export of start..end (inclusive)."""
+    return f"attendance_{start}_to_{end}.{fmt}" + (".gz" if compress else "")
+
+
+def encode_csv(batches):
+    """CSV text (header first) for each batch of rows."""
+    buffer = io.StringIO()
+    out = csv.writer(buffer, lineterminator="\n")
+    out.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        out.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_jsonl(batches):
+    """One JSON object per row, a line each, for each batch of rows."""
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+ENCODERS = {"csv": encode_csv, "jsonl": encode_jsonl}
+
+
+def export_chunks(db, start, end, fmt="csv", compress=False, class_id=None, batch_size=EXPORT_BATCH,
+                  progress=None):
+    """
+    Yield the export of start <= date < end as bytes, one chunk per batch
+    (gzip members when compress=True). progress(rows, None, text) is called
+    after each batch and may raise to cancel.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    counted = {"rows": 0}
+
+    def counting(batches):
+        for rows in batches:
+            yield rows
+            counted["rows"] += len(rows)
+            if progress:
+                progress(counted["rows"], None, f"Exported {counted['rows']} rows...")
+
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None   # 31: gzip header
+    batches = db.iter_attendance(start, end, class_id, batch_size)
+    try:
+        for text in ENCODERS[fmt](counting(batches)):
+            data = text.encode("utf-8")
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor:
+            yield compressor.flush()
+    finally:
+        batches.close()
+
+
+def export_to_file(db, out, start, end, fmt="csv", compress=False, class_id=None, batch_size=EXPORT_BATCH,
+                   progress=None):
+    """Write the export to a binary file object. Returns the rows written."""
+    rows = {"done": 0}
+
+    def counted(done, total, text):
+        rows["done"] = done
+        if progress:
+            progress(done, total, text)
+
+    for chunk in export_chunks(db, start, end, fmt, compress, class_id, batch_size, counted):
+        out.write(chunk)
+    return rows["done"]
@@ -0,0 +1,226 @@
+# ========================= importer.py =========================
+# Bulk import of student rosters and attendance history from CSV or JSON
+# Lines (optionally gzipped), e.g. when moving over from another system.
+#
+# Records are read one at a time, checked, and written in IMPORT_BATCH-row
+# transactions (Database.import_students / import_attendance), so a file of
+# millions of rows needs no more memory than one batch. Writes are upserts:
+# importing a student again updates the name (and section), importing a
+# mark again replaces that day's status, so a file can be re-run safely.
+#
+#   python attendance.py import students roster.csv --class "CS S4"
+#   python attendance.py import attendance history.csv.gz --rejects rejected.csv
+#
+# Columns (CSV header or JSON keys; case and spaces do not matter):
+#   students     roll_no, name, [section]
+#   attendance   date, roll_no, status   (other columns, e.g. the name and
+#                                         section of an export, are ignored)
+#
+# Invalid rows (bad date, unknown student, archived date, ...) are skipped and
+# reported with their line number and reason; the rest are imported.
+
+import csv
+import datetime
+import gzip
+import json
+from collections import namedtuple
+
+from database import IMPORT_BATCH, ArchivedDateError
+
+IMPORT_KINDS = ("students", "attendance")
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Accepted spellings of a status -> the status the app stores
+STATUSES = {"present": "Present", "absent": "Absent", "leave": "Leave", "p": "Present", "a": "Absent", "l": "Leave"}
+
+# Other names the columns go by (the app's own table headings among them)
+COLUMN_ALIASES = {"roll": "roll_no", "rollno": "roll_no", "class": "section", "class_id": "section"}
+
+ImportResult = namedtuple("ImportResult", ["rows", "imported", "rejected"])
+
+
+class RejectedRow(ValueError):
+    """A record that cannot be imported; the message says why."""
+
+
+# ----------- Reading -----------
+def guess_format(path):
+    """'jsonl' for .jsonl / .ndjson / .json files (also gzipped), otherwise 'csv'."""
+    name = path.lower().removesuffix(".gz")
+    return "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def open_import(path):
+    """Open an import file as text; .gz files are decompressed as they are read."""
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def column_name(name):
+    """'Roll No' -> 'roll_no'."""
+    name = "_".join(str(name).strip().lower().split())
+    return COLUMN_ALIASES.get(name, name)
+
+
+def read_records(f, fmt="csv"):
+    """
+    Yield (line number, record dict, error) for each row of a text file.
+    error is None, or the reason the line could not be parsed.
+    """
+    if fmt == "csv":
+        reader = csv.reader(f)
+        header = [column_name(name) for name in next(reader, [])]
+        for row in reader:
+            if not any(row):
+                continue
+            error = None if len(row) <= len(header) else f"{len(row)} values for {len(header)} columns"
+            yield reader.line_num, dict(zip(header, row)), error
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, {"line": line.rstrip("\r\n")}, f"invalid JSON ({e})"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, {"line": line.rstrip("\r\n")}, "not a JSON object"
+                continue
+            yield line_no, {column_name(key): value for key, value in record.items()}, None
+    else:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+
+
+# ----------- Checking -----------
+def field(record, name):
+    """The record's value for a column as stripped text; RejectedRow if it is missing or empty."""
+    value = record.get(name)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        raise RejectedRow(f"no {name}")
+    return value
+
+
+def parse_roll_no(record):
+    value = field(record, "roll_no")
+    try:
+        return int(value)
+    except ValueError:
+        raise RejectedRow(f"roll_no '{value}' is not a whole number")
+
+
+class Checker:
+    """
+    Turns records into database rows, raising RejectedRow for bad ones.
+    Dates, sections and students are looked up once and remembered, so
+    checking costs a few dictionary lookups per row.
+    """
+
+    def __init__(self, db, class_id=None, add_sections=False):
+        self.db = db
+        self.class_id = class_id
+        self.add_sections = add_sections
+        self._dates = {}
+        self._sections = {}
+        self._roll_nos = None
+
+    def date(self, record):
+        """The record's date as YYYY-MM-DD; archived dates are rejected too."""
+        value = field(record, "date")
+        if value not in self._dates:
+            try:
+                date = datetime.datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+                self.db.check_writable(date)
+                self._dates[value] = date
+            except ValueError:
+                self._dates[value] = RejectedRow(f"invalid date '{value}', expected YYYY-MM-DD")
+            except ArchivedDateError as e:
+                self._dates[value] = RejectedRow(str(e))
+        date = self._dates[value]
+        if isinstance(date, RejectedRow):
+            raise date
+        return date
+
+    def section(self, record):
+        """class_id of the record's section (name or id), or the default one when it has none."""
+        value = record.get("section")
+        value = "" if value is None else str(value).strip()
+        if not value:
+            return self.class_id
+        if value not in self._sections:
+            found = self.db.find_class(value)
+            if found is None and self.add_sections:
+                found = self.db.add_class(value)
+            self._sections[value] = found[0] if found else None
+        if self._sections[value] is None:
+            raise RejectedRow(f"no section '{value}' (see 'python attendance.py classes', or use --add-sections)")
+        return self._sections[value]
+
+    def student(self, record):
+        """A students row: (roll_no, name, class_id)."""
+        return parse_roll_no(record), field(record, "name"), self.section(record)
+
+    def attendance(self, record):
+        """An attendance row: (roll_no, status, date)."""
+        roll_no = parse_roll_no(record)
+        if self._roll_nos is None:
+            self._roll_nos = {roll for roll, _ in self.db.all_students()}
+        if roll_no not in self._roll_nos:
+            raise RejectedRow(f"no student with roll_no {roll_no} (import the students first)")
+        value = field(record, "status")
+        status = STATUSES.get(value.lower())
+        if status is None:
+            raise RejectedRow(f"invalid status '{value}', expected Present, Absent or Leave")
+        return roll_no, status, self.date(record)
+
+
+# ----------- Importing -----------
+def import_records(db, f, kind, fmt="csv", class_id=None, add_sections=False, batch_size=IMPORT_BATCH,
+                   progress=None, on_reject=None):
+    """
+    Import a text file of student or attendance records (kind) into db.
+    Rows without a section go to class_id (students only). Rejected rows are
+    passed to on_reject(line number, record, reason) and skipped.
+    progress(rows, None, text) is called after each batch is written and may
+    raise to stop; batches already written stay. Returns an ImportResult.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(IMPORT_KINDS)}")
+    checker = Checker(db, class_id, add_sections)
+    check, write = ((checker.student, db.import_students) if kind == "students"
+                    else (checker.attendance, db.import_attendance))
+    rows, batch, imported, rejected = 0, [], 0, 0
+
+    def flush():
+        nonlocal imported
+        imported += write(batch)
+        batch.clear()
+        if progress:
+            progress(rows, None, f"Imported {imported} of {rows} rows...")
+
+    for line_no, record, error in read_records(f, fmt):
+        rows += 1
+        try:
+            if error:
+                raise RejectedRow(error)
+            batch.append(check(record))
+        except RejectedRow as e:
+            rejected += 1
+            if on_reject:
+                on_reject(line_no, record, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return ImportResult(rows, imported, rejected)
+
+
+def import_file(db, path, kind, fmt=None, class_id=None, add_sections=False, batch_size=IMPORT_BATCH,
+                progress=None, on_reject=None):
+    """import_records for a file path (format from the file name unless given)."""
+    with open_import(path) as f:
+        return import_records(db, f, kind, fmt or guess_format(path), class_id, add_sections, batch_size,
+                              progress, on_reject)
@@ -1,65 +1,48 @@
 # ================= Main Attendance Management System =================
 # main.py
 
+import time
+_START = time.perf_counter()
+
+# Optional startup timing (--startup-timing), set up before the other imports
+from startuptimer import StartupTimer
+startup_timer = StartupTimer.from_environment(start=_START)
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 import sqlite3
 import datetime
 import os
+import sys
 
-# Import report modules (make sure these modules exist)
-from dailyreport import open_daily_report
-from monthlyreport import open_monthly_report
-
-# ----------- Database Setup -----------
-def setup_database():
-    """
-    Create tables if not exist and ensure a unique index on (roll_no, date).
-    Safely removes existing duplicate attendance rows (keeps the earliest id).
-    """
-    conn = sqlite3.connect("student.db", timeout=10)
-    cur = conn.cursor()
-
-    # Create students table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS students (
-            roll_no INTEGER PRIMARY KEY,
-            name TEXT NOT NULL
-        )
-    """)
-
-    # Create attendance table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            roll_no INTEGER,
-            status TEXT,
-            date TEXT,
-            FOREIGN KEY(roll_no) REFERENCES students(roll_no)
-        )
-    """)
+from diagnostics import diagnostics, open_diagnostics_panel, timed
+from database import ALL_SECTIONS, get_db, setup_database
+from virtualtree import VirtualTree
 
-    conn.commit()
+startup_timer.mark("imports")
 
-    # Remove duplicates (keep the smallest id for each roll_no+date)
-    cur.execute("""
-        DELETE FROM attendance
-        WHERE id NOT IN (
-            SELECT MIN(id)
-            FROM attendance
-            GROUP BY roll_no, date
-        )
-    """)
-    conn.commit()
+SEARCH_DELAY_MS = 200   # type-ahead waits this long after the last key press
+
+
+# ----------- Report Windows (loaded on first use) -----------
+# dailyreport / monthlyreport / rangereport pull in tkcalendar, and the PDF exports pull in
+# reportlab; importing them only when a report is opened keeps startup light.
+@timed("Main: Open Daily Report")
+def open_daily_report(class_id=None):
+    from dailyreport import open_daily_report as open_window
+    open_window(class_id)
 
-    # Create unique index to prevent future duplicates
-    cur.execute("""
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_unique
-        ON attendance (roll_no, date)
-    """)
-    conn.commit()
 
-    conn.close()
+@timed("Main: Open Monthly Report")
+def open_monthly_report(class_id=None):
+    from monthlyreport import open_monthly_report as open_window
+    open_window(class_id)
+
+
+@timed("Main: Open Range Report")
+def open_range_report():
+    from rangereport import open_range_report as open_window
+    open_window()
 
 
 # ----------- Main Class -----------
@@ -111,13 +94,42 @@ class MainApp:
         tk.Button(student_frame, text="Delete Student", bg="#EF4444", fg="white", font=("Arial", 11, "bold"),
                   command=self.delete_student, width=14).grid(row=1, column=2, padx=10, pady=8)
 
+        # Section shown in the table; new students are added to it, Mark All marks only it
+        tk.Label(student_frame, text="Section:", font=("Arial", 12), bg="#E5E7EB").grid(row=2, column=0, padx=5, pady=5)
+        self.class_id = None
+        self.sections = {}
+        self.section_box = ttk.Combobox(student_frame, state="readonly", font=("Arial", 12), width=22)
+        self.section_box.grid(row=2, column=1, columnspan=2, padx=5, sticky="w")
+        self.section_box.bind("<<ComboboxSelected>>", self.select_section)
+        section_buttons = tk.Frame(student_frame, bg="#E5E7EB")
+        section_buttons.grid(row=2, column=3, columnspan=3, sticky="w")
+        tk.Button(section_buttons, text="➕ New Section", command=self.add_section, bg="#6366F1", fg="white",
+                  font=("Arial", 9, "bold"), relief=tk.FLAT).pack(side=tk.LEFT, padx=4)
+        tk.Button(section_buttons, text="✏️ Rename", command=self.rename_section, bg="#6366F1", fg="white",
+                  font=("Arial", 9, "bold"), relief=tk.FLAT).pack(side=tk.LEFT, padx=4)
+        tk.Button(section_buttons, text="📦 Move Selected To...", command=self.move_to_section, bg="#6366F1",
+                  fg="white", font=("Arial", 9, "bold"), relief=tk.FLAT).pack(side=tk.LEFT, padx=4)
+        self.load_sections()
+
         # --- Attendance Table ---
         table_frame = tk.LabelFrame(main_frame, text="📅 Mark Attendance", font=("Arial", 14, "bold"),
                                     bg="#E5E7EB", fg="#1E3A8A", padx=15, pady=10)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
 
+        # Type-ahead filter (name or roll no), applied once typing pauses
+        search_bar = tk.Frame(table_frame, bg="#E5E7EB")
+        search_bar.pack(fill=tk.X, pady=(0, 6))
+        tk.Label(search_bar, text="🔍 Search (Name or Roll No):", font=("Arial", 11), bg="#E5E7EB").pack(side=tk.LEFT)
+        self.search_entry = tk.Entry(search_bar, font=("Arial", 12), width=30)
+        self.search_entry.pack(side=tk.LEFT, padx=6)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        tk.Button(search_bar, text="✖ Clear", command=self.clear_search, bg="#6B7280", fg="white",
+                  font=("Arial", 9, "bold"), relief=tk.FLAT).pack(side=tk.LEFT)
+        self.search = ""
+        self._search_job = None
+
         columns = ("Roll No", "Name", "Status")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=20)
+        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=20, selectmode="extended")
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, anchor=tk.CENTER, width=150)
@@ -125,9 +137,17 @@ class MainApp:
 
         # Scrollbar
         scrollbar = ttk.Scrollbar(self.tree, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
         scrollbar.pack(side="right", fill="y")
 
+        # Only the visible pages of the roster are kept in the tree
+        self.current_date = today_str
+        self.grid = VirtualTree(
+            self.tree,
+            lambda after, before, limit: get_db().roster_page(self.current_date, after, before, limit,
+                                                              search=self.search, class_id=self.class_id),
+            scrollbar=scrollbar
+        )
+
         # --- Status Buttons ---
         status_frame = tk.Frame(main_frame, bg="#E5E7EB")
         status_frame.pack(pady=10)
@@ -163,13 +183,20 @@ class MainApp:
                 cursor="hand2"
             )
 
-        make_btn("📅 Open Daily Report", open_daily_report, "#3B82F6").pack(pady=8)
-        make_btn("📆 Open Monthly Report", open_monthly_report, "#10B981").pack(pady=8)
+        make_btn("📅 Open Daily Report", lambda: open_daily_report(self.class_id), "#3B82F6").pack(pady=8)
+        make_btn("📆 Open Monthly Report", lambda: open_monthly_report(self.class_id), "#10B981").pack(pady=8)
+        make_btn("📚 Open Term Report", open_range_report, "#047857").pack(pady=8)
+
+        # Slowest SQL / handlers of the session (only with --diagnostics)
+        if diagnostics.enabled:
+            tk.Button(report_frame, text="🩺 Diagnostics", command=lambda: open_diagnostics_panel(self.root),
+                      bg="#6B7280", fg="white", font=("Arial", 10, "bold"), relief=tk.FLAT).pack(pady=4)
 
         # Load students and today's status
         self.load_students()
 
     # -------- Add Student --------
+    @timed("Main: Add Student")
     def add_student(self):
         roll = self.roll_entry.get().strip()
         name = self.name_entry.get().strip()
@@ -178,21 +205,18 @@ class MainApp:
             messagebox.showerror("Error", "Please enter both Roll No and Name!")
             return
 
-        conn = sqlite3.connect("student.db", timeout=5)
-        cur = conn.cursor()
         try:
-            cur.execute("INSERT INTO students (roll_no, name) VALUES (?, ?)", (int(roll), name))
-            conn.commit()
+            roll_no, _ = get_db().add_student(int(roll), name, self.class_id)
             messagebox.showinfo("Success", "Student added successfully!")
+            self.load_sections()
+            self.refresh_rows([roll_no])
         except sqlite3.IntegrityError:
             messagebox.showerror("Error", "Roll No already exists!")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
-        finally:
-            conn.close()
-        self.load_students()
 
     # -------- Edit Student --------
+    @timed("Main: Edit Student")
     def edit_student(self):
         selected = self.tree.focus()
         if not selected:
@@ -208,21 +232,18 @@ class MainApp:
             messagebox.showerror("Error", "Please enter new Roll No and Name!")
             return
 
-        conn = sqlite3.connect("student.db", timeout=5)
-        cur = conn.cursor()
         try:
-            cur.execute("UPDATE students SET roll_no=?, name=? WHERE roll_no=?", (int(new_roll), new_name, int(old_roll)))
-            conn.commit()
+            roll_no, _ = get_db().update_student(int(old_roll), int(new_roll), new_name)
             messagebox.showinfo("Updated", "Student record updated successfully!")
+            self.grid.delete_row(int(old_roll))
+            self.refresh_rows([roll_no])
         except sqlite3.IntegrityError:
             messagebox.showerror("Error", "Roll No already exists, please choose another.")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
-        finally:
-            conn.close()
-        self.load_students()
 
     # -------- Delete Student --------
+    @timed("Main: Delete Student")
     def delete_student(self):
         selected = self.tree.focus()
         if not selected:
@@ -231,19 +252,108 @@ class MainApp:
         values = self.tree.item(selected, "values")
         roll_no = values[0]
 
-        conn = sqlite3.connect("student.db", timeout=5)
-        cur = conn.cursor()
         try:
-            cur.execute("DELETE FROM students WHERE roll_no=?", (int(roll_no),))
-            conn.commit()
+            deleted = get_db().delete_student(int(roll_no))
             messagebox.showinfo("Deleted", f"Student Roll No {roll_no} deleted successfully.")
+            self.grid.delete_row(deleted)
+            self.load_sections()
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
-        finally:
-            conn.close()
+
+    # -------- Sections --------
+    def load_sections(self):
+        """Fill the section picker (name (students)) and keep the current section selected."""
+        self.sections = {f"{name} ({count})": class_id for class_id, name, count in get_db().classes()}
+        self.section_box["values"] = (ALL_SECTIONS, *self.sections)
+        current = next((label for label, class_id in self.sections.items() if class_id == self.class_id), None)
+        self.section_box.set(current or ALL_SECTIONS)
+        self.class_id = self.sections.get(current)
+
+    def section_name(self):
+        return next((name for class_id, name, _ in get_db().classes() if class_id == self.class_id), ALL_SECTIONS)
+
+    @timed("Main: Select Section")
+    def select_section(self, event=None):
+        self.class_id = self.sections.get(self.section_box.get())
+        self.load_students()
+
+    def add_section(self):
+        name = simpledialog.askstring("New Section", "Section name (e.g. CS S4):", parent=self.root)
+        if not name or not name.strip():
+            return
+        try:
+            self.class_id, _ = get_db().add_class(name.strip())
+        except sqlite3.IntegrityError:
+            messagebox.showerror("Error", f"A section named '{name.strip()}' already exists.")
+            return
+        self.load_sections()
         self.load_students()
 
+    def rename_section(self):
+        if self.class_id is None:
+            messagebox.showwarning("Select Section", "Please select the section to rename.")
+            return
+        name = simpledialog.askstring("Rename Section", "New name:", initialvalue=self.section_name(),
+                                      parent=self.root)
+        if not name or not name.strip():
+            return
+        try:
+            get_db().rename_class(self.class_id, name.strip())
+        except sqlite3.IntegrityError:
+            messagebox.showerror("Error", f"A section named '{name.strip()}' already exists.")
+            return
+        self.load_sections()
+
+    @timed("Main: Move Students")
+    def move_to_section(self):
+        selected = self.tree.selection() or ((self.tree.focus(),) if self.tree.focus() else ())
+        if not selected:
+            messagebox.showwarning("Select Student", "Please select the students to move.")
+            return
+        name = simpledialog.askstring("Move Students", f"Move {len(selected)} student(s) to section:",
+                                      parent=self.root)
+        if not name or not name.strip():
+            return
+        section = get_db().find_class(name.strip())
+        if section is None:
+            messagebox.showerror("Error", f"There is no section named '{name.strip()}'.")
+            return
+        moved = get_db().move_students([int(self.tree.item(item, "values")[0]) for item in selected], section[0])
+        if self.class_id not in (None, section[0]):
+            for roll_no in moved:
+                self.grid.delete_row(roll_no)
+        self.load_sections()
+
+    # -------- Patch Rows In Place (no full reload) --------
+    def refresh_rows(self, roll_nos):
+        """Re-read only the given students and update/insert their rows in the grid."""
+        for row in get_db().roster_rows(self.current_date, roll_nos, search=self.search):
+            self.grid.upsert_row(row)
+
+    # -------- Type-ahead Search (debounced) --------
+    def schedule_search(self, event=None):
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DELAY_MS, self.apply_search)
+
+    @timed("Main: Search")
+    def apply_search(self):
+        self._search_job = None
+        search = self.search_entry.get().strip()
+        if search == self.search:
+            return
+        self.search = search
+        try:
+            self.grid.reload()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not search students: {e}")
+
+    def clear_search(self):
+        self.search_entry.delete(0, tk.END)
+        self.apply_search()
+
     # -------- Load Students from Database (shows status for selected date) --------
+    @timed("Main: Load Students")
     def load_students(self):
         # Determine date from date_entry (fallback to today)
         try:
@@ -259,33 +369,22 @@ class MainApp:
             except Exception:
                 pass
 
-        self.tree.delete(*self.tree.get_children())
-        conn = sqlite3.connect("student.db", timeout=5)
-        cur = conn.cursor()
+        self.current_date = date
         try:
-            # left join to get today's attendance if any
-            cur.execute("""
-                SELECT s.roll_no, s.name, IFNULL(a.status, '') as status
-                FROM students s
-                LEFT JOIN attendance a
-                  ON s.roll_no = a.roll_no AND a.date = ?
-                ORDER BY s.roll_no
-            """, (date,))
-            rows = cur.fetchall()
-            for row in rows:
-                self.tree.insert("", tk.END, values=(row[0], row[1], row[2]))
+            # left join to get the date's attendance if any, one page at a time
+            self.grid.reload()
         except Exception as e:
             messagebox.showerror("Error", f"Could not load students: {e}")
-        finally:
-            conn.close()
 
-    # -------- Mark Individual Attendance (insert or update) --------
+    # -------- Mark Selected Students' Attendance (insert or update) --------
+    @timed("Main: Mark Attendance")
     def mark_attendance(self, status):
-        selected = self.tree.focus()
+        # Every row selected with Ctrl/Shift-click (or just the focused row)
+        selected = self.tree.selection() or ((self.tree.focus(),) if self.tree.focus() else ())
         if not selected:
             messagebox.showwarning("Select Student", "Please select a student to mark attendance.")
             return
-        roll_no, name, _ = self.tree.item(selected, "values")
+        names = {int(values[0]): values[1] for values in (self.tree.item(item, "values") for item in selected)}
 
         # Use selected date from UI (or today's date)
         try:
@@ -296,37 +395,29 @@ class MainApp:
             self.date_entry.delete(0, tk.END)
             self.date_entry.insert(0, date)
 
-        conn = sqlite3.connect("student.db", timeout=5)
-        cur = conn.cursor()
         try:
-            # Check if attendance exists for this roll & date
-            cur.execute("SELECT id, status FROM attendance WHERE roll_no = ? AND date = ?", (int(roll_no), date))
-            existing = cur.fetchone()
-            if existing:
-                # Update the existing record
-                cur.execute("UPDATE attendance SET status = ? WHERE id = ?", (status, existing[0]))
-                conn.commit()
-                messagebox.showinfo("Updated", f"Attendance updated to '{status}' for {name}.")
+            # One upsert transaction for all selected roll numbers
+            result = get_db().mark_students(names, status, date)
+            name = next(iter(names.values()))
+            if len(names) > 1:
+                messagebox.showinfo("Success", f"Marked {result.inserted} new and updated {result.updated} students as {status} for {date}!")
+            elif result.inserted:
+                messagebox.showinfo("Success", f"Attendance marked as {status} for {name}.")
             else:
-                # Insert new attendance record
-                try:
-                    cur.execute("INSERT INTO attendance (roll_no, status, date) VALUES (?, ?, ?)", (int(roll_no), status, date))
-                    conn.commit()
-                    messagebox.showinfo("Success", f"Attendance marked as {status} for {name}.")
-                except sqlite3.IntegrityError:
-                    # If unique constraint triggered for some reason, update instead
-                    cur.execute("UPDATE attendance SET status = ? WHERE roll_no = ? AND date = ?", (status, int(roll_no), date))
-                    conn.commit()
-                    messagebox.showinfo("Updated", f"Attendance updated to '{status}' for {name}.")
+                messagebox.showinfo("Updated", f"Attendance updated to '{status}' for {name}.")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while marking attendance:\n{e}")
-        finally:
-            conn.close()
+            return
 
-        # update UI
-        self.load_students()
+        # update UI: patch just the marked rows, unless the date itself changed
+        if date != self.current_date:
+            self.load_students()
+            return
+        for roll_no, new_status in result.rows:
+            self.grid.update_row((roll_no, names[roll_no], new_status))
 
     # -------- Mark All Students Present (insert or update) --------
+    @timed("Main: Mark All Present")
     def mark_all_present(self):
         # Use selected date from UI (or today's date)
         try:
@@ -338,52 +429,47 @@ class MainApp:
             self.date_entry.insert(0, date)
 
         # Optional confirmation
-        if not messagebox.askyesno("Confirm", f"Mark ALL students as Present for {date}?"):
+        who = "ALL students" if self.class_id is None else f"ALL students of {self.section_name()}"
+        if not messagebox.askyesno("Confirm", f"Mark {who} as Present for {date}?"):
             return
 
-        conn = sqlite3.connect("student.db", timeout=10)
-        cur = conn.cursor()
         try:
-            cur.execute("SELECT roll_no FROM students")
-            students = cur.fetchall()
-
-            count_inserted = 0
-            count_updated = 0
-
-            for (roll_no,) in students:
-                # Check if attendance exists for this student & date
-                cur.execute("SELECT id, status FROM attendance WHERE roll_no = ? AND date = ?", (int(roll_no), date))
-                existing = cur.fetchone()
-
-                if existing:
-                    if existing[1] != "Present":
-                        cur.execute("UPDATE attendance SET status = ? WHERE id = ?", ("Present", existing[0]))
-                        count_updated += 1
-                else:
-                    try:
-                        cur.execute("INSERT INTO attendance (roll_no, status, date) VALUES (?, ?, ?)", (int(roll_no), "Present", date))
-                        count_inserted += 1
-                    except sqlite3.IntegrityError:
-                        # If race condition or other, update instead
-                        cur.execute("UPDATE attendance SET status = ? WHERE roll_no = ? AND date = ?", ("Present", int(roll_no), date))
-                        count_updated += 1
-
-            conn.commit()
-            messagebox.showinfo("Success", f"Marked {count_inserted} new and updated {count_updated} students as Present for {date}!")
+            result = get_db().mark_all_present(date, self.class_id)
+            messagebox.showinfo("Success", f"Marked {result.inserted} new and updated {result.updated} students as Present for {date}!")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while marking all present:\n{e}")
-        finally:
-            conn.close()
+            return
 
-        # Refresh UI
-        self.load_students()
+        # Refresh UI: every loaded row is now Present; pages loaded later are read fresh
+        if date != self.current_date:
+            self.load_students()
+            return
+        self.grid.set_column("Status", "Present")
 
 
 # ----------- Run Application -----------
 if __name__ == "__main__":
+    # Needed for the PDF export process pool in frozen (PyInstaller) builds
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # Optional SQL / handler timings (--diagnostics), before the first connection opens
+    diagnostics.enable_from_argv(sys.argv)
+
     # Ensure DB and indexes are set up
     setup_database()
+    startup_timer.mark("setup_database")
+
+    # Hourly online backups on a background thread (ATTENDANCE_BACKUP_MINUTES=0 turns them off)
+    from backup import BackupScheduler
+    backups = BackupScheduler.from_environment(get_db())
+    if backups:
+        backups.start()
 
     root = tk.Tk()
     app = MainApp(root)
+    startup_timer.mark("build window")
+    root.after_idle(startup_timer.finish)
     root.mainloop()
+    if backups:
+        backups.stop()
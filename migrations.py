@@ -0,0 +1,147 @@
+# ========================= migrations.py =========================
+# Versioned schema migrations, tracked with PRAGMA user_version.
+#
+# Each step runs once, in its own transaction together with the user_version
+# bump, so startup on an up-to-date database is a single PRAGMA read no matter
+# how large the attendance history is. To change the schema, append a new
+# numbered step to MIGRATIONS; never edit a step that has already shipped.
+
+import sqlite3
+
+from database import (SQL_CREATE_MONTHLY_SUMMARY, SQL_MONTHLY_SUMMARY_TRIGGERS, SQL_REBUILD_MONTHLY_SUMMARY,
+                      SQL_CREATE_STUDENTS_FTS, SQL_STUDENTS_FTS_TRIGGERS, SQL_REBUILD_STUDENTS_FTS,
+                      SQL_CREATE_STUDENT_NAME_INDEX, SQL_CREATE_ARCHIVES, DEFAULT_CLASS_ID, DEFAULT_CLASS_NAME,
+                      SQL_CREATE_CLASSES, SQL_ADD_STUDENT_CLASS, SQL_CREATE_STUDENT_CLASS_INDEX,
+                      SQL_CREATE_MONTHLY_MONTH_INDEX)
+
+
+# ----------- Steps -----------
+def create_base_tables(conn):
+    # Create students table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            roll_no INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        )
+    """)
+
+    # Create attendance table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            roll_no INTEGER,
+            status TEXT,
+            date TEXT,
+            FOREIGN KEY(roll_no) REFERENCES students(roll_no)
+        )
+    """)
+
+
+def dedupe_and_unique_index(conn):
+    # Remove duplicates (keep the smallest id for each roll_no+date)
+    conn.execute("""
+        DELETE FROM attendance
+        WHERE id NOT IN (
+            SELECT MIN(id)
+            FROM attendance
+            GROUP BY roll_no, date
+        )
+    """)
+
+    # Create unique index to prevent future duplicates
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_unique
+        ON attendance (roll_no, date)
+    """)
+
+
+def covering_date_index(conn):
+    # Covering index so date-range reports never touch the table itself
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_attendance_date
+        ON attendance (date, roll_no, status)
+    """)
+
+
+def monthly_summary(conn):
+    # Monthly summary table, maintained by triggers, backfilled from history
+    conn.execute(SQL_CREATE_MONTHLY_SUMMARY)
+    for trigger in SQL_MONTHLY_SUMMARY_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("DELETE FROM attendance_monthly")
+    conn.execute(SQL_REBUILD_MONTHLY_SUMMARY)
+
+
+def student_search(conn):
+    # NOCASE name index for short prefix searches
+    conn.execute(SQL_CREATE_STUDENT_NAME_INDEX)
+
+    # Trigram full-text index over names, kept in sync by triggers, built from
+    # the existing roster. SQLite builds without FTS5 trigram (older than
+    # 3.34) skip it and search falls back to LIKE.
+    try:
+        conn.execute(SQL_CREATE_STUDENTS_FTS)
+    except sqlite3.OperationalError:
+        return
+    for trigger in SQL_STUDENTS_FTS_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute(SQL_REBUILD_STUDENTS_FTS)
+
+
+def archive_registry(conn):
+    # Registry of the per-year archive files made by archive.py (empty until the first archive)
+    conn.execute(SQL_CREATE_ARCHIVES)
+
+
+def class_sections(conn):
+    # Existing students all go to the one section the app had so far
+    conn.execute(SQL_CREATE_CLASSES)
+    conn.execute("INSERT OR IGNORE INTO classes (class_id, name) VALUES (?, ?)", (DEFAULT_CLASS_ID, DEFAULT_CLASS_NAME))
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(students)")]
+    if "class_id" not in columns:
+        conn.execute(SQL_ADD_STUDENT_CLASS)
+    conn.execute(SQL_CREATE_STUDENT_CLASS_INDEX)
+
+
+def monthly_month_index(conn):
+    # Whole-school month ranges (terms, years) seek instead of scanning the summary
+    conn.execute(SQL_CREATE_MONTHLY_MONTH_INDEX)
+
+
+# (version, description, step) in order; the database is at version N once step N ran
+MIGRATIONS = [
+    (1, "students and attendance tables", create_base_tables),
+    (2, "remove duplicate attendance rows, unique (roll_no, date) index", dedupe_and_unique_index),
+    (3, "covering (date, roll_no, status) index", covering_date_index),
+    (4, "attendance_monthly summary table and triggers", monthly_summary),
+    (5, "students_fts trigram search index and NOCASE name index", student_search),
+    (6, "attendance_archives registry of per-year archive files", archive_registry),
+    (7, "classes table, students.class_id and (class_id, roll_no, name) index", class_sections),
+    (8, "(year, month) index on attendance_monthly", monthly_month_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ----------- Runner -----------
+def schema_version(db):
+    return db.conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db, log=None):
+    """
+    Apply every pending step to the database. Returns the list of versions applied.
+    A database written by a newer version of the app is left untouched.
+    """
+    applied = []
+    current = schema_version(db)
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        with db.transaction() as conn:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        applied.append(version)
+        if log:
+            log(f"Applied migration {version}: {description}")
+    return applied
@@ -1,157 +1,40 @@
 # ========================= monthlyreport.py =========================
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import os
 import calendar
+from database import ALL_SECTIONS, get_db, month_range
+from virtualtree import VirtualTree
+from tasks import TaskRunner, TaskStatusBar
+from diagnostics import timed
 
-def open_monthly_report():
-    # -------- Helper: fetch aggregated monthly data for all students --------
-    def fetch_monthly_data(month, year):
-        conn = sqlite3.connect("student.db")
-        cur = conn.cursor()
-        mm = f"{month:02d}"
-        yyyy = str(year)
-        cur.execute("""
-            SELECT s.roll_no, s.name,
-                   SUM(CASE WHEN a.status='Present' THEN 1 ELSE 0 END) as presents,
-                   SUM(CASE WHEN a.status='Absent' THEN 1 ELSE 0 END) as absents,
-                   SUM(CASE WHEN a.status='Leave' THEN 1 ELSE 0 END) as leaves,
-                   COUNT(a.status) as total_days
-            FROM students s
-            LEFT JOIN attendance a
-              ON s.roll_no = a.roll_no
-              AND strftime('%m', a.date)=? AND strftime('%Y', a.date)=?
-            GROUP BY s.roll_no, s.name
-            ORDER BY s.roll_no
-        """, (mm, yyyy))
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+SEARCH_DELAY_MS = 200   # pick-list refreshes this long after the last key press
+PICK_LIST_SIZE = 20     # best matches shown in the pick-list
 
-    # -------- Helper: fetch per-student day-wise records for that month --------
-    def fetch_student_records(roll_no, month, year):
-        conn = sqlite3.connect("student.db")
-        cur = conn.cursor()
-        mm = f"{month:02d}"
-        yyyy = str(year)
-        cur.execute("""
-            SELECT date, status
-            FROM attendance
-            WHERE roll_no = ? AND strftime('%m', date)=? AND strftime('%Y', date)=?
-            ORDER BY date
-        """, (roll_no, mm, yyyy))
-        rows = cur.fetchall()
-        conn.close()
-        return rows
-
-    # -------- Export full-month aggregated PDF (No Leave Column + Fixed Layout) --------
-    def export_month_pdf(month, year, data):
-        if not data:
-            messagebox.showwarning("No Data", "No data to export for the selected month.")
-            return
 
-        if not os.path.exists("Monthly PDF Folder"):
-            os.makedirs("Monthly PDF Folder")
-        month_name = calendar.month_name[month]
-        filename = f"Monthly PDF Folder/Monthly_Report_{month_name}_{year}.pdf"
-
-        c = canvas.Canvas(filename, pagesize=A4)
-        width, height = A4
-
-        def draw_header(y_start):
-            """Draw table header on each new page"""
-            c.setFont("Helvetica-Bold", 11)
-            c.drawString(40, y_start, "Roll No")
-            c.drawString(110, y_start, "Name")
-            c.drawString(310, y_start, "Present")
-            c.drawString(380, y_start, "Absent")
-            c.drawString(460, y_start, "Total")
-            c.drawString(530, y_start, "Percent")
-
-        # Title
-        c.setFont("Helvetica-Bold", 18)
-        c.drawString(150, height - 50, "Monthly Attendance Report")
-
-        # Month name
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 80, f"Month: {month_name} {year}")
-
-        # First header
-        y = height - 110
-        draw_header(y)
-        y -= 16
-        c.setFont("Helvetica", 10)
-
-        for roll, name, presents, absents, leaves, total in data:
-            percent = ((presents + leaves) / total * 100) if total else 0
-            c.drawString(40, y, str(roll))
-            c.drawString(110, y, str(name)[:28])
-            c.drawString(310, y, str(presents))
-            c.drawString(380, y, str(absents))
-            c.drawString(460, y, str(total))
-            c.drawString(530, y, f"{percent:.1f}%")
-
-            y -= 15  # spacing optimized
-
-            # --- Page break condition ---
-            if y < 60:
-                c.showPage()
-                c.setFont("Helvetica-Bold", 18)
-                c.drawString(150, height - 50, "Monthly Attendance Report ")
-                c.setFont("Helvetica", 12)
-                c.drawString(50, height - 80, f"Month: {month_name} {year}")
-                y = height - 110
-                draw_header(y)
-                y -= 16
-                c.setFont("Helvetica", 10)
-
-        c.save()
-        messagebox.showinfo("Success", f"✅ Monthly PDF saved successfully:\n{filename}")
-
-
-    # -------- Export individual student's month PDF (detailed by date) --------
-    def export_student_pdf(roll_no, name, month, year, records):
-        if not records:
-            messagebox.showwarning("No Data", f"No attendance records found for {name} in {calendar.month_name[month]} {year}.")
-            return
+def pdf():
+    """The PDF writers module; reportlab is only imported on the first export."""
+    import pdfreports
+    return pdfreports
+
 
-        if not os.path.exists("Monthly PDF Folder"):
-            os.makedirs("Monthly PDF Folder")
-        month_name = calendar.month_name[month]
-        filename = f"Monthly PDF Folder/Student_{roll_no}_{month_name}_{year}.pdf"
-
-        c = canvas.Canvas(filename, pagesize=A4)
-        width, height = A4
-
-        # Title and details
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(140, height - 50, f"Monthly Attendance - {name} ({roll_no})")
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 80, f"Month: {month_name} {year}")
-
-        # Table header
-        y = height - 120
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(80, y, "Date")
-        c.drawString(200, y, "Status")
-        y -= 18
-        c.setFont("Helvetica", 11)
-
-        for date, status in records:
-            c.drawString(80, y, str(date))
-            c.drawString(200, y, str(status))
-            y -= 16
-            if y < 80:
-                c.showPage()
-                y = height - 80
-                c.setFont("Helvetica", 11)
-
-        c.save()
-        messagebox.showinfo("Success", f"✅ Student PDF saved:\n{filename}")
+def open_monthly_report(class_id=None):
+    # Section picker choices: the whole institution or one section
+    sections = {ALL_SECTIONS: None, **{name: cid for cid, name, _ in get_db().classes()}}
+
+    def section_id():
+        return sections[section_var.get()]
+
+    def section_name():
+        return section_var.get() if section_id() is not None else None
+
+    # -------- Helper: fetch aggregated monthly data for all students (of the section) --------
+    def fetch_monthly_data(month, year, class_id):
+        return get_db().fetch_monthly_data(month, year, class_id)
+
+    # -------- Helper: fetch per-student day-wise records for that month --------
+    def fetch_student_records(roll_no, month, year):
+        return get_db().fetch_student_records(roll_no, month, year)
 
     # -------- Build Window --------
     win = tk.Toplevel()
@@ -182,11 +65,73 @@ def open_monthly_report():
     year_combo = ttk.Combobox(control, textvariable=year_var, values=year_range, width=8, state="readonly")
     year_combo.grid(row=0, column=3, padx=6)
 
+    tk.Label(control, text="Section:", bg="#f3efff", font=("Segoe UI", 11)).grid(row=1, column=0, padx=6, pady=(8, 0), sticky="w")
+    section_var = tk.StringVar(value=next((name for name, cid in sections.items() if cid == class_id), ALL_SECTIONS))
+    section_combo = ttk.Combobox(control, textvariable=section_var, values=list(sections), width=20, state="readonly")
+    section_combo.grid(row=1, column=1, columnspan=3, padx=6, pady=(8, 0), sticky="w")
+    section_combo.bind("<<ComboboxSelected>>", lambda e: load_data())
+
     # Search bar for individual student
     tk.Label(control, text="Search (Roll or Name):", bg="#f3efff", font=("Segoe UI", 11)).grid(row=0, column=4, padx=(18,6), sticky="w")
     search_entry = tk.Entry(control, font=("Segoe UI", 11), width=25)
     search_entry.grid(row=0, column=5, padx=6)
 
+    # Ranked pick-list dropping down under the search box while typing
+    pick_list = tk.Listbox(win, font=("Segoe UI", 10), activestyle="dotbox", exportselection=False)
+    picks = {"rows": [], "chosen": None, "job": None}
+
+    def student_label(row):
+        return f"{row[0]} - {row[1]}"
+
+    def show_picks(rows):
+        picks["rows"] = rows
+        pick_list.delete(0, tk.END)
+        for row in rows:
+            pick_list.insert(tk.END, student_label(row))
+        if rows:
+            pick_list.configure(height=min(len(rows), 8))
+            pick_list.place(in_=search_entry, x=0, rely=1.0, relwidth=1.6)
+            pick_list.lift()
+        else:
+            pick_list.place_forget()
+
+    def update_picks():
+        picks["job"] = None
+        query = search_entry.get().strip()
+        show_picks(get_db().search_students(query, PICK_LIST_SIZE, section_id()) if query else [])
+
+    def search_typed(event):
+        if event.keysym == "Down" and picks["rows"]:
+            pick_list.focus_set()
+            pick_list.selection_clear(0, tk.END)
+            pick_list.selection_set(0)
+            pick_list.activate(0)
+            return
+        if event.keysym in ("Escape", "Return", "Up"):
+            pick_list.place_forget()
+            return
+        picks["chosen"] = None
+        if picks["job"] is not None:
+            win.after_cancel(picks["job"])
+        picks["job"] = win.after(SEARCH_DELAY_MS, update_picks)
+
+    def choose_pick(event=None, export=False):
+        selection = pick_list.curselection()
+        if not selection:
+            return
+        picks["chosen"] = picks["rows"][selection[0]]
+        search_entry.delete(0, tk.END)
+        search_entry.insert(0, student_label(picks["chosen"]))
+        if export:
+            pick_list.place_forget()
+            handle_export_individual()
+
+    search_entry.bind("<KeyRelease>", search_typed)
+    pick_list.bind("<<ListboxSelect>>", choose_pick)
+    pick_list.bind("<Double-Button-1>", lambda e: choose_pick(e, export=True))
+    pick_list.bind("<Return>", lambda e: choose_pick(e, export=True))
+    pick_list.bind("<Escape>", lambda e: (pick_list.place_forget(), search_entry.focus_set()))
+
     # Buttons for actions
     btn_frame = tk.Frame(win, bg="#f3efff")
     btn_frame.pack(fill="x", padx=18, pady=(0,10))
@@ -203,6 +148,14 @@ def open_monthly_report():
                                   font=("Segoe UI", 11, "bold"), width=18, relief=tk.FLAT)
     export_person_btn.grid(row=0, column=2, padx=8)
 
+    export_class_btn = tk.Button(btn_frame, text="📚 Export All Student PDFs", bg="#7C3AED", fg="white",
+                                 font=("Segoe UI", 11, "bold"), width=20, relief=tk.FLAT)
+    export_class_btn.grid(row=1, column=1, columnspan=2, padx=8, pady=(8, 0))
+
+    combined_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(btn_frame, text="Single combined file", variable=combined_var,
+                   bg="#f3efff", font=("Segoe UI", 10)).grid(row=1, column=3, padx=8, pady=(8, 0))
+
     refresh_btn = tk.Button(btn_frame, text="🔄 Refresh", bg="#F59E0B", fg="white",
                             font=("Segoe UI", 11, "bold"), width=12, relief=tk.FLAT,
                             command=lambda: load_data())
@@ -229,10 +182,32 @@ def open_monthly_report():
     tree.pack(fill="both", expand=True, side="left")
 
     scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
-    tree.configure(yscroll=scrollbar.set)
     scrollbar.pack(side="right", fill="y")
 
+    def format_row(row):
+        roll, name, presents, absents, leaves, total = row
+        percent = ((presents + leaves) / total * 100) if total else 0.0
+        return (roll, name, presents, absents, leaves, total, f"{percent:.1f}%")
+
+    # Month currently shown; the grid pages through it as the user scrolls
+    shown = {"month": datetime.date.today().month, "year": datetime.date.today().year, "class_id": class_id}
+    grid = VirtualTree(
+        tree,
+        lambda after, before, limit: get_db().monthly_page(shown["month"], shown["year"], after, before, limit,
+                                                           shown["class_id"]),
+        scrollbar=scrollbar,
+        format_row=format_row
+    )
+
+    # Fetches for exports and the PDF rendering run in the background
+    runner = TaskRunner(win)
+    win.bind("<Destroy>", lambda e: runner.shutdown() if e.widget is win else None)
+
+    def export_failed(e):
+        messagebox.showerror("Error", f"Could not export PDF:\n{e}")
+
     # -------- Load / Show data into table --------
+    @timed("Monthly: Show")
     def load_data():
         try:
             month = int(month_var.get())
@@ -241,14 +216,11 @@ def open_monthly_report():
             messagebox.showerror("Invalid Month/Year", "Please select a valid month and year.")
             return
 
-        rows = fetch_monthly_data(month, year)
-        tree.delete(*tree.get_children())
-        for roll, name, presents, absents, leaves, total in rows:
-            percent = ((presents + leaves) / total * 100) if total else 0.0
-            tree.insert("", tk.END, values=(roll, name, presents, absents, leaves, total, f"{percent:.1f}%"))
-        return rows
+        shown.update(month=month, year=year, class_id=section_id())
+        grid.reload()
 
     # -------- Search student and export individual's monthly PDF --------
+    @timed("Monthly: Export Student PDF")
     def handle_export_individual():
         query = search_entry.get().strip()
         if not query:
@@ -261,31 +233,42 @@ def open_monthly_report():
             messagebox.showerror("Invalid Month/Year", "Please select a valid month and year.")
             return
 
-        # Determine if numeric (roll) or name
-        conn = sqlite3.connect("student.db")
-        cur = conn.cursor()
-        if query.isdigit():
-            cur.execute("SELECT roll_no, name FROM students WHERE roll_no = ?", (int(query),))
-        else:
-            # partial match for name (case-insensitive)
-            cur.execute("SELECT roll_no, name FROM students WHERE LOWER(name) LIKE ?", (f"%{query.lower()}%",))
-        matches = cur.fetchall()
-        conn.close()
-
-        if not matches:
-            messagebox.showinfo("Not Found", f"No student found for '{query}'.")
-            return
-        if len(matches) > 1:
-            # show simple list of matches and ask to use roll number instead
-            list_names = "\n".join([f"{r} - {n}" for r, n in matches])
-            messagebox.showinfo("Multiple Matches", f"Multiple students found:\n\n{list_names}\n\nPlease enter the exact Roll No to export a single student's PDF.")
-            return
-
-        roll_no, name = matches[0]
-        records = fetch_student_records(roll_no, month, year)
-        export_student_pdf(roll_no, name, month, year, records)
+        chosen = picks["chosen"]
+        if chosen is None or query != student_label(chosen):
+            # Roll numbers starting with the digits, or names containing the text, best first
+            matches = get_db().search_students(query, PICK_LIST_SIZE, section_id())
+            exact = [row for row in matches if str(row[0]) == query]
+
+            if not matches:
+                messagebox.showinfo("Not Found", f"No student found for '{query}'.")
+                return
+            if not exact and len(matches) > 1:
+                # Several students match: pick one from the ranked list (double-click / Enter exports)
+                show_picks(matches)
+                pick_list.focus_set()
+                pick_list.selection_clear(0, tk.END)
+                pick_list.selection_set(0)
+                pick_list.activate(0)
+                return
+            chosen = (exact or matches)[0]
+
+        roll_no, name = chosen
+
+        def student_done(filename):
+            if filename is None:
+                messagebox.showwarning("No Data", f"No attendance records found for {name} in {calendar.month_name[month]} {year}.")
+            else:
+                messagebox.showinfo("Success", f"✅ Student PDF saved:\n{filename}")
+
+        runner.submit(
+            lambda task: pdf().export_student_pdf(roll_no, name, month, year,
+                                                  fetch_student_records(roll_no, month, year), task.progress),
+            on_done=student_done, on_error=export_failed,
+            key=("student", roll_no), label=f"Exporting {name}"
+        )
 
     # -------- Export aggregated month (button handler) --------
+    @timed("Monthly: Export Month PDF")
     def handle_export_all():
         try:
             month = int(month_var.get())
@@ -293,13 +276,59 @@ def open_monthly_report():
         except Exception:
             messagebox.showerror("Invalid Month/Year", "Please select a valid month and year.")
             return
-        data = fetch_monthly_data(month, year)
-        export_month_pdf(month, year, data)
+        class_id, class_name = section_id(), section_name()
+
+        def month_done(filename):
+            if filename is None:
+                messagebox.showwarning("No Data", "No data to export for the selected month.")
+            else:
+                messagebox.showinfo("Success", f"✅ Monthly PDF saved successfully:\n{filename}")
+
+        runner.submit(
+            lambda task: pdf().export_month_pdf(month, year, fetch_monthly_data(month, year, class_id), task.progress,
+                                                class_name=class_name),
+            on_done=month_done, on_error=export_failed,
+            key="month", label="Exporting month PDF"
+        )
+
+    # -------- Export every student's sheet for the month (button handler) --------
+    @timed("Monthly: Export All Student PDFs")
+    def handle_export_class():
+        try:
+            month = int(month_var.get())
+            year = int(year_var.get())
+        except Exception:
+            messagebox.showerror("Invalid Month/Year", "Please select a valid month and year.")
+            return
+        combined = combined_var.get()
+        class_id, class_name = section_id(), section_name()
+
+        def export_class(task):
+            db = get_db()
+            start, end = month_range(month, year)
+            total = db.count_students_with_records(start, end, class_id)
+            return pdf().export_all_student_pdfs(month, year, db.iter_class_records(start, end, class_id),
+                                           total=total, combined=combined, progress=task.progress,
+                                           class_name=class_name)
+
+        def class_done(filenames):
+            if not filenames:
+                messagebox.showwarning("No Data", "No attendance records found for the selected month.")
+            elif combined:
+                messagebox.showinfo("Success", f"✅ Combined PDF saved:\n{filenames[0]}")
+            else:
+                messagebox.showinfo("Success", f"✅ {len(filenames)} student PDFs saved in:\nMonthly PDF Folder")
+
+        runner.submit(export_class, on_done=class_done, on_error=export_failed,
+                      key="class", label="Exporting student PDFs")
 
     # wire buttons
     show_btn.config(command=load_data)
     export_all_btn.config(command=handle_export_all)
     export_person_btn.config(command=handle_export_individual)
+    export_class_btn.config(command=handle_export_class)
+
+    TaskStatusBar(btn_frame, runner, bg="#f3efff").grid(row=0, column=4, padx=8)
 
     # initial load
     load_data()
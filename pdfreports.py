@@ -0,0 +1,373 @@
+# ========================= pdfreports.py =========================
+# PDF writers for the daily, monthly, date-range and per-student reports.
+# They do not depend on Tk, so the windows run them on worker threads, the
+# batch export runs them in worker processes and attendance.py uses them
+# headless.
+#
+# Batch export of every student's monthly sheet: the day-wise records of the
+# whole class come from one ordered query, are grouped per student while
+# streaming, and are rendered in a process pool across all cores.
+
+import calendar
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import groupby
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+DAILY_FOLDER = "Daily PDF Folder"
+MONTHLY_FOLDER = "Monthly PDF Folder"
+RANGE_FOLDER = "Range PDF Folder"
+
+BATCH_SIZE = 25     # students rendered per process-pool job
+
+
+def safe_filename(text):
+    """text with everything but letters, digits, '-' and '_' replaced by '_', for use in a file name."""
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in text)
+
+
+def section_prefix(class_name):
+    """'<section>_' for the file names of a section's reports ('' for the whole institution)."""
+    return f"{safe_filename(class_name)}_" if class_name else ""
+
+
+# -------- Daily Report (With Summary + Dynamic Header) --------
+def export_daily_pdf(snapshot, progress=None, folder=DAILY_FOLDER, class_name=None):
+    """Write the daily report for a database.DailySnapshot (of the class_name section). Returns the filename."""
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    for_date, data = snapshot.date, snapshot.rows
+    filename = f"{folder}/Daily_Report_{section_prefix(class_name)}{for_date}.pdf"
+    c = canvas.Canvas(filename, pagesize=A4)
+    width, height = A4
+
+    # --- Summary Data (counted by the snapshot query) ---
+    total_students, total_present, total_absent, total_leave = snapshot.counts
+
+    def draw_header(y_pos):
+        """Draw table header on each new page"""
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(50, y_pos, "Roll No")
+        c.drawString(150, y_pos, "Name")
+        c.drawString(350, y_pos, "Status")
+
+    # --- Title Section ---
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(180, height - 50, f"Daily Attendance Report Of {class_name}" if class_name
+                 else "Daily Attendance Report")
+
+    # --- Date & Summary Section ---
+    c.setFont("Helvetica", 12)
+    c.drawString(50, height - 80, f"Date: {for_date}")
+    c.drawString(50, height - 100, f"Total Students: {total_students}")
+    c.drawString(250, height - 100, f"Present: {total_present}")
+    c.drawString(400, height - 100, f"Absent: {total_absent}")
+    c.drawString(520, height - 100, f"Leave: {total_leave}")
+
+    # --- Table Header ---
+    y = height - 130
+    draw_header(y)
+    y -= 20
+    c.setFont("Helvetica", 11)
+
+    # --- Table Rows ---
+    for i, (roll, name, status) in enumerate(data):
+        if progress and i % 100 == 0:
+            progress(i, total_students, "Writing PDF...")
+        c.drawString(50, y, str(roll))
+        c.drawString(150, y, str(name))
+        c.drawString(350, y, str(status))
+        y -= 15
+
+        # --- Page Break ---
+        if y < 60:
+            c.showPage()
+            c.setFont("Helvetica-Bold", 18)
+            c.drawString(180, height - 50, "Daily Attendance Report ")
+            c.setFont("Helvetica", 12)
+            c.drawString(50, height - 80, f"Date: {for_date}")
+            y = height - 110
+            draw_header(y)
+            y -= 20
+            c.setFont("Helvetica", 11)
+
+    # --- Absent Section ---
+    y -= 30
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, "🚫 Absent Students:")
+    y -= 20
+    c.setFont("Helvetica", 11)
+    absent_list = snapshot.absent
+    if absent_list:
+        for roll, name in absent_list:
+            c.drawString(70, y, f"{roll}  -  {name}")
+            y -= 15
+            if y < 60:
+                c.showPage()
+                c.setFont("Helvetica-Bold", 18)
+                c.drawString(180, height - 50, "Daily Attendance Report ")
+                y = height - 100
+                c.setFont("Helvetica", 11)
+    else:
+        c.drawString(70, y, "None")
+        y -= 20
+
+    # --- Leave Section ---
+    y -= 20
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, "🕒 On Leave:")
+    y -= 20
+    c.setFont("Helvetica", 11)
+    leave_list = snapshot.leave
+    if leave_list:
+        for roll, name in leave_list:
+            c.drawString(70, y, f"{roll}  -  {name}")
+            y -= 15
+            if y < 60:
+                c.showPage()
+                c.setFont("Helvetica-Bold", 18)
+                c.drawString(180, height - 50, "Daily Attendance Report ")
+                y = height - 100
+                c.setFont("Helvetica", 11)
+    else:
+        c.drawString(70, y, "None")
+
+    c.save()
+    return filename
+
+
+# -------- Aggregated summary table (month, term or any date range) --------
+def write_summary_pdf(filename, title, period, data, progress=None):
+    """Write Present/Absent/Total/Percent rows (fetch_monthly_data / fetch_range_data) under a title and period line."""
+    c = canvas.Canvas(filename, pagesize=A4)
+    width, height = A4
+
+    def draw_header(y_start):
+        """Draw table header on each new page"""
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(40, y_start, "Roll No")
+        c.drawString(110, y_start, "Name")
+        c.drawString(310, y_start, "Present")
+        c.drawString(380, y_start, "Absent")
+        c.drawString(460, y_start, "Total")
+        c.drawString(530, y_start, "Percent")
+
+    # Title
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(150, height - 50, title)
+
+    # Period (month name, date range)
+    c.setFont("Helvetica", 12)
+    c.drawString(50, height - 80, period)
+
+    # First header
+    y = height - 110
+    draw_header(y)
+    y -= 16
+    c.setFont("Helvetica", 10)
+
+    for i, (roll, name, presents, absents, leaves, total) in enumerate(data):
+        if progress and i % 100 == 0:
+            progress(i, len(data), "Writing PDF...")
+        percent = ((presents + leaves) / total * 100) if total else 0
+        c.drawString(40, y, str(roll))
+        c.drawString(110, y, str(name)[:28])
+        c.drawString(310, y, str(presents))
+        c.drawString(380, y, str(absents))
+        c.drawString(460, y, str(total))
+        c.drawString(530, y, f"{percent:.1f}%")
+
+        y -= 15  # spacing optimized
+
+        # --- Page break condition ---
+        if y < 60:
+            c.showPage()
+            c.setFont("Helvetica-Bold", 18)
+            c.drawString(150, height - 50, title + " ")
+            c.setFont("Helvetica", 12)
+            c.drawString(50, height - 80, period)
+            y = height - 110
+            draw_header(y)
+            y -= 16
+            c.setFont("Helvetica", 10)
+
+    c.save()
+    return filename
+
+
+# -------- Full-month aggregated report (No Leave Column + Fixed Layout) --------
+def export_month_pdf(month, year, data, progress=None, folder=MONTHLY_FOLDER, class_name=None):
+    """Write the monthly summary for fetch_monthly_data rows. Returns the filename, or None if empty."""
+    if not data:
+        return None
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    month_name = calendar.month_name[month]
+    filename = f"{folder}/Monthly_Report_{section_prefix(class_name)}{month_name}_{year}.pdf"
+    title = f"Monthly Attendance Report Of {class_name}" if class_name else "Monthly Attendance Report"
+    return write_summary_pdf(filename, title, f"Month: {month_name} {year}", data, progress)
+
+
+# -------- Date-range / term report (same table as the monthly one) --------
+def export_range_pdf(first_day, last_day, data, title=None, excluded=None, progress=None, folder=RANGE_FOLDER,
+                     class_name=None):
+    """
+    Write the summary for fetch_range_data rows of first_day..last_day
+    (inclusive, 'YYYY-MM-DD') of the class_name section. excluded describes
+    left-out days for the period line. Returns the filename, or None if empty.
+    """
+    if not data:
+        return None
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    name = safe_filename(title) if title else "Range_Report"
+    filename = f"{folder}/{name}_{section_prefix(class_name)}{first_day}_to_{last_day}.pdf"
+    period = f"Period: {first_day} to {last_day}"
+    if excluded:
+        period += f" (excluding {excluded})"
+    if not title:
+        title = f"Attendance Report Of {class_name}" if class_name else "Attendance Report"
+    return write_summary_pdf(filename, title, period, data, progress)
+
+
+# -------- Individual student's month (detailed by date) --------
+def draw_student_month(c, roll_no, name, month, year, records, progress=None):
+    """Draw one student's day-wise sheet on the canvas, starting at the current page."""
+    width, height = A4
+    month_name = calendar.month_name[month]
+
+    # Title and details
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(140, height - 50, f"Monthly Attendance - {name} ({roll_no})")
+    c.setFont("Helvetica", 12)
+    c.drawString(50, height - 80, f"Month: {month_name} {year}")
+
+    # Table header
+    y = height - 120
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(80, y, "Date")
+    c.drawString(200, y, "Status")
+    y -= 18
+    c.setFont("Helvetica", 11)
+
+    for i, (date, status) in enumerate(records):
+        if progress and i % 100 == 0:
+            progress(i, len(records), "Writing PDF...")
+        c.drawString(80, y, str(date))
+        c.drawString(200, y, str(status))
+        y -= 16
+        if y < 80:
+            c.showPage()
+            y = height - 80
+            c.setFont("Helvetica", 11)
+
+
+def student_pdf_filename(roll_no, month, year, folder=MONTHLY_FOLDER):
+    return f"{folder}/Student_{roll_no}_{calendar.month_name[month]}_{year}.pdf"
+
+
+def export_student_pdf(roll_no, name, month, year, records, progress=None, folder=MONTHLY_FOLDER):
+    """Write one student's monthly PDF. Returns the filename, or None if there are no records."""
+    if not records:
+        return None
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    filename = student_pdf_filename(roll_no, month, year, folder)
+
+    c = canvas.Canvas(filename, pagesize=A4)
+    draw_student_month(c, roll_no, name, month, year, records, progress)
+    c.save()
+    return filename
+
+
+# -------- Whole class: one PDF per student, or one combined file --------
+def group_student_records(rows):
+    """
+    Turn (roll_no, name, date, status) rows ordered by roll_no, date into
+    (roll_no, name, [(date, status), ...]) groups without materializing them all.
+    """
+    for (roll_no, name), group in groupby(rows, key=lambda row: (row[0], row[1])):
+        yield roll_no, name, [(date, status) for _, _, date, status in group]
+
+
+def _render_student_batch(month, year, students, folder):
+    """Process-pool job: render a batch of (roll_no, name, records) sheets."""
+    return [export_student_pdf(roll_no, name, month, year, records, folder=folder)
+            for roll_no, name, records in students]
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_all_student_pdfs(month, year, rows, total=None, combined=False, workers=None,
+                            progress=None, folder=MONTHLY_FOLDER, class_name=None):
+    """
+    Export every student's monthly sheet from ordered (roll_no, name, date, status) rows.
+
+    With combined=True all sheets go into one file (one student per page run),
+    rendered sequentially; otherwise one PDF per student is rendered in a
+    process pool with `workers` processes (default: all cores).
+    progress(done, total, text) is called after each student/batch and may
+    raise to cancel. Returns the list of written filenames.
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    students = group_student_records(rows)
+
+    if combined:
+        filename = f"{folder}/All_Students_{section_prefix(class_name)}{calendar.month_name[month]}_{year}.pdf"
+        c = canvas.Canvas(filename, pagesize=A4)
+        done = 0
+        for roll_no, name, records in students:
+            if done:
+                c.showPage()
+            draw_student_month(c, roll_no, name, month, year, records)
+            done += 1
+            if progress:
+                progress(done, total, f"Rendered {done} students...")
+        if not done:
+            return []
+        c.save()
+        return [filename]
+
+    workers = workers or os.cpu_count() or 1
+    filenames = []
+    done = 0
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = set()
+        for batch in _batches(students, BATCH_SIZE):
+            # Keep a bounded number of batches in flight so memory stays flat
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    written = future.result()
+                    filenames.extend(written)
+                    done += len(written)
+                if progress:
+                    progress(done, total, f"Exported {done} student PDFs...")
+            pending.add(pool.submit(_render_student_batch, month, year, batch, folder))
+
+        for future in pending:
+            written = future.result()
+            filenames.extend(written)
+            done += len(written)
+            if progress:
+                progress(done, total, f"Exported {done} student PDFs...")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return filenames
@@ -0,0 +1,207 @@
+# ========================= rangereport.py =========================
+import tkinter as tk
+from tkinter import ttk, messagebox
+import datetime
+from tkcalendar import DateEntry   # ✅ For calendar date picker
+from database import (ALL_SECTIONS, WEEKDAY_NAMES, describe_exclusions, get_db, inclusive_range,
+                      parse_holidays)
+from virtualtree import VirtualTree, list_page
+from tasks import TaskRunner, TaskStatusBar
+from diagnostics import timed
+
+
+def open_range_report():
+    # Section picker choices: the whole institution or one section
+    sections = {ALL_SECTIONS: None, **{name: cid for cid, name, _ in get_db().classes()}}
+
+    # -------- Helper: per-student counts for the chosen period --------
+    def fetch_range_data(first_day, last_day, exclude_weekdays, holidays, section):
+        return get_db().fetch_range_data(*inclusive_range(first_day, last_day), exclude_weekdays, holidays,
+                                         sections[section])
+
+    # Period currently shown: the grid and the PDF export both use these rows
+    shown = {"period": None, "rows": []}
+
+    # -------- Build Window --------
+    win = tk.Toplevel()
+    win.title("Term / Date Range Report")
+    win.geometry("1000x740")
+    win.configure(bg="#ecfdf5")
+
+    # Header
+    header = tk.Frame(win, bg="#047857", height=90)
+    header.pack(fill="x")
+    tk.Label(header, text="📚 Term / Date Range Report", font=("Segoe UI", 20, "bold"),
+             bg="#047857", fg="white").pack(pady=12)
+    tk.Label(header, text="Attendance totals for any period, e.g. a term or a semester", font=("Segoe UI", 10),
+             bg="#047857", fg="#D1FAE5").pack()
+
+    # Selection frame (period, title, exclusions)
+    control = tk.Frame(win, bg="#ecfdf5")
+    control.pack(fill="x", pady=12, padx=18)
+
+    today = datetime.date.today()
+    tk.Label(control, text="From:", bg="#ecfdf5", font=("Segoe UI", 11)).grid(row=0, column=0, padx=6, sticky="w")
+    from_picker = DateEntry(control, width=12, borderwidth=2, date_pattern='yyyy-mm-dd', font=("Segoe UI", 11))
+    from_picker.set_date(today.replace(day=1))
+    from_picker.grid(row=0, column=1, padx=6)
+
+    tk.Label(control, text="To:", bg="#ecfdf5", font=("Segoe UI", 11)).grid(row=0, column=2, padx=6, sticky="w")
+    to_picker = DateEntry(control, width=12, borderwidth=2, date_pattern='yyyy-mm-dd', font=("Segoe UI", 11))
+    to_picker.set_date(today)
+    to_picker.grid(row=0, column=3, padx=6)
+
+    tk.Label(control, text="Title:", bg="#ecfdf5", font=("Segoe UI", 11)).grid(row=0, column=4, padx=(18, 6), sticky="w")
+    title_entry = tk.Entry(control, font=("Segoe UI", 11), width=24)
+    title_entry.grid(row=0, column=5, columnspan=4, padx=6, sticky="w")
+
+    tk.Label(control, text="Section:", bg="#ecfdf5", font=("Segoe UI", 11)).grid(row=0, column=9, padx=(18, 6), sticky="w")
+    section_var = tk.StringVar(value=ALL_SECTIONS)
+    ttk.Combobox(control, textvariable=section_var, values=list(sections), width=16,
+                 state="readonly").grid(row=0, column=10, padx=6, sticky="w")
+
+    # Weekdays to leave out (weekends by default)
+    tk.Label(control, text="Skip:", bg="#ecfdf5", font=("Segoe UI", 11)).grid(row=1, column=0, padx=6, pady=(8, 0), sticky="w")
+    weekday_frame = tk.Frame(control, bg="#ecfdf5")
+    weekday_frame.grid(row=1, column=1, columnspan=8, pady=(8, 0), sticky="w")
+    weekday_vars = []
+    for weekday, name in enumerate(WEEKDAY_NAMES):
+        var = tk.BooleanVar(value=weekday >= 5)
+        tk.Checkbutton(weekday_frame, text=name.capitalize(), variable=var, bg="#ecfdf5",
+                       font=("Segoe UI", 10)).pack(side="left", padx=2)
+        weekday_vars.append(var)
+
+    tk.Label(control, text="Holidays:", bg="#ecfdf5", font=("Segoe UI", 11)).grid(row=2, column=0, padx=6, pady=(8, 0), sticky="w")
+    holidays_entry = tk.Entry(control, font=("Segoe UI", 11), width=60)
+    holidays_entry.grid(row=2, column=1, columnspan=6, padx=6, pady=(8, 0), sticky="w")
+    tk.Label(control, text="e.g. 2025-12-25, 2025-12-29..2026-01-02", bg="#ecfdf5", fg="#6B7280",
+             font=("Segoe UI", 9)).grid(row=3, column=1, columnspan=6, padx=6, sticky="w")
+
+    # Buttons for actions
+    btn_frame = tk.Frame(win, bg="#ecfdf5")
+    btn_frame.pack(fill="x", padx=18, pady=(0, 6))
+
+    show_btn = tk.Button(btn_frame, text="🔍 Show Report", bg="#3B82F6", fg="white",
+                         font=("Segoe UI", 11, "bold"), width=14, relief=tk.FLAT)
+    show_btn.grid(row=0, column=0, padx=8)
+
+    export_btn = tk.Button(btn_frame, text="📄 Export PDF", bg="#10B981", fg="white",
+                           font=("Segoe UI", 11, "bold"), width=14, relief=tk.FLAT)
+    export_btn.grid(row=0, column=1, padx=8)
+
+    summary_lbl = tk.Label(win, text="", bg="#ecfdf5", fg="#065F46", font=("Segoe UI", 11, "bold"))
+    summary_lbl.pack(anchor="w", padx=26)
+
+    # Treeview style and table
+    style = ttk.Style()
+    style.configure("Treeview", rowheight=28, font=("Segoe UI", 11))
+    style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
+
+    columns = ("Roll No", "Name", "Present", "Absent", "Leave", "Total", "Percent")
+    tree_frame = tk.Frame(win, bg="#ecfdf5")
+    tree_frame.pack(fill="both", expand=True, padx=18, pady=10)
+
+    tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=16)
+    for col in columns:
+        tree.heading(col, text=col)
+        if col == "Name":
+            tree.column(col, width=300, anchor="center")
+        elif col == "Percent":
+            tree.column(col, width=90, anchor="center")
+        else:
+            tree.column(col, width=110, anchor="center")
+    tree.pack(fill="both", expand=True, side="left")
+
+    scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+    scrollbar.pack(side="right", fill="y")
+
+    def format_row(row):
+        roll, name, presents, absents, leaves, total = row
+        percent = ((presents + leaves) / total * 100) if total else 0.0
+        return (roll, name, presents, absents, leaves, total, f"{percent:.1f}%")
+
+    # Only the visible pages of the loaded rows are kept in the tree
+    grid = VirtualTree(tree, lambda after, before, limit: list_page(shown["rows"], after, before, limit),
+                       scrollbar=scrollbar, format_row=format_row)
+
+    # The range query and PDF rendering run in the background
+    runner = TaskRunner(win)
+    win.bind("<Destroy>", lambda e: runner.shutdown() if e.widget is win else None)
+
+    # -------- Read the period and exclusions from the controls --------
+    def selected_period():
+        first_day = from_picker.get_date().strftime("%Y-%m-%d")
+        last_day = to_picker.get_date().strftime("%Y-%m-%d")
+        if last_day < first_day:
+            messagebox.showerror("Invalid Period", "The 'To' date must not be before the 'From' date.")
+            return None
+        try:
+            holidays = tuple(parse_holidays(holidays_entry.get()))
+        except ValueError:
+            messagebox.showerror("Invalid Holidays",
+                                 "Enter holidays as YYYY-MM-DD dates or YYYY-MM-DD..YYYY-MM-DD spans, "
+                                 "separated by commas.")
+            return None
+        exclude_weekdays = tuple(weekday for weekday, var in enumerate(weekday_vars) if var.get())
+        return first_day, last_day, exclude_weekdays, holidays, section_var.get()
+
+    # -------- Load / Show data into table --------
+    @timed("Range: Show")
+    def load_data():
+        period = selected_period()
+        if period is None:
+            return
+
+        def show(rows):
+            shown.update(period=period, rows=rows)
+            grid.reload()
+            first_day, last_day, exclude_weekdays, holidays, section = period
+            excluded = describe_exclusions(exclude_weekdays, holidays)
+            who = "students" if sections[section] is None else f"students of {section}"
+            summary_lbl.config(text=f"{len(rows)} {who}, {first_day} to {last_day}"
+                                    + (f" (excluding {excluded})" if excluded else ""))
+
+        runner.submit(lambda task: fetch_range_data(*period), on_done=show, key="range",
+                      label="Loading attendance",
+                      on_error=lambda e: messagebox.showerror("Error", f"Could not load attendance:\n{e}"))
+
+    # -------- Export the period (button handler) --------
+    @timed("Range: Export PDF")
+    def handle_export():
+        period = selected_period()
+        if period is None:
+            return
+        first_day, last_day, exclude_weekdays, holidays, section = period
+        title = title_entry.get().strip() or None
+        # Export exactly what is on screen; only query if another period is selected
+        rows = shown["rows"] if shown["period"] == period else None
+
+        def export(task):
+            from pdfreports import export_range_pdf   # reportlab is loaded on first export
+            data = rows if rows is not None else fetch_range_data(*period)
+            return export_range_pdf(first_day, last_day, data, title=title,
+                                    excluded=describe_exclusions(exclude_weekdays, holidays), progress=task.progress,
+                                    class_name=section if sections[section] is not None else None)
+
+        def export_done(filename):
+            if filename is None:
+                messagebox.showwarning("No Data", "No students to export for the selected period.")
+            else:
+                messagebox.showinfo("Success", f"✅ Report PDF saved successfully:\n{filename}")
+
+        runner.submit(export, on_done=export_done,
+                      on_error=lambda e: messagebox.showerror("Error", f"Could not export PDF:\n{e}"),
+                      key="export", label="Exporting PDF")
+
+    # wire buttons
+    show_btn.config(command=load_data)
+    export_btn.config(command=handle_export)
+
+    TaskStatusBar(btn_frame, runner, bg="#ecfdf5").grid(row=0, column=2, padx=8)
+
+    # initial load
+    load_data()
+
+    # footer
+    tk.Label(win, text="© Huzaifa Shoaib | Attendance System", bg="#ecfdf5", fg="#6B7280",
+             font=("Segoe UI", 10, "italic")).pack(side="bottom", pady=6)
@@ -0,0 +1,149 @@
+# ========================= readcache.py =========================
+# Bounded LRU cache in front of the report queries (used by database.Database).
+#
+# Entries are keyed by query and period and remember the half-open date
+# range they cover. The Database invalidates them precisely after its own
+# writes: marking attendance for a date only drops entries whose period
+# contains that date, so past days and months stay cached for the session.
+# Commits made by anything else (another app instance, DB Browser, ...) are
+# detected with PRAGMA data_version on a private watcher connection and clear
+# the whole cache. The watcher sees the Database's own commits too: each one
+# is bracketed by before_commit / after_commit, and a change seen in between
+# is not counted as an outside one.
+#
+# A result computed while a write was committing is not stored (generation
+# check), so a stale read can never be cached over a fresh invalidation.
+# Without WAL, data_version cannot be read while a writer holds the file
+# lock; the watcher does not wait for it and treats that as a change.
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+READ_CACHE_SIZE = 128       # entries kept (a day snapshot, a month, a page, ...)
+
+
+class ReadCache:
+    def __init__(self, path, maxsize=READ_CACHE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> (start, end, value)
+        self._lock = threading.Lock()
+        self._watch = None
+        self._version = None
+        self._generation = 0
+        self._committing = 0            # own commits between before_commit and after_commit
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.external_changes = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    # -------- Lookups --------
+    def get(self, key, start, end, load):
+        """Return the cached value for key, or load() it and cache it for the [start, end) period."""
+        if not self.enabled:
+            return load()
+        with self._lock:
+            if not self._check_external():
+                return load()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (start, end, value)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    # -------- Own Writes --------
+    def before_commit(self):
+        """
+        Call with the write lock held, right before COMMIT: picks up earlier
+        outside commits. Must be followed by after_commit, even if COMMIT fails.
+        """
+        if self.enabled:
+            with self._lock:
+                self._check_external()
+                self._committing += 1
+
+    def after_commit(self, dates=None):
+        """
+        Drop entries covering any of the written dates (all entries if dates is
+        None, none if it is empty: the commit changed no rows).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._committing -= 1
+            if dates is None or dates:
+                self._generation += 1
+                self.invalidations += 1
+            if dates is None:
+                self._entries.clear()
+            elif dates:
+                stale = [key for key, (start, end, _) in self._entries.items()
+                         if any(start <= date < end for date in dates)]
+                for key in stale:
+                    del self._entries[key]
+            # Our own commit moved data_version; it is accounted for above
+            self._version = self._data_version()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    # -------- Outside Changes --------
+    def _data_version(self):
+        """PRAGMA data_version, or None while another connection holds the file locked."""
+        if self._watch is None:
+            self._watch = sqlite3.connect(self.path, timeout=0, check_same_thread=False)
+        try:
+            return self._watch.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.OperationalError:
+            return None
+
+    def _check_external(self):
+        """Clear the cache if anything else committed. Returns False if that cannot be told right now."""
+        version = self._data_version()
+        if version is None or version != self._version:
+            # While one of our own commits is in flight the change is most likely that one
+            if self._version is not None and not self._committing:
+                self.external_changes += 1
+            self._generation += 1
+            self._entries.clear()
+            self._version = version
+        return version is not None
+
+    # -------- Housekeeping --------
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "external_changes": self.external_changes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+            self._version = None
@@ -0,0 +1,103 @@
+# ========================= startuptimer.py =========================
+# Optional time-to-first-window instrumentation for main.py.
+#
+# Enabled with "python main.py --startup-timing" or by setting the
+# ATTENDANCE_STARTUP_TIMING=1 environment variable (works for frozen builds).
+# Records how long each startup phase took plus the slowest module imports
+# (like "python -X importtime"), prints a report to stderr and appends one
+# JSON line per run to startup_times.log so cold start can be tracked.
+
+import builtins
+import datetime
+import json
+import os
+import sys
+import time
+
+FLAG = "--startup-timing"
+ENV_VAR = "ATTENDANCE_STARTUP_TIMING"
+LOG_FILE = "startup_times.log"
+TOP_IMPORTS = 10
+
+
+class StartupTimer:
+    """Collects phase marks and module import times; does nothing when disabled."""
+
+    def __init__(self, enabled, start=None):
+        self.enabled = enabled
+        self.start = start if start is not None else time.perf_counter()
+        self.phases = []
+        self.imports = {}
+        self._last = self.start
+        self._original_import = None
+        if enabled:
+            self._install_import_hook()
+
+    @classmethod
+    def from_environment(cls, argv=None, start=None):
+        argv = sys.argv if argv is None else argv
+        enabled = FLAG in argv or os.environ.get(ENV_VAR, "") not in ("", "0")
+        if FLAG in argv:
+            argv.remove(FLAG)
+        return cls(enabled, start)
+
+    # -------- Import Hook --------
+    def _install_import_hook(self):
+        original = builtins.__import__
+        imports = self.imports
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            t0 = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                # Cumulative time, nested imports included (like -X importtime)
+                imports.setdefault(name, time.perf_counter() - t0)
+
+        self._original_import = original
+        builtins.__import__ = timed_import
+
+    def _remove_import_hook(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    # -------- Phases --------
+    def mark(self, phase):
+        """Record the time since the previous mark under the given phase name."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def finish(self, phase="first window"):
+        """Mark the last phase, then print and log the report."""
+        if not self.enabled:
+            return
+        self.mark(phase)
+        self._remove_import_hook()
+        total = self._last - self.start
+
+        lines = [f"Startup timing: {total * 1000:.1f} ms to first window"]
+        lines += [f"  {name:<24}{seconds * 1000:9.1f} ms" for name, seconds in self.phases]
+        slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:TOP_IMPORTS]
+        if slowest:
+            lines.append("  slowest imports (cumulative):")
+            lines += [f"    {name:<22}{seconds * 1000:9.1f} ms" for name, seconds in slowest]
+        print("\n".join(lines), file=sys.stderr)
+
+        record = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "total_ms": round(total * 1000, 1),
+            "phases": {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            "imports": {name: round(seconds * 1000, 1) for name, seconds in slowest},
+            "frozen": bool(getattr(sys, "frozen", False)),
+        }
+        try:
+            with open(LOG_FILE, "a", encoding="utf-8") as log:
+                log.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
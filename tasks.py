@@ -0,0 +1,228 @@
+# ========================= tasks.py =========================
+# Background task runner that keeps the Tk main loop responsive.
+#
+# Work (SQL fetches, PDF exports) runs on one small thread pool shared by
+# every window, so opening and closing report windows does not leave threads
+# (and their database connections) behind. Nothing on a worker thread touches
+# Tk: results, errors and progress are queued and delivered on the main
+# thread by polling with root.after().
+
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
+
+from diagnostics import diagnostics
+
+POLL_MS = 50
+TASK_WORKERS = 4            # worker threads shared by all windows' runners
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """The application-wide task thread pool (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix="attendance-task")
+    return _pool
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task's work function once the task has been cancelled."""
+
+
+class Task:
+    """Handle for one submitted unit of work."""
+
+    def __init__(self, runner, key, label, on_done, on_error):
+        self.runner = runner
+        self.key = key
+        self.label = label
+        self.on_done = on_done
+        self.on_error = on_error
+        self.future = None
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """Drop the task: it will not start if still queued, and its result is discarded."""
+        self._cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        """Call from work functions at convenient points; raises TaskCancelled if cancelled."""
+        if self._cancelled:
+            raise TaskCancelled()
+
+    def progress(self, done, total, text=None):
+        """Report progress from the worker thread (also acts as a cancellation point)."""
+        self.check()
+        self.runner._events.put(("progress", self, (done, total, text)))
+
+
+class TaskRunner:
+    """
+    Runs work functions on the shared thread pool and calls back on the Tk
+    thread. Each window has its own runner; shutting it down cancels only
+    that runner's tasks.
+
+    Submitting with a key replaces any pending or running task with the same
+    key (e.g. repeated Refresh clicks): the older task is cancelled and only
+    the newest result is delivered.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._pool = shared_pool()
+        self._events = queue.Queue()
+        self._active = {}           # key -> latest Task for that key
+        self._running = set()
+        self._polling = False
+        self._listeners = []
+
+    # -------- Submitting --------
+    def submit(self, work, on_done=None, on_error=None, key=None, label=""):
+        """
+        Run work(task) on a worker thread.
+        on_done(result) / on_error(exception) are called on the Tk thread.
+        """
+        if key is not None and key in self._active:
+            self._active[key].cancel()
+        task = Task(self, key, label, on_done, on_error)
+        if key is not None:
+            self._active[key] = task
+        self._running.add(task)
+        task.future = self._pool.submit(self._run, work, task)
+        self._notify()
+        self._ensure_polling()
+        return task
+
+    def cancel_all(self):
+        for task in list(self._running):
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def add_listener(self, callback):
+        """callback(runner, event, task, payload) is called on the Tk thread for every task event."""
+        self._listeners.append(callback)
+
+    # -------- Worker Side --------
+    def _run(self, work, task):
+        try:
+            task.check()
+            t0 = time.perf_counter()
+            result = work(task)
+            if diagnostics.enabled:
+                diagnostics.record("task", task.label or str(task.key), time.perf_counter() - t0)
+            task.check()
+            self._events.put(("done", task, result))
+        except TaskCancelled:
+            self._events.put(("cancelled", task, None))
+        except Exception as e:
+            self._events.put(("error", task, e))
+
+    # -------- Tk Side --------
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        try:
+            while True:
+                event, task, payload = self._events.get_nowait()
+                self._dispatch(event, task, payload)
+        except queue.Empty:
+            pass
+
+        # Futures cancelled before they started never post an event
+        for task in list(self._running):
+            if task.future.cancelled():
+                self._finish(task)
+                self._notify("cancelled", task)
+
+        if self._running or not self._events.empty():
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _dispatch(self, event, task, payload):
+        if event == "progress":
+            if not task.cancelled:
+                self._notify(event, task, payload)
+            return
+
+        self._finish(task)
+        if task.cancelled or event == "cancelled":
+            self._notify("cancelled", task)
+            return
+        self._notify(event, task, payload)
+        if event == "done" and task.on_done:
+            task.on_done(payload)
+        elif event == "error":
+            if task.on_error:
+                task.on_error(payload)
+            else:
+                raise payload
+
+    def _finish(self, task):
+        self._running.discard(task)
+        if task.key is not None and self._active.get(task.key) is task:
+            del self._active[task.key]
+
+    def _notify(self, event="submitted", task=None, payload=None):
+        for callback in self._listeners:
+            callback(self, event, task, payload)
+
+
+class TaskStatusBar(tk.Frame):
+    """Progress bar, status text and Cancel button that follow a TaskRunner."""
+
+    def __init__(self, parent, runner, bg="#E5E7EB", **kwargs):
+        super().__init__(parent, bg=bg, **kwargs)
+        self.runner = runner
+        self.label = tk.Label(self, text="", bg=bg, fg="#374151", font=("Arial", 10))
+        self.label.pack(side=tk.LEFT, padx=8)
+        self.bar = ttk.Progressbar(self, length=220, mode="indeterminate")
+        self.bar.pack(side=tk.LEFT, padx=8)
+        self.cancel_btn = tk.Button(self, text="✖ Cancel", command=runner.cancel_all,
+                                    bg="#EF4444", fg="white", font=("Arial", 9, "bold"),
+                                    relief=tk.FLAT, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=8)
+        runner.add_listener(self._on_event)
+
+    def _on_event(self, runner, event, task, payload):
+        if event == "progress":
+            done, total, text = payload
+            if total:
+                self.bar.stop()
+                self.bar.configure(mode="determinate", maximum=total, value=done)
+            self.label.config(text=text or task.label)
+            return
+
+        if runner.busy:
+            if event == "submitted":
+                self.bar.configure(mode="indeterminate", value=0)
+                self.bar.start(15)
+                self.label.config(text=f"{task.label}..." if task and task.label else "Working...")
+            self.cancel_btn.config(state=tk.NORMAL)
+        else:
+            self.bar.stop()
+            self.bar.configure(mode="determinate", value=0)
+            self.label.config(text="Cancelled." if event == "cancelled" else "")
+            self.cancel_btn.config(state=tk.DISABLED)
@@ -0,0 +1,204 @@
+# ========================= virtualtree.py =========================
+# Virtualized (windowed) ttk.Treeview used by the main window and both reports.
+#
+# Only a few pages of rows are ever inserted into the Treeview. Pages are
+# fetched with keyset pagination on the row key (roll_no) as the user scrolls
+# towards either end, and pages that fall out of the window are dropped, so
+# Tk item count and redraw time stay flat whatever the roster size.
+#
+# Loaded items are indexed by key, so single rows can be patched, inserted or
+# removed in place after a write instead of reloading the whole grid.
+
+import bisect
+
+PAGE_SIZE = 200     # rows fetched per page
+MAX_PAGES = 3       # pages kept in the Treeview at once
+EDGE = 0.05         # scroll position (fraction) that triggers loading the next/previous page
+
+
+def list_page(rows, after, before, limit, key=lambda row: row[0]):
+    """A fetch_page over an in-memory list already sorted by key (e.g. a report snapshot)."""
+    if before is not None:
+        end = bisect.bisect_left(rows, before, key=key)
+        return rows[max(0, end - limit):end]
+    start = 0 if after is None else bisect.bisect_right(rows, after, key=key)
+    return rows[start:start + limit]
+
+
+class VirtualTree:
+    """
+    Windowed wrapper around an existing ttk.Treeview.
+
+    fetch_page(after, before, limit) must return at most `limit` rows sorted
+    ascending by key: the first rows with key > after, or the last rows with
+    key < before (both None for the first page). Items use str(key) as iid.
+    """
+
+    def __init__(self, tree, fetch_page, scrollbar=None, key=lambda row: row[0],
+                 format_row=tuple, page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.scrollbar = scrollbar
+        self.key = key
+        self.format_row = format_row
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        self._pages = []            # list of [first_key, last_key]
+        self._index = {}            # key -> Treeview item id of loaded rows
+        self._has_before = False
+        self._has_after = False
+        self._busy = False
+
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    # -------- Public API --------
+    def reload(self):
+        """Clear the tree and show the first page again."""
+        self.tree.delete(*self.tree.get_children())
+        self._pages = []
+        self._index = {}
+        self._has_before = False
+        rows = self.fetch_page(None, None, self.page_size)
+        self._has_after = len(rows) == self.page_size
+        if rows:
+            self._insert_page(rows, at_end=True)
+        self.tree.yview_moveto(0)
+
+    def iid(self, key):
+        return str(key)
+
+    def item_for(self, key):
+        """Treeview item id of a loaded row, or None if it is outside the window."""
+        return self._index.get(key)
+
+    def loaded_keys(self):
+        return list(self._index)
+
+    def update_row(self, row):
+        """Replace the values of a loaded row; rows outside the window are fetched fresh later."""
+        item = self._index.get(self.key(row))
+        if item is not None:
+            self.tree.item(item, values=self.format_row(row))
+
+    def set_column(self, column, value, keys=None):
+        """Set one column on the given loaded rows (all loaded rows if keys is None)."""
+        for key in (self._index if keys is None else keys):
+            item = self._index.get(key)
+            if item is not None:
+                self.tree.set(item, column, value)
+
+    def upsert_row(self, row):
+        """Update a loaded row, or insert a new one at its sorted position if it falls inside the window."""
+        key = self.key(row)
+        if key in self._index:
+            self.update_row(row)
+            return
+        if not self._covers(key):
+            return
+        # Tree items are always in key order, so the sorted index gives the position
+        position = bisect.bisect_left(sorted(self._index), key)
+        self._add_item(row, position)
+        if not self._pages:
+            self._pages.append([key, key])
+            return
+        page = self._page_for(key)
+        page[0] = min(page[0], key)
+        page[1] = max(page[1], key)
+
+    def delete_row(self, key):
+        """Remove a loaded row from the tree."""
+        item = self._index.pop(key, None)
+        if item is not None:
+            self.tree.delete(item)
+
+    # -------- Scrolling --------
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._busy:
+            return
+        first, last = float(first), float(last)
+        if last >= 1 - EDGE and self._has_after:
+            self._busy = True
+            self.tree.after_idle(self._load_after)
+        elif first <= EDGE and self._has_before:
+            self._busy = True
+            self.tree.after_idle(self._load_before)
+
+    def _load_after(self):
+        try:
+            rows = self.fetch_page(self._pages[-1][1], None, self.page_size) if self._pages else []
+            self._has_after = len(rows) == self.page_size
+            if not rows:
+                return
+            top = self._top_index()
+            self._insert_page(rows, at_end=True)
+            dropped = 0
+            while len(self._pages) > self.max_pages:
+                dropped += self._drop_page(at_end=False)
+                self._has_before = True
+            self._restore_top(top - dropped)
+        finally:
+            self._busy = False
+
+    def _load_before(self):
+        try:
+            rows = self.fetch_page(None, self._pages[0][0], self.page_size) if self._pages else []
+            self._has_before = len(rows) == self.page_size
+            if not rows:
+                return
+            top = self._top_index()
+            self._insert_page(rows, at_end=False)
+            while len(self._pages) > self.max_pages:
+                self._drop_page(at_end=True)
+                self._has_after = True
+            self._restore_top(top + len(rows))
+        finally:
+            self._busy = False
+
+    # -------- Page Bookkeeping --------
+    def _add_item(self, row, position):
+        key = self.key(row)
+        item = self.tree.insert("", position, iid=self.iid(key), values=self.format_row(row))
+        self._index[key] = item
+
+    def _insert_page(self, rows, at_end):
+        if at_end:
+            for row in rows:
+                self._add_item(row, "end")
+            self._pages.append([self.key(rows[0]), self.key(rows[-1])])
+        else:
+            for row in reversed(rows):
+                self._add_item(row, 0)
+            self._pages.insert(0, [self.key(rows[0]), self.key(rows[-1])])
+
+    def _drop_page(self, at_end):
+        first, last = self._pages.pop(-1 if at_end else 0)
+        doomed = [key for key in self._index if first <= key <= last]
+        self.tree.delete(*(self._index.pop(key) for key in doomed))
+        return len(doomed)
+
+    def _page_for(self, key):
+        for page in self._pages:
+            if key <= page[1]:
+                return page
+        return self._pages[-1]
+
+    def _covers(self, key):
+        if not self._pages:
+            return not self._has_after
+        if key < self._pages[0][0]:
+            return not self._has_before
+        if key > self._pages[-1][1]:
+            return not self._has_after
+        return True
+
+    def _top_index(self):
+        total = len(self.tree.get_children())
+        return int(round(float(self.tree.yview()[0]) * total)) if total else 0
+
+    def _restore_top(self, index):
+        total = len(self.tree.get_children())
+        if total:
+            self.tree.yview_moveto(max(index, 0) / total)